@@ -1,7 +1,12 @@
-from pkg_resources import DistributionNotFound, get_distribution
+def __getattr__(name: str):
+    # resolved lazily, because importing package metadata is slow
+    if name == "__version__":
+        from importlib.metadata import PackageNotFoundError, version
 
-
-try:
-    __version__ = get_distribution("skydance").version
-except DistributionNotFound:
-    __version__ = "(local)"
+        try:
+            res = version("skydance")
+        except PackageNotFoundError:
+            res = "(local)"
+        globals()[name] = res
+        return res
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
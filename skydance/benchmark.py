@@ -0,0 +1,413 @@
+"""
+Microbenchmarks of the protocol encoding/decoding and network helpers.
+
+Run all benchmarks and store machine-readable results:
+
+    $ python -m skydance.benchmark run --output before.json
+
+Compare two runs (exits with non-zero status if any benchmark regressed):
+
+    $ python -m skydance.benchmark compare before.json after.json
+
+Dump cProfile statistics of each benchmark to a directory (viewable by
+e.g. `snakeviz` or convertible to a flamegraph by `flameprof`):
+
+    $ python -m skydance.benchmark profile --output profiles/
+"""
+
+import argparse
+import asyncio
+import cProfile
+import json
+import os
+import platform
+import sys
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from skydance.network.buffer import Buffer, FrameBuffer
+from skydance.network.emulator import RelayEmulator
+from skydance.network.session import Session
+from skydance.protocol import (
+    TAIL,
+    BrightnessCommand,
+    Command,
+    GetNumberOfZonesCommand,
+    GetNumberOfZonesResponse,
+    GetZoneInfoCommand,
+    GetZoneInfoResponse,
+    MasterPowerCommand,
+    PingCommand,
+    PowerCommand,
+    RGBWCommand,
+    State,
+    TemperatureCommand,
+    encode_batch,
+)
+
+
+RESULTS_FORMAT = 1
+"""Version of the JSON results layout."""
+
+BUFFER_CHUNK_SIZES = (1, 2, 4, 8, 16, 36, 64, 256, 1024, 4096)
+"""Chunk sizes used for benchmarking [Buffer][skydance.network.buffer.Buffer] and [FrameBuffer][skydance.network.buffer.FrameBuffer]."""
+
+_NUMBER_OF_ZONES_RESPONSE = bytes.fromhex(
+    "55aa5aa57e00800080e18026510100f910008182838485868788898a8b8c8d8e8f90007e"
+)
+_ZONE_INFO_RESPONSE = bytes.fromhex(
+    "55aa5aa57e00800080e18026514000f8100051005a6f6e65205247422b4343540000007e"
+)
+
+# A benchmark case is a name and a factory returning (operation, operations per call).
+# The factory is called once, so the setup cost is not measured.
+Benchmark = Tuple[str, Callable[[], Tuple[Callable[[], object], int]]]
+
+
+def _sample_commands(state: State) -> List[Command]:
+    return [
+        PingCommand(state),
+        PowerCommand(state, zone=2, power=True),
+        MasterPowerCommand(state, power=True),
+        BrightnessCommand(state, zone=2, brightness=128),
+        TemperatureCommand(state, zone=2, temperature=128),
+        RGBWCommand(state, zone=2, red=255, green=128, blue=64, white=1),
+        GetNumberOfZonesCommand(state),
+        GetZoneInfoCommand(state, zone=2),
+    ]
+
+
+def _encode_case(command: Command):
+    def factory():
+        return lambda: command.raw, 1
+
+    return factory
+
+
+def _pack_into_case(command: Command):
+    def factory():
+        buffer = bytearray(command.size)
+        return lambda: command.pack_into(buffer), 1
+
+    return factory
+
+
+def _encode_batch_case(frames: int = 256):
+    def factory():
+        state = State()
+        commands = [
+            RGBWCommand(
+                state, zone=zone % 16 + 1, red=zone % 256, green=1, blue=2, white=3
+            )
+            for zone in range(frames)
+        ]
+        return lambda: encode_batch(commands, state), frames
+
+    return factory
+
+
+def _parse_case(response_cls, raw: bytes):
+    def factory():
+        return lambda: response_cls(raw), 1
+
+    return factory
+
+
+def _buffer_case(create_buffer, chunk_size: int, messages: int = 64):
+    def factory():
+        stream = _NUMBER_OF_ZONES_RESPONSE * messages
+        chunks = [stream[i : i + chunk_size] for i in range(0, len(stream), chunk_size)]
+        buffer = create_buffer()
+
+        def run():
+            for chunk in chunks:
+                buffer.feed(chunk)
+                while buffer.is_message_ready:
+                    buffer.get_message()
+
+        return run, messages
+
+    return factory
+
+
+def _session_write_case(frames: int = 1000):
+    def factory():
+        # a command the relay does not respond to
+        data = PowerCommand(State(), zone=1, power=True).raw
+
+        async def scenario():
+            async with RelayEmulator() as relay:
+                async with Session(relay.host, relay.port) as session:
+                    for _ in range(frames):
+                        await session.write(data)
+
+        return lambda: asyncio.run(scenario()), frames
+
+    return factory
+
+
+def _session_write_many_case(frames: int = 1000, batch: int = 50):
+    def factory():
+        data = [PowerCommand(State(), zone=1, power=True).raw] * batch
+
+        async def scenario():
+            async with RelayEmulator() as relay:
+                async with Session(relay.host, relay.port) as session:
+                    for _ in range(frames // batch):
+                        await session.write_many(data)
+
+        return lambda: asyncio.run(scenario()), frames
+
+    return factory
+
+
+def _session_roundtrip_case(frames: int = 200):
+    def factory():
+        data = GetNumberOfZonesCommand(State()).raw
+
+        async def scenario():
+            async with RelayEmulator() as relay:
+                async with Session(relay.host, relay.port) as session:
+                    buffer = FrameBuffer()
+                    for _ in range(frames):
+                        await session.write(data)
+                        while not buffer.is_message_ready:
+                            buffer.feed(await session.read(4096))
+                        buffer.get_message()
+
+        return lambda: asyncio.run(scenario()), frames
+
+    return factory
+
+
+def benchmarks() -> Iterator[Benchmark]:
+    """Yield all available benchmark cases."""
+    for command in _sample_commands(State()):
+        yield f"encode.{type(command).__name__}", _encode_case(command)
+    for command in _sample_commands(State()):
+        yield f"pack_into.{type(command).__name__}", _pack_into_case(command)
+    yield "encode_batch.RGBWCommand", _encode_batch_case()
+    yield "parse.GetNumberOfZonesResponse", _parse_case(
+        GetNumberOfZonesResponse, _NUMBER_OF_ZONES_RESPONSE
+    )
+    yield "parse.GetZoneInfoResponse", _parse_case(
+        GetZoneInfoResponse, _ZONE_INFO_RESPONSE
+    )
+    for chunk_size in BUFFER_CHUNK_SIZES:
+        yield f"buffer.chunk_{chunk_size}", _buffer_case(
+            lambda: Buffer(TAIL), chunk_size
+        )
+    for chunk_size in BUFFER_CHUNK_SIZES:
+        yield f"frame_buffer.chunk_{chunk_size}", _buffer_case(FrameBuffer, chunk_size)
+    yield "session.write", _session_write_case()
+    yield "session.write_many", _session_write_many_case()
+    yield "session.roundtrip", _session_roundtrip_case()
+
+
+def measure(
+    operation: Callable[[], object],
+    ops_per_call: int = 1,
+    *,
+    min_time: float = 0.2,
+    repeat: int = 5,
+) -> Dict[str, float]:
+    """
+    Measure a time needed for one operation.
+
+    The number of calls per repeat is calibrated so that each repeat lasts
+    at least `min_time` seconds. The best repeat is reported, as it is the
+    least affected by other processes running on the machine.
+
+    Args:
+        operation: A callable to measure.
+        ops_per_call: How many logical operations a single call performs.
+        min_time: Minimal duration of one repeat in seconds.
+        repeat: How many times to repeat the measurement.
+
+    Returns:
+        Mapping with keys `ns_per_op`, `ops_per_sec`, `calls` and `repeat`.
+    """
+    calls = 1
+    while True:
+        elapsed = _timed(operation, calls)
+        if elapsed >= min_time * 1e9 or calls >= 1 << 24:
+            break
+        calls *= 10 if elapsed < min_time * 1e8 else 2
+
+    timings = [elapsed] + [_timed(operation, calls) for _ in range(repeat - 1)]
+    ns_per_op = min(timings) / (calls * ops_per_call)
+    return {
+        "ns_per_op": ns_per_op,
+        "ops_per_sec": 1e9 / ns_per_op if ns_per_op else float("inf"),
+        "calls": calls,
+        "repeat": repeat,
+    }
+
+
+def _timed(operation: Callable[[], object], calls: int) -> int:
+    start = time.perf_counter_ns()
+    for _ in range(calls):
+        operation()
+    return time.perf_counter_ns() - start
+
+
+def run(
+    pattern: Optional[str] = None, *, min_time: float = 0.2, repeat: int = 5
+) -> dict:
+    """
+    Run benchmarks and return machine-readable results.
+
+    Args:
+        pattern: Run only benchmarks whose name contains this substring.
+        min_time: See [`measure()`][skydance.benchmark.measure].
+        repeat: See [`measure()`][skydance.benchmark.measure].
+    """
+    results = {}
+    for name, factory in benchmarks():
+        if pattern and pattern not in name:
+            continue
+        operation, ops_per_call = factory()
+        results[name] = measure(
+            operation, ops_per_call, min_time=min_time, repeat=repeat
+        )
+    return {
+        "format": RESULTS_FORMAT,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "benchmarks": results,
+    }
+
+
+def profile(
+    operation: Callable[[], object], path: str, *, calls: int = 1
+) -> cProfile.Profile:
+    """
+    Profile an operation and dump its statistics to a file.
+
+    The file is in the [`pstats`](https://docs.python.org/3/library/profile.html)
+    format, so it can be inspected by `python -m pstats`, `snakeviz`
+    or converted to a flamegraph by `flameprof`.
+
+    Args:
+        operation: A callable to profile.
+        path: Where to write the statistics.
+        calls: How many times to call the operation.
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        for _ in range(calls):
+            operation()
+    finally:
+        profiler.disable()
+    profiler.dump_stats(path)
+    return profiler
+
+
+def run_profiles(
+    directory: str, pattern: Optional[str] = None, *, calls: int = 100
+) -> List[str]:
+    """
+    Profile benchmarks, writing `<benchmark name>.prof` files to a directory.
+
+    Args:
+        directory: An output directory, created if needed.
+        pattern: Profile only benchmarks whose name contains this substring.
+        calls: See [`profile()`][skydance.benchmark.profile].
+
+    Returns:
+        Paths of written files.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for name, factory in benchmarks():
+        if pattern and pattern not in name:
+            continue
+        operation, _ = factory()
+        path = os.path.join(directory, f"{name}.prof")
+        profile(operation, path, calls=calls)
+        paths.append(path)
+    return paths
+
+
+def compare(
+    base: dict, head: dict, *, threshold: float = 0.1
+) -> List[Tuple[str, float, float, float, bool]]:
+    """
+    Compare two results produced by [`run()`][skydance.benchmark.run].
+
+    Args:
+        base: Results of a baseline run.
+        head: Results of a run to be compared.
+        threshold: Relative slowdown considered a regression (0.1 = 10 %).
+
+    Returns:
+        List of `(name, base_ns, head_ns, relative_change, is_regression)`
+        for benchmarks present in both runs.
+    """
+    rows = []
+    for name, head_result in head["benchmarks"].items():
+        base_result = base["benchmarks"].get(name)
+        if base_result is None:
+            continue
+        base_ns, head_ns = base_result["ns_per_op"], head_result["ns_per_op"]
+        change = (head_ns - base_ns) / base_ns if base_ns else 0.0
+        rows.append((name, base_ns, head_ns, change, change > threshold))
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m skydance.benchmark", description=__doc__.splitlines()[1]
+    )
+    subparsers = parser.add_subparsers(dest="action", required=True)
+
+    run_parser = subparsers.add_parser("run", help="run benchmarks")
+    run_parser.add_argument("-o", "--output", help="write JSON results to a file")
+    run_parser.add_argument("-k", "--filter", help="run only matching benchmarks")
+    run_parser.add_argument("--min-time", type=float, default=0.2)
+    run_parser.add_argument("--repeat", type=int, default=5)
+
+    compare_parser = subparsers.add_parser("compare", help="compare two results")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("head")
+    compare_parser.add_argument("--threshold", type=float, default=0.1)
+
+    profile_parser = subparsers.add_parser("profile", help="dump cProfile stats")
+    profile_parser.add_argument("-o", "--output", default="profiles")
+    profile_parser.add_argument("-k", "--filter", help="profile only matching ones")
+    profile_parser.add_argument("--calls", type=int, default=100)
+
+    args = parser.parse_args(argv)
+
+    if args.action == "profile":
+        for path in run_profiles(args.output, args.filter, calls=args.calls):
+            print(path)
+        return 0
+
+    if args.action == "run":
+        results = run(args.filter, min_time=args.min_time, repeat=args.repeat)
+        dumped = json.dumps(results, indent=2, sort_keys=True)
+        if args.output:
+            with open(args.output, "w") as f:
+                f.write(dumped + "\n")
+            for name, result in results["benchmarks"].items():
+                print(f"{name:40} {result['ns_per_op']:12.1f} ns/op")
+        else:
+            print(dumped)
+        return 0
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.head) as f:
+        head = json.load(f)
+    rows = compare(base, head, threshold=args.threshold)
+    for name, base_ns, head_ns, change, regression in rows:
+        flag = "REGRESSION" if regression else ""
+        print(f"{name:40} {base_ns:12.1f} {head_ns:12.1f} {change:+8.1%} {flag}")
+    return 1 if any(row[4] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,444 @@
+"""
+Control Skydance Wi-Fi relays from a command line.
+
+All subcommands write one JSON object per operation to stdout, for example:
+
+    $ skydance discover 192.168.1.255 --broadcast
+    $ skydance power on 192.168.1.5 192.168.1.6 --zone 1-4
+    $ skydance rgbw 192.168.1.5 --zone 2 --color 255,0,0,0
+    $ skydance zones 192.168.1.5
+    $ skydance batch operations.ndjson --concurrency 256
+
+Batch mode reads newline-delimited JSON specs, for example:
+
+    {"host": "192.168.1.5", "command": "power", "zone": [1, 2], "power": false}
+    {"host": "98:d8:63:a5:9e:5c", "command": "brightness", "zone": 1, "brightness": 50}
+"""
+
+import argparse
+import asyncio
+import ipaddress
+import json
+import re
+import sys
+import time
+from typing import (
+    IO,
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Set,
+)
+
+from skydance.network.discovery import DiscoveryResult, discover_ips_by_mac
+from skydance.network.pool import SessionPool
+from skydance.network.session import Session
+from skydance.protocol import (
+    PORT,
+    BrightnessCommand,
+    Command,
+    GetNumberOfZonesCommand,
+    GetNumberOfZonesResponse,
+    GetZoneInfoCommand,
+    GetZoneInfoResponse,
+    MasterPowerCommand,
+    PingCommand,
+    PowerCommand,
+    RGBWCommand,
+    State,
+    TemperatureCommand,
+)
+
+
+# type aliases
+Spec = Mapping[str, Any]
+"""A single operation, e.g. `{"host": "192.168.1.5", "command": "ping"}`."""
+
+_MAC_RE = re.compile(r"^[0-9a-f]{2}([:-]?)[0-9a-f]{2}(\1[0-9a-f]{2}){4}$", re.I)
+
+# Frame numbers are allocated by a session, so a single state is enough.
+_STATE = State()
+
+
+def _zone_command(cls, *fields: str) -> Callable[[Spec], Command]:
+    return lambda spec: cls(
+        _STATE, zone=spec["zone"], **{field: spec[field] for field in fields}
+    )
+
+
+COMMANDS: Dict[str, Callable[[Spec], Command]] = {
+    "ping": lambda spec: PingCommand(_STATE),
+    "power": _zone_command(PowerCommand, "power"),
+    "master_power": lambda spec: MasterPowerCommand(_STATE, power=spec["power"]),
+    "brightness": _zone_command(BrightnessCommand, "brightness"),
+    "temperature": _zone_command(TemperatureCommand, "temperature"),
+    "rgbw": _zone_command(RGBWCommand, "red", "green", "blue", "white"),
+    "get_number_of_zones": lambda spec: GetNumberOfZonesCommand(_STATE),
+    "get_zone_info": _zone_command(GetZoneInfoCommand),
+}
+"""Command builders available for specs, by the `command` field."""
+
+
+def _zone_info(raw: bytes) -> Dict[str, Any]:
+    res = GetZoneInfoResponse(raw)
+    return {"type": res.type.name, "name": res.name}
+
+
+QUERIES: Dict[str, Callable[[bytes], Dict[str, Any]]] = {
+    "get_number_of_zones": lambda raw: {"zones": GetNumberOfZonesResponse(raw).zones},
+    "get_zone_info": _zone_info,
+}
+"""Commands expecting a response and parsers of their results."""
+
+
+def parse_zones(value: str) -> List[int]:
+    """
+    Parse zone numbers in a form like `1-4,7`.
+
+    Raise:
+        ValueError: If the format is invalid.
+    """
+    res: List[int] = []
+    for part in value.split(","):
+        first, _, last = part.partition("-")
+        res.extend(range(int(first), int(last or first) + 1))
+    return res
+
+
+def expand_spec(spec: Spec) -> Iterable[Spec]:
+    """Expand a spec with a list of zones into one spec per zone."""
+    zone = spec.get("zone")
+    if isinstance(zone, list):
+        for single in zone:
+            yield {**spec, "zone": single}
+    else:
+        yield spec
+
+
+def _index_macs(macs: Optional[DiscoveryResult]) -> Dict[str, List[str]]:
+    return {
+        mac.hex(): [str(ip) for ip in sorted(ips)] for mac, ips in (macs or {}).items()
+    }
+
+
+def _get_session(
+    pool: SessionPool, host: str, port: Optional[int], macs: Mapping[str, List[str]]
+) -> Session:
+    if _MAC_RE.match(host):
+        mac = re.sub("[:-]", "", host).lower()
+        try:
+            addresses = macs[mac]
+        except KeyError:
+            raise ValueError(f"Relay with MAC {host} was not discovered.") from None
+        # connections are raced across all IP addresses the relay responded from
+        return pool.get(mac, port, addresses=addresses)
+    return pool.get(host, port)
+
+
+class Executor:
+    """
+    Run operations described by specs over pooled sessions.
+
+    At most `concurrency` operations run at the same time. Operations for
+    the same relay are written in the order they were submitted.
+    """
+
+    def __init__(
+        self,
+        pool: SessionPool,
+        out: IO[str],
+        *,
+        concurrency: int = 64,
+        timeout: float = 10,
+        macs: Optional[DiscoveryResult] = None,
+    ):
+        """
+        Create an Executor.
+
+        Args:
+            pool: Sessions to use.
+            out: A stream for JSON results.
+            concurrency: Maximal number of operations in flight.
+            timeout: Timeout of a single operation in seconds.
+            macs: Discovered relays, used to resolve MAC addresses in specs.
+        """
+        self.pool = pool
+        self.out = out
+        self.timeout = timeout
+        self.macs = _index_macs(macs)
+        self.succeeded = 0
+        self.failed = 0
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, spec: Spec):
+        """Schedule a single spec, waiting while the concurrency limit is reached."""
+        for single in expand_spec(spec):
+            await self._semaphore.acquire()
+            task = asyncio.ensure_future(self._run(single))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, spec: Spec):
+        start = time.perf_counter()
+        res: Dict[str, Any] = {
+            key: spec[key] for key in ("id", "host", "command", "zone") if key in spec
+        }
+        try:
+            if "_error" in spec:
+                raise ValueError(spec["_error"])
+            name = spec["command"]
+            command = COMMANDS[name](spec)
+            session = _get_session(self.pool, spec["host"], spec.get("port"), self.macs)
+            res["result"] = await asyncio.wait_for(
+                self._execute(session, name, command), self.timeout
+            )
+            res["ok"] = True
+            self.succeeded += 1
+        except (KeyError, TypeError, ValueError, OSError, asyncio.TimeoutError) as e:
+            res["ok"] = False
+            res["error"] = f"{type(e).__name__}: {e}"
+            self.failed += 1
+        finally:
+            self._semaphore.release()
+        res["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        self.out.write(json.dumps(res) + "\n")
+
+    @staticmethod
+    async def _execute(session: Session, name: str, command: Command):
+        parse = QUERIES.get(name)
+        if parse is None:
+            await session.send(command)
+            return None
+        return parse(await session.request(command))
+
+    async def join(self):
+        """Wait for all submitted operations to finish."""
+        while self._tasks:
+            await asyncio.gather(*tuple(self._tasks))
+
+
+async def _read_specs(stream: IO[str]) -> AsyncIterator[Spec]:
+    loop = asyncio.get_running_loop()
+    line_number = 0
+    while True:
+        # read in batches, so that a thread hop is not needed for each line
+        lines = await loop.run_in_executor(None, stream.readlines, 1 << 16)
+        if not lines:
+            return
+        for line in lines:
+            line_number += 1
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                spec = json.loads(line)
+            except ValueError as e:
+                spec = {"_error": f"Invalid JSON: {e}"}
+            if not isinstance(spec, dict):
+                spec = {"_error": "Spec must be a JSON object."}
+            yield {"id": f"line {line_number}", **spec}
+
+
+def _specs_from_args(args) -> Iterable[Spec]:
+    zones = getattr(args, "zone", None)
+    for host in args.hosts:
+        base = {"host": host, "command": args.command}
+        if args.command in ("power", "master_power"):
+            base["power"] = args.state == "on"
+        elif args.command in ("brightness", "temperature"):
+            base[args.command] = args.value
+        elif args.command == "rgbw":
+            base.update(zip(("red", "green", "blue", "white"), args.color))
+        if zones is not None:
+            base["zone"] = zones
+        yield base
+
+
+async def _discover_macs(args) -> Optional[DiscoveryResult]:
+    if not args.discover:
+        return None
+    return await discover_ips_by_mac(args.discover, broadcast=True)
+
+
+async def _run_specs(args, specs) -> int:
+    macs = await _discover_macs(args)
+    start = time.perf_counter()
+    async with SessionPool(port=args.port) as pool:
+        executor = Executor(
+            pool,
+            sys.stdout,
+            concurrency=args.concurrency,
+            timeout=args.timeout,
+            macs=macs,
+        )
+        if isinstance(specs, Iterable):
+            for spec in specs:
+                await executor.submit(spec)
+        else:
+            async for spec in specs:
+                await executor.submit(spec)
+        await executor.join()
+    elapsed = time.perf_counter() - start
+    total = executor.succeeded + executor.failed
+    print(
+        f"{total} operations, {executor.failed} failed, {elapsed:.3f} s, "
+        f"{total / elapsed if elapsed else 0:.0f} ops/s",
+        file=sys.stderr,
+    )
+    return 1 if executor.failed else 0
+
+
+async def _zones(args) -> int:
+    macs = _index_macs(await _discover_macs(args))
+
+    async def list_zones(pool: SessionPool, host: str) -> bool:
+        start = time.perf_counter()
+        res: Dict[str, Any] = {"host": host}
+        try:
+            session = _get_session(pool, host, None, macs)
+            raw = await asyncio.wait_for(
+                session.request(GetNumberOfZonesCommand(_STATE)), args.timeout
+            )
+            res["zones"] = []
+            for zone in GetNumberOfZonesResponse(raw).zones:
+                raw = await asyncio.wait_for(
+                    session.request(GetZoneInfoCommand(_STATE, zone=zone)),
+                    args.timeout,
+                )
+                res["zones"].append({"zone": zone, **_zone_info(raw)})
+            res["ok"] = True
+        except (ValueError, OSError, asyncio.TimeoutError) as e:
+            res["ok"] = False
+            res["error"] = f"{type(e).__name__}: {e}"
+        res["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        print(json.dumps(res))
+        return res["ok"]
+
+    async with SessionPool(port=args.port) as pool:
+        results = await asyncio.gather(*(list_zones(pool, h) for h in args.hosts))
+    return 0 if all(results) else 1
+
+
+async def _discover(args) -> int:
+    res = await discover_ips_by_mac(
+        args.ip, broadcast=args.broadcast, retry=args.retry, sleep=args.sleep
+    )
+    for mac, ips in res.items():
+        print(json.dumps({"mac": mac.hex(":"), "ips": sorted(map(str, ips))}))
+    return 0
+
+
+def _byte(value: str) -> int:
+    res = int(value)
+    if not 0 <= res <= 255:
+        raise argparse.ArgumentTypeError("value must be between 0 and 255")
+    return res
+
+
+def _color(value: str) -> List[int]:
+    res = [_byte(component) for component in value.split(",")]
+    if len(res) != 4:
+        raise argparse.ArgumentTypeError("color must be in a form R,G,B,W")
+    return res
+
+
+def _zones_arg(value: str) -> List[int]:
+    try:
+        return parse_zones(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("zones must be in a form like 1-4,7")
+
+
+def _host(value: str) -> str:
+    if _MAC_RE.match(value):
+        return value
+    try:
+        return str(ipaddress.ip_address(value))
+    except ValueError:
+        return value  # hostname
+
+
+def build_parser() -> argparse.ArgumentParser:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--port", type=int, default=PORT)
+    common.add_argument(
+        "--concurrency", type=int, default=64, help="maximal operations in flight"
+    )
+    common.add_argument(
+        "--timeout", type=float, default=10, help="timeout of one operation [s]"
+    )
+    common.add_argument(
+        "--discover",
+        metavar="BROADCAST_IP",
+        help="resolve relays given by MAC address using discovery",
+    )
+
+    parser = argparse.ArgumentParser(
+        prog="skydance",
+        description=__doc__.splitlines()[1],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="\n".join(__doc__.splitlines()[3:]),
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    discover = subparsers.add_parser("discover", help="discover relays")
+    discover.add_argument("ip", help="relay IP or broadcast address")
+    discover.add_argument("--broadcast", action="store_true")
+    discover.add_argument("--retry", type=int, default=3)
+    discover.add_argument("--sleep", type=float, default=1)
+
+    def targets(name, help, zones=True, state=False):
+        sub = subparsers.add_parser(name, help=help, parents=[common])
+        if state:
+            sub.add_argument("state", choices=("on", "off"))
+        sub.add_argument("hosts", nargs="+", type=_host, metavar="HOST|MAC")
+        if zones:
+            sub.add_argument(
+                "--zone", type=_zones_arg, required=True, help="e.g. 1-4,7"
+            )
+        return sub
+
+    targets("ping", "ping relays", zones=False)
+    targets("power", "power zones on/off", state=True)
+    targets("master_power", "power all zones on/off", zones=False, state=True)
+    sub = targets("brightness", "set brightness of zones")
+    sub.add_argument("--value", type=_byte, required=True)
+    sub = targets("temperature", "set white temperature of zones")
+    sub.add_argument("--value", type=_byte, required=True)
+    sub = targets("rgbw", "set color of zones")
+    sub.add_argument("--color", type=_color, required=True, metavar="R,G,B,W")
+    targets("zones", "list zones of relays", zones=False)
+
+    batch = subparsers.add_parser(
+        "batch", help="run newline-delimited JSON specs", parents=[common]
+    )
+    batch.add_argument(
+        "file", nargs="?", default="-", help="a file with specs (default: stdin)"
+    )
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    if args.command == "discover":
+        return asyncio.run(_discover(args))
+    if args.command == "zones":
+        return asyncio.run(_zones(args))
+    if args.command == "batch":
+        if args.file == "-":
+            return asyncio.run(_run_specs(args, _read_specs(sys.stdin)))
+        with open(args.file) as f:
+            return asyncio.run(_run_specs(args, _read_specs(f)))
+    return asyncio.run(_run_specs(args, _specs_from_args(args)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
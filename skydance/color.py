@@ -0,0 +1,261 @@
+from typing import Tuple
+
+from skydance.protocol import COMMAND_MAGIC, HEAD, RGBWCommand, State
+
+
+GAMMA = 2.2
+"""Gamma used for [GAMMA_LUT][skydance.color.GAMMA_LUT]."""
+
+GAMMA_LUT = bytes(
+    max(1, round(255 * (i / 255) ** GAMMA)) if i else 0 for i in range(256)
+)
+"""
+Map a linear color component level (0-255) to a gamma corrected one.
+
+Non-zero levels map to at least 1, so a dim color does not turn black
+(which [`RGBWCommand`][skydance.protocol.RGBWCommand] rejects).
+"""
+
+
+def _lightness_to_luminance(lightness: float) -> float:
+    # inverse of CIE 1976 L* (lightness in 0-100, luminance in 0-1)
+    if lightness <= 8:
+        return lightness / 903.3
+    return ((lightness + 16) / 116) ** 3
+
+
+BRIGHTNESS_LUT = bytes(
+    max(1, round(255 * _lightness_to_luminance(i / 255 * 100))) for i in range(256)
+)
+"""
+Map a perceptual brightness level (0-255) to a brightness byte (1-255).
+
+Equal steps of the perceptual level look like equal steps of brightness
+to a human eye. The output is suitable for
+[`BrightnessCommand`][skydance.protocol.BrightnessCommand].
+"""
+
+WARMEST_KELVIN = 2700
+"""A color temperature of the warmest white of a typical CCT strip."""
+
+COLDEST_KELVIN = 6500
+"""A color temperature of the coldest white of a typical CCT strip."""
+
+
+# For each hue sector, indexes into (value, q, p, t) for red, green and blue.
+_HSV_CHANNELS = ((0, 3, 2), (1, 0, 2), (2, 0, 3), (2, 1, 0), (3, 2, 0), (0, 2, 1))
+
+
+def hsv_to_rgbw(
+    hue: float, saturation: float, value: float
+) -> Tuple[int, int, int, int]:
+    """
+    Convert a HSV color to gamma corrected RGBW components.
+
+    The common part of red, green and blue is moved to the white channel.
+
+    Args:
+        hue: A hue in degrees (any value, it wraps around 360).
+        saturation: A saturation between 0-1.
+        value: A value between 0-1.
+
+    Returns:
+        Red, green, blue and white levels for
+        [`RGBWCommand`][skydance.protocol.RGBWCommand]. If the value
+        is zero (below 1/510), all levels are zero - power the zone off instead.
+    """
+    hue = (hue / 60) % 6
+    saturation = min(max(saturation, 0), 1)
+    value = min(max(value, 0), 1)
+
+    # the modulo may round a tiny negative hue up to exactly 6.0
+    sector = int(hue) % 6
+    fraction = hue - int(hue)
+    table = (
+        value,
+        value * (1 - saturation * fraction),
+        value * (1 - saturation),
+        value * (1 - saturation * (1 - fraction)),
+    )
+    red, green, blue = (table[i] for i in _HSV_CHANNELS[sector])
+    white = min(red, green, blue)
+    return (
+        GAMMA_LUT[round((red - white) * 255)],
+        GAMMA_LUT[round((green - white) * 255)],
+        GAMMA_LUT[round((blue - white) * 255)],
+        GAMMA_LUT[round(white * 255)],
+    )
+
+
+def perceptual_brightness(level: float) -> int:
+    """
+    Convert a perceptual brightness level to a brightness byte.
+
+    Args:
+        level: A perceptual brightness level between 0-1.
+
+    Returns:
+        A brightness level between 1-255 for
+        [`BrightnessCommand`][skydance.protocol.BrightnessCommand].
+    """
+    return BRIGHTNESS_LUT[round(min(max(level, 0), 1) * 255)]
+
+
+def kelvin_to_temperature(
+    kelvin: float, *, warmest: float = WARMEST_KELVIN, coldest: float = COLDEST_KELVIN
+) -> int:
+    """
+    Convert a color temperature to a temperature byte.
+
+    The interpolation is linear in mireds, which is closer to human
+    perception than linear in Kelvins. Out-of-range values are clamped.
+
+    Args:
+        kelvin: A color temperature in Kelvins.
+        warmest: A color temperature of the warmest white of a zone.
+        coldest: A color temperature of the coldest white of a zone.
+
+    Returns:
+        A temperature level between 0-255 (higher = more cold) for
+        [`TemperatureCommand`][skydance.protocol.TemperatureCommand].
+
+    Raise:
+        ValueError: If the color temperature is not positive.
+    """
+    if not kelvin > 0:
+        raise ValueError("Color temperature must be positive.")
+    ratio = (1 / warmest - 1 / kelvin) / (1 / warmest - 1 / coldest)
+    return round(min(max(ratio, 0), 1) * 255)
+
+
+# batch conversions follow
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError as e:
+        raise ImportError("NumPy is required for batch conversions.") from e
+    return numpy
+
+
+def hsv_to_rgbw_array(hsv):
+    """
+    Convert an array of HSV colors to gamma corrected RGBW components.
+
+    Vectorized version of [`hsv_to_rgbw()`][skydance.color.hsv_to_rgbw].
+    Requires NumPy.
+
+    Args:
+        hsv: An array of shape `(n, 3)` with hue (degrees), saturation
+            and value (both 0-1) columns.
+
+    Returns:
+        An `uint8` array of shape `(n, 4)` with red, green, blue and white columns.
+    """
+    np = _numpy()
+    hsv = np.asarray(hsv, dtype=np.float64)
+    hue = (hsv[:, 0] / 60) % 6
+    saturation = np.clip(hsv[:, 1], 0, 1)
+    value = np.clip(hsv[:, 2], 0, 1)
+
+    whole = hue.astype(np.intp)
+    fraction = hue - whole
+    sector = whole % 6
+    p = value * (1 - saturation)
+    q = value * (1 - saturation * fraction)
+    t = value * (1 - saturation * (1 - fraction))
+    table = np.stack([value, q, p, t], axis=1)
+    rgb = np.take_along_axis(table, np.array(_HSV_CHANNELS)[sector], axis=1)
+
+    white = rgb.min(axis=1, keepdims=True)
+    linear = np.rint(np.concatenate([rgb - white, white], axis=1) * 255)
+    return np.frombuffer(GAMMA_LUT, dtype=np.uint8)[linear.astype(np.intp)]
+
+
+def perceptual_brightness_array(levels):
+    """
+    Vectorized version of [`perceptual_brightness()`][skydance.color.perceptual_brightness].
+
+    Requires NumPy.
+    """
+    np = _numpy()
+    levels = np.rint(np.clip(np.asarray(levels, dtype=np.float64), 0, 1) * 255)
+    return np.frombuffer(BRIGHTNESS_LUT, dtype=np.uint8)[levels.astype(np.intp)]
+
+
+def kelvin_to_temperature_array(
+    kelvins, *, warmest: float = WARMEST_KELVIN, coldest: float = COLDEST_KELVIN
+):
+    """
+    Vectorized version of [`kelvin_to_temperature()`][skydance.color.kelvin_to_temperature].
+
+    Requires NumPy.
+
+    Raise:
+        ValueError: If any color temperature is not positive.
+    """
+    np = _numpy()
+    kelvins = np.asarray(kelvins, dtype=np.float64)
+    if not (kelvins > 0).all():
+        raise ValueError("Color temperature must be positive.")
+    ratio = (1 / warmest - 1 / kelvins) / (1 / warmest - 1 / coldest)
+    return np.rint(np.clip(ratio, 0, 1) * 255).astype(np.uint8)
+
+
+_RGBW_TEMPLATE = RGBWCommand(State(), zone=1, red=0, green=0, blue=0, white=1).encode(
+    bytes([0])
+)
+_FRAME_NUMBER_OFFSET = len(HEAD)
+_ZONE_OFFSET = _FRAME_NUMBER_OFFSET + 1 + len(COMMAND_MAGIC)
+_RGBW_OFFSET = _ZONE_OFFSET + 2 + 3
+
+
+def _is_integral(np, array) -> bool:
+    if np.issubdtype(array.dtype, np.integer):
+        return True
+    # NaN is not equal to anything, so it is rejected as well
+    return bool((array == np.rint(array)).all())
+
+
+def encode_rgbw_frames(zones, rgbw, state: State) -> bytes:
+    """
+    Encode many RGBW commands at once, without creating command objects.
+
+    The result is the same as concatenated
+    [`RGBWCommand.raw`][skydance.protocol.Command.raw] outputs with
+    consecutive frame numbers allocated from the state. Requires NumPy.
+
+    Args:
+        zones: An array of shape `(n,)` with zone numbers between 1-16.
+        rgbw: An array of shape `(n, 4)` with red, green, blue and white levels,
+            e.g. from [`hsv_to_rgbw_array()`][skydance.color.hsv_to_rgbw_array].
+        state: A state used to allocate frame numbers.
+
+    Raise:
+        ValueError: If any zone number or color is invalid, including a color
+            with all levels zero (power the zone off instead) and levels
+            which are not whole numbers (round them first).
+    """
+    np = _numpy()
+    zones = np.asarray(zones)
+    rgbw = np.asarray(rgbw)
+    count = len(zones)
+    if rgbw.shape != (count, 4):
+        raise ValueError("Colors must be an array of shape (n, 4).")
+    if not (_is_integral(np, zones) and _is_integral(np, rgbw)):
+        raise ValueError("Zone numbers and component levels must be whole numbers.")
+    if count and (zones.min() < 1 or zones.max() > 16):
+        raise ValueError("Zone number must be between 1 and 16.")
+    if count and (rgbw.min() < 0 or rgbw.max() > 255):
+        raise ValueError("Component level must fit into one byte.")
+    if not rgbw.any(axis=1).all():
+        raise ValueError("At least one color component must be set to non-zero.")
+
+    frames = np.tile(np.frombuffer(_RGBW_TEMPLATE, dtype=np.uint8), (count, 1))
+    first = state.allocate_frame_numbers(count)
+    frames[:, _FRAME_NUMBER_OFFSET] = (first + np.arange(count)) % 256
+    masks = np.left_shift(1, zones.astype(np.uint16) - 1).astype("<u2")
+    frames[:, _ZONE_OFFSET : _ZONE_OFFSET + 2] = masks.view(np.uint8).reshape(count, 2)
+    frames[:, _RGBW_OFFSET : _RGBW_OFFSET + 4] = rgbw
+    return frames.tobytes()
@@ -0,0 +1,84 @@
+from typing import List, NamedTuple, Optional, Union
+
+from skydance.network.buffer import FrameBuffer
+from skydance.protocol import Command, Response, State, parse_response
+
+
+class MalformedFrame(NamedTuple):
+    """An event emitted for a frame which cannot be parsed at all."""
+
+    raw: bytes
+    error: str
+
+
+Event = Union[Response, MalformedFrame]
+"""
+An event emitted by [`Connection.receive_data()`][skydance.connection.Connection.receive_data].
+
+Recognized responses are instances of specific [Response][skydance.protocol.Response]
+subclasses, other well-formed responses are
+[`UnknownResponse`][skydance.protocol.UnknownResponse].
+"""
+
+
+class Connection:
+    """
+    A Sans-I/O connection to a single relay.
+
+    It numbers outgoing frames and turns incoming bytes into typed events,
+    without doing any I/O itself. It can be driven by asyncio, trio, threads
+    or any custom loop.
+
+    Example:
+        >>> conn = Connection()
+        >>> sock.sendall(conn.send(GetNumberOfZonesCommand(conn.state)))
+        >>> while True:
+        >>>     for event in conn.receive_data(sock.recv(4096)):
+        >>>         if isinstance(event, GetNumberOfZonesResponse):
+        >>>             print(event.zones)
+    """
+
+    def __init__(self, state: Optional[State] = None):
+        """
+        Create a Connection.
+
+        Args:
+            state: A state used for frame numbering. A new one is created by default.
+        """
+        self.state = State() if state is None else state
+        self._buffer = FrameBuffer()
+
+    def send(self, command: Command) -> bytes:
+        """
+        Return bytes of a command to be sent and advance the frame number.
+
+        Args:
+            command: A command to send. A `state` it was created with is not used.
+        """
+        return command.encode(self.state.allocate_frame_number())
+
+    def receive_data(self, data: bytes) -> List[Event]:
+        """
+        Feed bytes received from a relay and return all completed events.
+
+        Args:
+            data: Bytes of any length.
+        """
+        self._buffer.feed(data)
+        events: List[Event] = []
+        while self._buffer.is_message_ready:
+            raw = self._buffer.get_message()
+            try:
+                events.append(parse_response(raw))
+            except ValueError as e:
+                events.append(MalformedFrame(raw, str(e)))
+        return events
+
+    @property
+    def discarded_bytes(self) -> int:
+        """Return total number of received bytes which were not a part of any frame."""
+        return self._buffer.discarded_bytes
+
+    def reset(self):
+        """Drop partially received data, e.g. after the transport was re-created."""
+        self._buffer.reset()
@@ -0,0 +1,269 @@
+import sys
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from skydance.enum import ZoneType
+from skydance.protocol import (
+    GetNumberOfZonesCommand,
+    GetNumberOfZonesResponse,
+    GetZoneInfoCommand,
+    GetZoneInfoResponse,
+    State,
+)
+
+
+# type aliases
+MacAddress = bytes
+ZoneKey = Tuple[MacAddress, int]
+
+
+class Relay:
+    """Metadata of a single relay."""
+
+    __slots__ = ("mac", "host")
+
+    def __init__(self, mac: MacAddress, host: Optional[str] = None):
+        """
+        Create a Relay.
+
+        Args:
+            mac: A MAC address of the relay.
+            host: An IP address or hostname of the relay, if known.
+        """
+        self.mac = mac
+        self.host = host
+
+    def __repr__(self):
+        return f"Relay(mac={self.mac.hex(':')!r}, host={self.host!r})"
+
+
+class Zone:
+    """
+    Metadata of a single zone.
+
+    Unlike [`GetZoneInfoResponse`][skydance.protocol.GetZoneInfoResponse],
+    no raw bytes are kept. Zones of one relay share a single
+    [Relay][skydance.fleet.Relay] record and names are interned.
+    """
+
+    __slots__ = ("relay", "zone", "type", "name")
+
+    def __init__(self, relay: Relay, zone: int, type: ZoneType, name: str):
+        """
+        Create a Zone.
+
+        Args:
+            relay: A relay the zone belongs to.
+            zone: A zone number (1-16).
+            type: A zone type.
+            name: A zone name.
+        """
+        self.relay = relay
+        self.zone = zone
+        self.type = type
+        self.name = name
+
+    @property
+    def key(self) -> ZoneKey:
+        """Return a `(mac, zone)` pair identifying the zone in a fleet."""
+        return self.relay.mac, self.zone
+
+    def __repr__(self):
+        return (
+            f"Zone(relay={self.relay.mac.hex(':')!r}, zone={self.zone}, "
+            f"type={self.type.name}, name={self.name!r})"
+        )
+
+
+def _unindex(index: Dict[Any, Dict[ZoneKey, Zone]], value: Any, key: ZoneKey):
+    bucket = index[value]
+    del bucket[key]
+    if not bucket:
+        del index[value]
+
+
+class FleetRegistry:
+    """
+    An in-memory registry of relays and their zones.
+
+    All lookups (by `(mac, zone)`, by name and by [ZoneType][skydance.enum.ZoneType])
+    are dictionary based, so they take constant time regardless of the fleet size.
+    Zone names don't have to be unique, so name and type lookups return lists.
+
+    Example:
+        >>> fleet = FleetRegistry()
+        >>> async with Session(ip, PORT) as session:
+        >>>     await fleet.load(session, mac, host=ip)
+        >>> for zone in fleet.by_name("Kitchen"):
+        >>>     print(zone.relay.host, zone.zone)
+    """
+
+    def __init__(self):
+        """Create an empty FleetRegistry."""
+        self._relays: Dict[MacAddress, Relay] = {}
+        self._zones: Dict[ZoneKey, Zone] = {}
+        self._by_name: Dict[str, Dict[ZoneKey, Zone]] = {}
+        self._by_type: Dict[ZoneType, Dict[ZoneKey, Zone]] = {}
+
+    def __len__(self) -> int:
+        """Return number of zones."""
+        return len(self._zones)
+
+    def __iter__(self) -> Iterator[Zone]:
+        """Iterate over all zones."""
+        return iter(tuple(self._zones.values()))
+
+    def __contains__(self, key: ZoneKey) -> bool:
+        return key in self._zones
+
+    @property
+    def relays(self) -> List[Relay]:
+        """Return all relays."""
+        return list(self._relays.values())
+
+    def relay(self, mac: MacAddress) -> Relay:
+        """
+        Return a relay by its MAC address.
+
+        Raise:
+            KeyError: If there is no such relay.
+        """
+        return self._relays[mac]
+
+    def add_relay(self, mac: MacAddress, host: Optional[str] = None) -> Relay:
+        """
+        Add a relay or update its host if it is already registered.
+
+        Args:
+            mac: A MAC address of the relay.
+            host: An IP address or hostname of the relay.
+        """
+        try:
+            relay = self._relays[mac]
+        except KeyError:
+            relay = self._relays[mac] = Relay(mac, host)
+        else:
+            if host is not None:
+                relay.host = host
+        return relay
+
+    def remove_relay(self, mac: MacAddress):
+        """
+        Remove a relay and all its zones.
+
+        Raise:
+            KeyError: If there is no such relay.
+        """
+        for record in self.zones_of(mac):
+            self.remove_zone(mac, record.zone)
+        del self._relays[mac]
+
+    def add_zone(self, mac: MacAddress, zone: int, type: ZoneType, name: str) -> Zone:
+        """
+        Add a zone or replace its metadata. The relay is added if needed.
+
+        Args:
+            mac: A MAC address of the relay.
+            zone: A zone number (1-16).
+            type: A zone type.
+            name: A zone name.
+        """
+        key = mac, zone
+        if key in self._zones:
+            self.remove_zone(mac, zone)
+        record = Zone(self.add_relay(mac), zone, type, sys.intern(name))
+        self._zones[key] = record
+        self._by_name.setdefault(record.name, {})[key] = record
+        self._by_type.setdefault(type, {})[key] = record
+        return record
+
+    def remove_zone(self, mac: MacAddress, zone: int):
+        """
+        Remove a single zone.
+
+        Raise:
+            KeyError: If there is no such zone.
+        """
+        key = mac, zone
+        record = self._zones.pop(key)
+        _unindex(self._by_name, record.name, key)
+        _unindex(self._by_type, record.type, key)
+
+    def get(self, mac: MacAddress, zone: int) -> Zone:
+        """
+        Return a zone by its relay MAC address and number.
+
+        Raise:
+            KeyError: If there is no such zone.
+        """
+        return self._zones[mac, zone]
+
+    def by_name(self, name: str) -> List[Zone]:
+        """Return all zones with exactly this name."""
+        return list(self._by_name.get(name, {}).values())
+
+    def by_type(self, type: ZoneType) -> List[Zone]:
+        """Return all zones of a given type."""
+        return list(self._by_type.get(type, {}).values())
+
+    def zones_of(self, mac: MacAddress) -> List[Zone]:
+        """Return all zones of a relay, ordered by zone number."""
+        return [self._zones[mac, zone] for zone in range(1, 17) if (mac, zone) in self]
+
+    def update_zones(self, mac: MacAddress, response: GetNumberOfZonesResponse):
+        """
+        Remove zones of a relay which are no longer available.
+
+        Args:
+            mac: A MAC address of the relay.
+            response: A response for
+                [`GetNumberOfZonesCommand`][skydance.protocol.GetNumberOfZonesCommand].
+        """
+        self.add_relay(mac)
+        available = set(response.zones)
+        for record in self.zones_of(mac):
+            if record.zone not in available:
+                self.remove_zone(mac, record.zone)
+
+    def update_zone(
+        self, mac: MacAddress, zone: int, response: GetZoneInfoResponse
+    ) -> Zone:
+        """
+        Add or update a zone from its info response.
+
+        The response object is not referenced afterwards.
+
+        Args:
+            mac: A MAC address of the relay.
+            zone: A zone number the response was requested for.
+            response: A response for
+                [`GetZoneInfoCommand`][skydance.protocol.GetZoneInfoCommand].
+
+        Raise:
+            ValueError: If the zone type is unknown.
+        """
+        return self.add_zone(mac, zone, response.type, response.name)
+
+    async def load(self, session, mac: MacAddress, *, host: Optional[str] = None):
+        """
+        Query a relay for its zones and register them.
+
+        Args:
+            session: A connected [Session][skydance.network.session.Session].
+            mac: A MAC address of the relay.
+            host: An IP address or hostname of the relay.
+
+        Returns:
+            Registered zones of the relay.
+        """
+        state = State()
+        self.add_relay(mac, host)
+        zones = GetNumberOfZonesResponse(
+            await session.request(GetNumberOfZonesCommand(state))
+        )
+        self.update_zones(mac, zones)
+        for zone in zones.zones:
+            info = GetZoneInfoResponse(
+                await session.request(GetZoneInfoCommand(state, zone=zone))
+            )
+            self.update_zone(mac, zone, info)
+        return self.zones_of(mac)
@@ -0,0 +1,467 @@
+"""
+End-to-end load generator driving many relays through the whole network stack.
+
+Drive 500 emulated relays at 10 000 commands per second for 30 seconds:
+
+    $ python -m skydance.loadgen --emulate 500 --rate 10000 --duration 30
+
+Drive real relays (given explicitly or discovered by broadcast) with
+a closed-loop model, i.e. at most `--concurrency` commands in flight:
+
+    $ python -m skydance.loadgen --host 192.168.1.5 --model closed --rate 50
+    $ python -m skydance.loadgen --discover 192.168.1.255 --rate 50
+
+Relays controlled by the load generator are switched randomly - never point it
+at an installation someone is actually using.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import random
+import sys
+import time
+from typing import (
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+)
+
+from skydance.metrics import InMemoryMetrics
+from skydance.network.emulator import DEFAULT_ZONES, RelayEmulator
+from skydance.network.pool import SessionPool
+from skydance.network.session import Session
+from skydance.protocol import (
+    PORT,
+    BrightnessCommand,
+    GetZoneInfoCommand,
+    GetZoneInfoResponse,
+    PowerCommand,
+    RGBWCommand,
+)
+
+
+OPEN_LOOP = "open"
+"""New commands arrive at the target rate regardless of completed ones."""
+
+CLOSED_LOOP = "closed"
+"""A fixed number of workers issue a next command once the previous one completes."""
+
+DEFAULT_MIX: Mapping[str, float] = {
+    "power": 0.3,
+    "brightness": 0.3,
+    "rgbw": 0.3,
+    "zone_info": 0.1,
+}
+"""Default relative weights of operations, see [OPERATIONS][skydance.loadgen.OPERATIONS]."""
+
+# An operation sends one command to a zone of a session.
+Operation = Callable[[Session, int, random.Random], Awaitable[object]]
+
+
+async def _power(session: Session, zone: int, rng: random.Random):
+    await session.send(PowerCommand(session.state, zone=zone, power=rng.random() < 0.5))
+
+
+async def _brightness(session: Session, zone: int, rng: random.Random):
+    await session.send(
+        BrightnessCommand(session.state, zone=zone, brightness=rng.randint(1, 255))
+    )
+
+
+async def _rgbw(session: Session, zone: int, rng: random.Random):
+    red, green, blue = (rng.randint(0, 255) for _ in range(3))
+    white = rng.randint(1, 255)
+    await session.send(
+        RGBWCommand(
+            session.state, zone=zone, red=red, green=green, blue=blue, white=white
+        )
+    )
+
+
+async def _zone_info(session: Session, zone: int, rng: random.Random):
+    response = GetZoneInfoResponse(
+        await session.request(GetZoneInfoCommand(session.state, zone=zone))
+    )
+    # a response to another query must not be counted as completed
+    if response.zone != 1 << (zone - 1):
+        raise ValueError(f"Received zone info of zone mask {response.zone}.")
+
+
+OPERATIONS: Mapping[str, Operation] = {
+    "power": _power,
+    "brightness": _brightness,
+    "rgbw": _rgbw,
+    "zone_info": _zone_info,
+}
+"""Operations available for a mix: writes of commands and a zone info query."""
+
+
+class LoadReport(NamedTuple):
+    """Results of a load generator run. Durations are in seconds."""
+
+    model: str
+    target_rate: float
+    relays: int
+    duration: float
+    completed: int
+    errors: int
+    throughput: float
+    latency_p50: float
+    latency_p95: float
+    latency_p99: float
+    latency_max: float
+    connects: int
+    reconnects: int
+    loop_lag_p99: float
+    loop_lag_max: float
+    completed_by_operation: Dict[str, int]
+
+    def format(self) -> str:
+        """Return a human readable summary."""
+        ms = 1e3
+        return "\n".join(
+            [
+                f"model:       {self.model}-loop, {self.relays} relays, "
+                f"target {self.target_rate:g} ops/s",
+                f"completed:   {self.completed} ops in {self.duration:.2f} s "
+                f"({self.throughput:.1f} ops/s), {self.errors} errors",
+                f"latency:     p50 {self.latency_p50 * ms:.2f} ms, "
+                f"p95 {self.latency_p95 * ms:.2f} ms, "
+                f"p99 {self.latency_p99 * ms:.2f} ms, "
+                f"max {self.latency_max * ms:.2f} ms",
+                f"connections: {self.connects} connects, {self.reconnects} reconnects",
+                f"loop lag:    p99 {self.loop_lag_p99 * ms:.2f} ms, "
+                f"max {self.loop_lag_max * ms:.2f} ms",
+            ]
+        )
+
+
+def percentile(values: Sequence[float], percent: float) -> float:
+    """
+    Return a nearest-rank percentile of values (zero if there are none).
+
+    Args:
+        values: Values sorted in ascending order.
+        percent: A percentile between 0-100.
+    """
+    if not values:
+        return 0.0
+    rank = max(math.ceil(percent / 100 * len(values)), 1)
+    return values[rank - 1]
+
+
+class _LoopLagMonitor:
+    """Measure how late the event loop wakes up a sleeping task."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.lags: List[float] = []
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(time.perf_counter() - start - self.interval, 0.0))
+
+
+class _Run:
+    """State of a single load generator run."""
+
+    def __init__(
+        self,
+        sessions: Sequence[Session],
+        mix: Mapping[str, float],
+        zones: Sequence[int],
+        timeout: float,
+        seed: Optional[int],
+    ):
+        unknown = set(mix) - set(OPERATIONS)
+        if unknown:
+            raise ValueError(
+                f"Unknown operations in mix: {', '.join(sorted(unknown))}."
+            )
+        if not sessions:
+            raise ValueError("At least one relay is required.")
+        self.sessions = sessions
+        self.names = [name for name, weight in mix.items() if weight > 0]
+        if not self.names:
+            raise ValueError("At least one operation must have a positive weight.")
+        self.weights = [mix[name] for name in self.names]
+        self.zones = zones
+        self.timeout = timeout
+        self.rng = random.Random(seed)
+        self.latencies: List[float] = []
+        self.completed: Dict[str, int] = dict.fromkeys(self.names, 0)
+        self.errors = 0
+
+    async def execute(self, scheduled: float):
+        """Execute a random operation, measuring latency since it was scheduled."""
+        (name,) = self.rng.choices(self.names, self.weights)
+        session = self.rng.choice(self.sessions)
+        zone = self.rng.choice(self.zones)
+        try:
+            await asyncio.wait_for(
+                OPERATIONS[name](session, zone, self.rng), self.timeout
+            )
+        except (OSError, ValueError, asyncio.TimeoutError):
+            self.errors += 1
+            return
+        self.latencies.append(time.perf_counter() - scheduled)
+        self.completed[name] += 1
+
+    async def open_loop(self, rate: float, duration: float):
+        # Latency is measured from the scheduled arrival, not from the actual
+        # start, so a stalled loop does not hide its own delay
+        # (the "coordinated omission" problem).
+        in_flight: Set["asyncio.Task[None]"] = set()
+        start = time.perf_counter()
+        total = int(rate * duration)
+        issued = 0
+        while issued < total:
+            now = time.perf_counter()
+            due = min(int((now - start) * rate) + 1, total)
+            while issued < due:
+                task = asyncio.create_task(self.execute(start + issued / rate))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+                issued += 1
+            await asyncio.sleep(max(start + issued / rate - time.perf_counter(), 0))
+        if in_flight:
+            await asyncio.wait(in_flight)
+
+    async def closed_loop(self, rate: float, duration: float, concurrency: int):
+        start = time.perf_counter()
+        total = int(rate * duration)
+        tickets = iter(range(total))
+
+        async def worker():
+            for ticket in tickets:
+                scheduled = start + ticket / rate
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                await self.execute(time.perf_counter())
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def generate_load(
+    sessions: Sequence[Session],
+    metrics: InMemoryMetrics,
+    *,
+    rate: float = 1000,
+    duration: float = 10,
+    model: str = OPEN_LOOP,
+    concurrency: int = 64,
+    mix: Mapping[str, float] = DEFAULT_MIX,
+    zones: Sequence[int] = tuple(DEFAULT_ZONES),
+    timeout: float = 5.0,
+    seed: Optional[int] = None,
+    lag_interval: float = 0.01,
+) -> LoadReport:
+    """
+    Drive sessions with a random mix of commands at a target rate.
+
+    Sessions are connected in parallel before the measurement starts.
+
+    Args:
+        sessions: Sessions of the relays to drive.
+        metrics: Metrics the sessions report to, used to count
+            connects and reconnects.
+        rate: A target rate of commands per second (across all relays).
+        duration: How long to generate new commands in seconds.
+        model: Either [OPEN_LOOP][skydance.loadgen.OPEN_LOOP] or
+            [CLOSED_LOOP][skydance.loadgen.CLOSED_LOOP].
+        concurrency: A number of workers of the closed-loop model.
+        mix: Relative weights of [OPERATIONS][skydance.loadgen.OPERATIONS].
+        zones: Zone numbers to send commands to.
+        timeout: Maximal duration of a single operation in seconds,
+            slower operations are counted as errors (as are responses
+            not matching their query).
+        seed: A seed of the random generator for reproducible runs.
+        lag_interval: How often to measure the event loop lag in seconds.
+
+    Raise:
+        ValueError: If the arguments are invalid.
+    """
+    if rate <= 0 or duration <= 0:
+        raise ValueError("Rate and duration must be positive.")
+    if model not in (OPEN_LOOP, CLOSED_LOOP):
+        raise ValueError(f"Unknown load model: {model}.")
+    run = _Run(sessions, mix, zones, timeout, seed)
+
+    # failed connections are retried on first use (and counted as reconnects)
+    await asyncio.gather(
+        *(session.connect() for session in sessions), return_exceptions=True
+    )
+
+    monitor = _LoopLagMonitor(lag_interval)
+    monitor.start()
+    start = time.perf_counter()
+    try:
+        if model == OPEN_LOOP:
+            await run.open_loop(rate, duration)
+        else:
+            await run.closed_loop(rate, duration, concurrency)
+    finally:
+        elapsed = time.perf_counter() - start
+        await monitor.stop()
+
+    latencies = sorted(run.latencies)
+    lags = sorted(monitor.lags)
+    counters: Dict[str, float] = {}
+    for (name, _), value in metrics.counters.items():
+        counters[name] = counters.get(name, 0) + value
+    return LoadReport(
+        model=model,
+        target_rate=rate,
+        relays=len(sessions),
+        duration=elapsed,
+        completed=len(latencies),
+        errors=run.errors,
+        throughput=len(latencies) / elapsed,
+        latency_p50=percentile(latencies, 50),
+        latency_p95=percentile(latencies, 95),
+        latency_p99=percentile(latencies, 99),
+        latency_max=latencies[-1] if latencies else 0.0,
+        connects=int(counters.get("session_connects_total", 0)),
+        reconnects=int(counters.get("session_reconnects_total", 0)),
+        loop_lag_p99=percentile(lags, 99),
+        loop_lag_max=lags[-1] if lags else 0.0,
+        completed_by_operation=run.completed,
+    )
+
+
+async def generate_emulated_load(relays: int, **kwargs) -> LoadReport:
+    """
+    Start emulated relays and drive them by [`generate_load()`][skydance.loadgen.generate_load].
+
+    Args:
+        relays: A number of [RelayEmulator][skydance.network.emulator.RelayEmulator]
+            instances to start (in this process and event loop).
+        **kwargs: Passed to [`generate_load()`][skydance.loadgen.generate_load].
+    """
+    emulators = [RelayEmulator() for _ in range(relays)]
+    await asyncio.gather(*(emulator.start() for emulator in emulators))
+    metrics = InMemoryMetrics()
+    try:
+        async with SessionPool(metrics=metrics) as pool:
+            sessions = [pool.get(e.host, e.port) for e in emulators]
+            return await generate_load(sessions, metrics, **kwargs)
+    finally:
+        await asyncio.gather(*(emulator.close() for emulator in emulators))
+
+
+async def generate_relay_load(
+    hosts: Sequence[str] = (),
+    *,
+    port: int = PORT,
+    discover: Optional[str] = None,
+    **kwargs,
+) -> LoadReport:
+    """
+    Drive real relays by [`generate_load()`][skydance.loadgen.generate_load].
+
+    Args:
+        hosts: IP addresses or hostnames of the relays.
+        port: A port of the relays.
+        discover: A broadcast address to discover more relays by
+            [`discover_ips_by_mac()`][skydance.network.discovery.discover_ips_by_mac].
+        **kwargs: Passed to [`generate_load()`][skydance.loadgen.generate_load].
+    """
+    metrics = InMemoryMetrics()
+    async with SessionPool(port=port, metrics=metrics) as pool:
+        sessions = [pool.get(host) for host in hosts]
+        if discover:
+            from skydance.network.discovery import discover_ips_by_mac
+
+            for mac, ips in (
+                await discover_ips_by_mac(discover, broadcast=True)
+            ).items():
+                addresses = sorted(str(ip) for ip in ips)
+                sessions.append(pool.get(mac.hex(":"), addresses=addresses))
+        return await generate_load(sessions, metrics, **kwargs)
+
+
+def _parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        try:
+            mix[name.strip()] = float(weight)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"Invalid mix item: {item}") from None
+    return mix
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m skydance.loadgen", description=__doc__.splitlines()[1]
+    )
+    targets = parser.add_argument_group("relays")
+    targets.add_argument("--emulate", type=int, help="start N emulated relays")
+    targets.add_argument("--host", action="append", default=[], help="a real relay")
+    targets.add_argument("--discover", help="discover relays by broadcast")
+    targets.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--rate", type=float, default=1000, help="ops per second")
+    parser.add_argument("--duration", type=float, default=10, help="seconds")
+    parser.add_argument("--model", choices=(OPEN_LOOP, CLOSED_LOOP), default=OPEN_LOOP)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument(
+        "--mix",
+        type=_parse_mix,
+        default=dict(DEFAULT_MIX),
+        help="weights, e.g. power=3,brightness=3,rgbw=3,zone_info=1",
+    )
+    parser.add_argument("--timeout", type=float, default=5.0)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--json", action="store_true", help="print JSON results")
+    args = parser.parse_args(argv)
+
+    kwargs = dict(
+        rate=args.rate,
+        duration=args.duration,
+        model=args.model,
+        concurrency=args.concurrency,
+        mix=args.mix,
+        timeout=args.timeout,
+        seed=args.seed,
+    )
+    if args.emulate:
+        coro = generate_emulated_load(args.emulate, **kwargs)
+    elif args.host or args.discover:
+        coro = generate_relay_load(
+            args.host, port=args.port, discover=args.discover, **kwargs
+        )
+    else:
+        parser.error("one of --emulate, --host or --discover is required")
+
+    report = asyncio.run(coro)
+    if args.json:
+        print(json.dumps(report._asdict(), indent=2, sort_keys=True))
+    else:
+        print(report.format())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
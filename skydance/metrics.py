@@ -0,0 +1,223 @@
+import bisect
+import math
+from collections import defaultdict
+from typing import DefaultDict, Dict, Iterable, List, Optional, Tuple
+
+
+# type aliases
+Labels = Tuple[Tuple[str, str], ...]
+"""Metric labels as a tuple of `(name, value)` pairs (hashable and cheap to pass)."""
+
+MetricKey = Tuple[str, Labels]
+
+DEFAULT_BUCKETS = (
+    0.0001,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+"""Default histogram buckets (in seconds) suitable for network latencies."""
+
+
+def relay_labels(*, host: Optional[str] = None, mac: Optional[bytes] = None) -> Labels:
+    """
+    Return labels identifying a relay.
+
+    MAC address is preferred as it is stable across DHCP leases.
+
+    Args:
+        host: An IP address or hostname of a relay.
+        mac: A MAC address of a relay.
+    """
+    if mac is not None:
+        return (("relay", mac.hex(":")),)
+    if host is not None:
+        return (("relay", str(host)),)
+    return ()
+
+
+class Metrics:
+    """
+    A metrics sink which discards everything.
+
+    This is the default sink used by all instrumented objects, so that
+    the instrumentation costs only a method call when nobody listens.
+    Subclass it and override the methods to report metrics elsewhere.
+    """
+
+    def counter(self, name: str, value: float = 1, labels: Labels = ()) -> None:
+        """
+        Increase a monotonic counter.
+
+        Args:
+            name: A metric name.
+            value: An increment.
+            labels: Metric labels.
+        """
+
+    def gauge(self, name: str, value: float, labels: Labels = ()) -> None:
+        """
+        Set a gauge to the current value.
+
+        Args:
+            name: A metric name.
+            value: A current value.
+            labels: Metric labels.
+        """
+
+    def histogram(self, name: str, value: float, labels: Labels = ()) -> None:
+        """
+        Record an observation (typically a latency in seconds) into a histogram.
+
+        Args:
+            name: A metric name.
+            value: An observed value.
+            labels: Metric labels.
+        """
+
+
+NOOP_METRICS = Metrics()
+"""A shared instance of the no-op [Metrics][skydance.metrics.Metrics] sink."""
+
+
+class Histogram:
+    """A cumulative histogram with fixed bucket boundaries."""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        """
+        Create a Histogram.
+
+        Args:
+            buckets: Sorted upper bounds of buckets. `+Inf` is added automatically.
+        """
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        """Record a single observation."""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self) -> List[Tuple[float, int]]:
+        """Return `(upper_bound, count)` pairs as used by Prometheus `le` buckets."""
+        res, total = [], 0
+        for bound, count in zip(self.buckets + (math.inf,), self.counts):
+            total += count
+            res.append((bound, total))
+        return res
+
+
+class InMemoryMetrics(Metrics):
+    """
+    A metrics sink aggregating all values in memory.
+
+    Export the aggregated values using
+    [`to_prometheus()`][skydance.metrics.to_prometheus].
+    """
+
+    counters: DefaultDict[MetricKey, float]
+    gauges: Dict[MetricKey, float]
+    histograms: Dict[MetricKey, Histogram]
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        """
+        Create an InMemoryMetrics.
+
+        Args:
+            buckets: Bucket boundaries used for all histograms.
+        """
+        self._buckets = tuple(buckets)
+        self.counters = defaultdict(float)
+        self.gauges = {}
+        self.histograms = {}
+
+    def counter(self, name: str, value: float = 1, labels: Labels = ()) -> None:
+        self.counters[name, labels] += value
+
+    def gauge(self, name: str, value: float, labels: Labels = ()) -> None:
+        self.gauges[name, labels] = value
+
+    def histogram(self, name: str, value: float, labels: Labels = ()) -> None:
+        key = name, labels
+        try:
+            histogram = self.histograms[key]
+        except KeyError:
+            histogram = self.histograms[key] = Histogram(self._buckets)
+        histogram.observe(value)
+
+    def reset(self):
+        """Forget all aggregated values."""
+        self.counters.clear()
+        self.gauges.clear()
+        self.histograms.clear()
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (name, value.replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n"))
+        for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def to_prometheus(metrics: InMemoryMetrics, *, prefix: str = "skydance_") -> str:
+    """
+    Export aggregated metrics in Prometheus text exposition format.
+
+    Args:
+        metrics: Aggregated metrics.
+        prefix: A prefix prepended to all metric names.
+    """
+    families: DefaultDict[Tuple[str, str], List[str]] = defaultdict(list)
+
+    for (name, labels), value in sorted(metrics.counters.items()):
+        families[prefix + name, "counter"].append(
+            f"{prefix}{name}{_format_labels(labels)} {_format_value(value)}"
+        )
+    for (name, labels), value in sorted(metrics.gauges.items()):
+        families[prefix + name, "gauge"].append(
+            f"{prefix}{name}{_format_labels(labels)} {_format_value(value)}"
+        )
+    for (name, labels), histogram in sorted(
+        metrics.histograms.items(), key=lambda item: item[0]
+    ):
+        lines = families[prefix + name, "histogram"]
+        for bound, count in histogram.cumulative_counts():
+            bucket_labels = labels + (("le", _format_value(bound)),)
+            lines.append(
+                f"{prefix}{name}_bucket{_format_labels(bucket_labels)} {count}"
+            )
+        lines.append(
+            f"{prefix}{name}_sum{_format_labels(labels)} {_format_value(histogram.sum)}"
+        )
+        lines.append(f"{prefix}{name}_count{_format_labels(labels)} {histogram.count}")
+
+    res = []
+    for (name, kind), lines in families.items():
+        res.append(f"# TYPE {name} {kind}")
+        res.extend(lines)
+    return "\n".join(res) + "\n" if res else ""
@@ -0,0 +1,41 @@
+import importlib
+from typing import Dict, List
+
+
+# Submodules are imported on first attribute access, so that importing
+# a single helper (or just the package) does not pay for all of them.
+_LAZY_ATTRIBUTES: Dict[str, str] = {
+    "Buffer": "skydance.network.buffer",
+    "FrameBuffer": "skydance.network.buffer",
+    "CommandJournal": "skydance.network.journal",
+    "DiscoveryProtocol": "skydance.network.discovery",
+    "FairQueue": "skydance.network.fair",
+    "discover_ips_by_mac": "skydance.network.discovery",
+    "RelayEmulator": "skydance.network.emulator",
+    "SessionPool": "skydance.network.pool",
+    "Session": "skydance.network.session",
+    "fire_scene": "skydance.network.scene",
+    "Scheduler": "skydance.network.scheduler",
+    "prepare_scene": "skydance.network.scene",
+    "ShardedRuntime": "skydance.network.shard",
+    "SyncClient": "skydance.network.sync",
+    "VirtualEventLoop": "skydance.network.virtual",
+    "run_virtual": "skydance.network.virtual",
+    "WireRecorder": "skydance.network.capture",
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name: str):
+    try:
+        module_name = _LAZY_ATTRIBUTES[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    res = getattr(importlib.import_module(module_name), name)
+    globals()[name] = res
+    return res
+
+
+def __dir__() -> List[str]:
+    return sorted(list(globals()) + __all__)
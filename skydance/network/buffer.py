@@ -1,5 +1,9 @@
+import struct
 from collections import deque
-from typing import Sequence
+from typing import Deque, Sequence
+
+from skydance.metrics import NOOP_METRICS, Labels, Metrics
+from skydance.protocol import HEAD, TAIL
 
 
 # TODO is this reimplementing https://docs.python.org/3/library/asyncio-protocol.html#asyncio.BufferedProtocol.buffer_updated ?
@@ -13,6 +17,10 @@ class Buffer:
 
     - Protocols sending byte messages ending with pre-defined tail sequence.
     - Tail sequence length must be 2 bytes.
+
+    Messages are split on every tail sequence, even on one which is a part
+    of message data. Use [FrameBuffer][skydance.network.buffer.FrameBuffer]
+    for Skydance frames.
     """
 
     _TAIL: bytes
@@ -20,12 +28,16 @@ class Buffer:
     _buffer: deque
     _buffered_messages: int
 
-    def __init__(self, tail: bytes):
+    def __init__(
+        self, tail: bytes, *, metrics: Metrics = NOOP_METRICS, labels: Labels = ()
+    ):
         """
         Create a Buffer.
 
         Args:
             tail: Tail byte sequence.
+            metrics: A sink for reporting metrics.
+            labels: Labels attached to all reported metrics.
         """
         if len(tail) != 2:
             raise ValueError(
@@ -35,6 +47,8 @@ class Buffer:
         self._TAIL_SEQ = tuple(tail)  # this is handy for implementation
         self._buffer = deque()
         self._buffered_messages = 0
+        self.metrics = metrics
+        self.labels = labels
 
     def reset(self):
         """Clear state without a need to create a new one."""
@@ -65,6 +79,7 @@ class Buffer:
                 self._buffered_messages += 1
 
         self._buffered_messages += chunk.count(self._TAIL)
+        self.metrics.gauge("buffer_size_bytes", len(self._buffer), self.labels)
 
     def get_message(self) -> bytes:
         """
@@ -86,4 +101,139 @@ class Buffer:
                 if last_word == self._TAIL_SEQ:
                     self._buffered_messages -= 1
                     break
+        self.metrics.counter("buffer_messages_total", 1, self.labels)
+        self.metrics.gauge("buffer_size_bytes", len(self._buffer), self.labels)
         return bytes(res)
+
+
+# offset of the little-endian command data length in a frame
+_LENGTH_OFFSET = len(HEAD) + 1 + 3 + 2 + 2 + 2 + 1
+_LENGTH = struct.Struct("<H")
+# frame length without command data
+_FRAME_OVERHEAD = _LENGTH_OFFSET + _LENGTH.size + len(TAIL)
+
+
+class FrameBuffer:
+    """
+    A buffer cutting Skydance frames exactly using their length field.
+
+    Unlike [Buffer][skydance.network.buffer.Buffer], a
+    [TAIL][skydance.protocol.TAIL] sequence inside frame data does not
+    split the frame. Bytes which are not a part of a valid frame (no
+    [HEAD][skydance.protocol.HEAD], too long or without a TAIL at the
+    expected position) are discarded and the buffer resynchronizes
+    on the next HEAD.
+
+    Frames are cut as soon as they are complete, so at most `max_size`
+    bytes of an incomplete frame are kept, no matter what is fed.
+    """
+
+    _frames: Deque[bytes]
+
+    def __init__(
+        self,
+        *,
+        max_size: int = 4096,
+        metrics: Metrics = NOOP_METRICS,
+        labels: Labels = (),
+    ):
+        """
+        Create a FrameBuffer.
+
+        Args:
+            max_size: Maximal length of a single frame in bytes.
+                Longer frames are considered garbage.
+            metrics: A sink for reporting metrics.
+            labels: Labels attached to all reported metrics.
+        """
+        if max_size < _FRAME_OVERHEAD:
+            raise ValueError(f"Maximal size must be at least {_FRAME_OVERHEAD} bytes.")
+        self.max_size = max_size
+        self.metrics = metrics
+        self.labels = labels
+        self.discarded_bytes = 0
+        """Total number of bytes discarded while resynchronizing."""
+        self._buffer = bytearray()
+        self._frames = deque()
+        # length of the buffer needed to complete a frame found at its start
+        self._needed = 0
+
+    def reset(self):
+        """Clear state without a need to create a new one."""
+        self._buffer.clear()
+        self._frames.clear()
+        self._needed = 0
+
+    @property
+    def is_message_ready(self) -> bool:
+        """Return whether at least one frame is ready to read."""
+        return bool(self._frames)
+
+    @property
+    def size(self) -> int:
+        """Return number of buffered bytes which are not a complete frame yet."""
+        return len(self._buffer)
+
+    def feed(self, chunk: bytes):
+        """
+        Feed byte chunk into a buffer and cut all completed frames.
+
+        Args:
+            chunk: Byte chunk of any length.
+        """
+        buffer = self._buffer
+        buffer += chunk
+        if len(buffer) < self._needed:
+            # a frame was already found at the start, but it is still incomplete
+            self.metrics.gauge("buffer_size_bytes", len(buffer), self.labels)
+            return
+        start = discarded = 0
+        needed = 0
+        while True:
+            head = buffer.find(HEAD, start)
+            if head < 0:
+                # keep what may be the beginning of a HEAD split between chunks
+                keep = max(start, len(buffer) - len(HEAD) + 1)
+                discarded += keep - start
+                start = keep
+                break
+            discarded += head - start
+            start = head
+            if len(buffer) - start < _LENGTH_OFFSET + _LENGTH.size:
+                needed = _LENGTH_OFFSET + _LENGTH.size
+                break
+            (data_length,) = _LENGTH.unpack_from(buffer, start + _LENGTH_OFFSET)
+            end = start + _FRAME_OVERHEAD + data_length
+            if end - start > self.max_size:
+                # not a frame, just a HEAD-like sequence in garbage
+                discarded += 1
+                start += 1
+                continue
+            if len(buffer) < end:
+                needed = end - start
+                break
+            if buffer[end - len(TAIL) : end] != TAIL:
+                discarded += 1
+                start += 1
+                continue
+            self._frames.append(bytes(buffer[start:end]))
+            start = end
+        del buffer[:start]
+        self._needed = needed
+
+        if discarded:
+            self.discarded_bytes += discarded
+            self.metrics.counter("buffer_discarded_bytes_total", discarded, self.labels)
+        self.metrics.gauge("buffer_size_bytes", len(buffer), self.labels)
+
+    def get_message(self) -> bytes:
+        """
+        Return a single complete frame.
+
+        Raise:
+            ValueError: If no frame is complete.
+        """
+        if not self._frames:
+            raise ValueError("No complete message is buffered yet.")
+        self.metrics.counter("buffer_messages_total", 1, self.labels)
+        return self._frames.popleft()
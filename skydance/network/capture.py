@@ -0,0 +1,289 @@
+"""
+Record raw wire traffic of sessions and replay it later.
+
+Replay a capture against a local relay emulator as fast as possible:
+
+    $ python -m skydance.network.capture replay capture.bin --emulator --speed 0
+"""
+
+import argparse
+import asyncio
+import mmap
+import struct
+import sys
+import time
+from collections import deque
+from enum import IntEnum
+from typing import Deque, Iterable, Iterator, List, NamedTuple, Optional
+
+
+class Direction(IntEnum):
+    """A direction of captured data."""
+
+    SENT = 0
+    """Data written to a relay."""
+
+    RECEIVED = 1
+    """Data read from a relay."""
+
+
+class CapturedFrame(NamedTuple):
+    """A single chunk of data captured on the wire."""
+
+    timestamp_ns: int
+    """Wall clock time of the capture in nanoseconds since epoch."""
+
+    direction: Direction
+    relay: str
+    """An identifier of a relay, usually its host."""
+
+    data: bytes
+
+
+_FILE_MAGIC = b"SKYCAP\x00\x01"
+# timestamp, direction, relay length, data length
+_RECORD_HEADER = struct.Struct("<QBBH")
+_MAX_RELAY = 0xFF
+_MAX_DATA = 0xFFFF
+
+
+class WireRecorder:
+    """
+    A bounded in-memory ring of captured frames.
+
+    When the ring is full, the oldest frames are discarded. Pass the recorder
+    to a [Session][skydance.network.session.Session] to capture its traffic.
+
+    Example:
+        >>> recorder = WireRecorder(capacity=100_000)
+        >>> async with Session(ip, PORT, recorder=recorder) as session:
+        >>>     ...
+        >>> recorder.dump("capture.bin")
+    """
+
+    _frames: Deque[CapturedFrame]
+
+    def __init__(self, capacity: int = 10_000):
+        """
+        Create a WireRecorder.
+
+        Args:
+            capacity: Maximal number of frames kept in memory.
+        """
+        if capacity < 1:
+            raise ValueError("Capacity must be positive.")
+        self._frames = deque(maxlen=capacity)
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def __iter__(self) -> Iterator[CapturedFrame]:
+        return iter(tuple(self._frames))
+
+    def record(self, direction: Direction, relay: str, data: bytes):
+        """
+        Append a single frame.
+
+        Data longer than 65535 bytes is split into several frames
+        with the same timestamp.
+
+        Args:
+            direction: A direction of data.
+            relay: An identifier of a relay (at most 255 bytes when UTF-8 encoded).
+            data: Raw bytes.
+
+        Raise:
+            ValueError: If the relay identifier is too long.
+        """
+        if len(relay.encode("utf-8")) > _MAX_RELAY:
+            raise ValueError("Relay identifier is too long.")
+        timestamp_ns = time.time_ns()
+        for start in range(0, max(len(data), 1), _MAX_DATA):
+            chunk = data[start : start + _MAX_DATA]
+            self._frames.append(CapturedFrame(timestamp_ns, direction, relay, chunk))
+
+    def clear(self):
+        """Discard all recorded frames."""
+        self._frames.clear()
+
+    def dump(self, path: str) -> int:
+        """
+        Write all recorded frames to a file in a compact binary format.
+
+        Args:
+            path: A file path.
+
+        Returns:
+            Number of frames written.
+        """
+        frames = tuple(self._frames)
+        with open(path, "wb") as f:
+            f.write(_FILE_MAGIC)
+            for frame in frames:
+                relay = frame.relay.encode("utf-8")
+                f.write(
+                    _RECORD_HEADER.pack(
+                        frame.timestamp_ns, frame.direction, len(relay), len(frame.data)
+                    )
+                )
+                f.write(relay)
+                f.write(frame.data)
+        return len(frames)
+
+
+def load_capture(path: str) -> List[CapturedFrame]:
+    """
+    Load frames stored by [`WireRecorder.dump()`][skydance.network.capture.WireRecorder.dump].
+
+    The file is memory-mapped, so only the parsed frames occupy memory.
+
+    Raise:
+        ValueError: If the file is not a valid capture.
+    """
+    with open(path, "rb") as f:
+        if not f.read(len(_FILE_MAGIC)) == _FILE_MAGIC:
+            raise ValueError("Not a capture file.")
+        f.seek(0, 2)
+        if f.tell() == len(_FILE_MAGIC):
+            return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return list(_parse_records(mapped))
+
+
+def _parse_records(mapped: mmap.mmap) -> Iterator[CapturedFrame]:
+    offset, size = len(_FILE_MAGIC), len(mapped)
+    while offset < size:
+        if offset + _RECORD_HEADER.size > size:
+            raise ValueError("Truncated capture file.")
+        timestamp_ns, direction, relay_length, data_length = _RECORD_HEADER.unpack_from(
+            mapped, offset
+        )
+        offset += _RECORD_HEADER.size
+        end = offset + relay_length + data_length
+        if end > size:
+            raise ValueError("Truncated capture file.")
+        relay = mapped[offset : offset + relay_length].decode("utf-8")
+        data = mapped[offset + relay_length : end]
+        offset = end
+        yield CapturedFrame(timestamp_ns, Direction(direction), relay, data)
+
+
+class ReplayReport(NamedTuple):
+    """A summary of [`replay()`][skydance.network.capture.replay]."""
+
+    frames: int
+    bytes: int
+    elapsed: float
+    """Total replay time in seconds."""
+
+    max_lag: float
+    """Maximal delay (in seconds) of a frame behind its original schedule."""
+
+
+async def replay(
+    frames: Iterable[CapturedFrame],
+    session,
+    *,
+    relay: Optional[str] = None,
+    speed: float = 1.0,
+) -> ReplayReport:
+    """
+    Write captured frames to a session, preserving their original timing.
+
+    Only [`Direction.SENT`][skydance.network.capture.Direction.SENT] frames
+    are replayed.
+
+    Args:
+        frames: Captured frames, for example from
+            [`load_capture()`][skydance.network.capture.load_capture].
+        session: A [Session][skydance.network.session.Session] or any object
+            with an awaitable `write(data)` method.
+        relay: Replay only frames captured for this relay.
+        speed: A playback speed multiplier. Zero means as fast as possible.
+    """
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    first_ns = None
+    count = size = 0
+    max_lag = 0.0
+    for frame in frames:
+        if frame.direction != Direction.SENT:
+            continue
+        if relay is not None and frame.relay != relay:
+            continue
+        if first_ns is None:
+            first_ns = frame.timestamp_ns
+        if speed:
+            due = start + (frame.timestamp_ns - first_ns) / 1e9 / speed
+            delay = due - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                max_lag = max(max_lag, -delay)
+        await session.write(frame.data)
+        count += 1
+        size += len(frame.data)
+    return ReplayReport(count, size, loop.time() - start, max_lag)
+
+
+async def _replay_main(args) -> ReplayReport:
+    # imported here, because Session itself depends on this module
+    from skydance.network.emulator import RelayEmulator
+    from skydance.network.session import Session
+    from skydance.protocol import PORT
+
+    frames = load_capture(args.path)
+    if args.emulator:
+        async with RelayEmulator() as emulator:
+            async with Session(emulator.host, emulator.port) as session:
+                return await replay(frames, session, relay=args.relay, speed=args.speed)
+    async with Session(args.host, args.port or PORT) as session:
+        return await replay(frames, session, relay=args.relay, speed=args.speed)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m skydance.network.capture",
+        description=__doc__.splitlines()[1],
+    )
+    subparsers = parser.add_subparsers(dest="action", required=True)
+
+    show_parser = subparsers.add_parser("show", help="print a capture")
+    show_parser.add_argument("path")
+
+    replay_parser = subparsers.add_parser("replay", help="replay a capture")
+    replay_parser.add_argument("path")
+    target = replay_parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--host", help="replay against a relay")
+    target.add_argument(
+        "--emulator", action="store_true", help="replay against a local emulator"
+    )
+    replay_parser.add_argument("--port", type=int)
+    replay_parser.add_argument("--relay", help="replay only frames of this relay")
+    replay_parser.add_argument(
+        "--speed", type=float, default=1.0, help="0 = as fast as possible"
+    )
+
+    args = parser.parse_args(argv)
+
+    if args.action == "show":
+        for frame in load_capture(args.path):
+            print(
+                frame.timestamp_ns,
+                frame.direction.name,
+                frame.relay,
+                frame.data.hex(" "),
+                sep="\t",
+            )
+        return 0
+
+    report = asyncio.run(_replay_main(args))
+    print(
+        f"frames={report.frames} bytes={report.bytes} "
+        f"elapsed={report.elapsed:.3f}s max_lag={report.max_lag:.3f}s"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
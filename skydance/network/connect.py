@@ -0,0 +1,79 @@
+import asyncio
+import contextlib
+import logging
+from typing import Dict, List, Sequence, Tuple
+
+
+log = logging.getLogger(__name__)
+
+
+async def open_first_connection(
+    addresses: Sequence[str], port: int, *, delay: float = 0.25
+) -> Tuple[str, asyncio.StreamReader, asyncio.StreamWriter]:
+    """
+    Race staggered connection attempts to several addresses of a single relay.
+
+    This is a variant of the "Happy Eyeballs" algorithm
+    ([RFC 8305](https://tools.ietf.org/html/rfc8305)) for relays known under
+    multiple IP addresses, e.g. from
+    [`discover_ips_by_mac()`][skydance.network.discovery.discover_ips_by_mac].
+    Attempts are started in the given order, a next one either after `delay`
+    or as soon as the previous one fails. The first established connection
+    wins, the others are cancelled (or closed, if they succeed as well).
+
+    Args:
+        addresses: IP addresses or hostnames to try, the most preferred first.
+        port: A relay port.
+        delay: Seconds to wait for an attempt before starting the next one.
+
+    Returns:
+        The winning address and its stream reader and writer.
+
+    Raise:
+        ValueError: If no address is given.
+        OSError: If all attempts fail. If there was a single attempt,
+            its original exception is raised.
+    """
+    if not addresses:
+        raise ValueError("At least one address must be given.")
+
+    attempts: Dict[
+        "asyncio.Task[Tuple[asyncio.StreamReader, asyncio.StreamWriter]]", str
+    ] = {}
+    errors: List[Exception] = []
+    remaining = list(addresses)
+    try:
+        while remaining or attempts:
+            if remaining:
+                address = remaining.pop(0)
+                task = asyncio.create_task(asyncio.open_connection(address, port))
+                attempts[task] = address
+            done, _ = await asyncio.wait(
+                attempts,
+                timeout=delay if remaining else None,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            for task in done:
+                address = attempts.pop(task)
+                if task.exception() is None:
+                    reader, writer = task.result()
+                    return address, reader, writer
+                log.debug(
+                    "Connection to %s:%d failed: %s", address, port, task.exception()
+                )
+                errors.append(task.exception())  # type: ignore
+    finally:
+        await _abandon(attempts)
+
+    if len(errors) == 1:
+        raise errors[0]
+    raise OSError("Multiple exceptions: " + ", ".join(str(error) for error in errors))
+
+
+async def _abandon(attempts):
+    for task in attempts:
+        task.cancel()
+    for task in attempts:
+        with contextlib.suppress(asyncio.CancelledError, Exception):
+            _, writer = await task
+            writer.close()
@@ -4,6 +4,8 @@ import logging
 from collections import defaultdict
 from typing import DefaultDict, Iterable, Mapping, Optional, cast
 
+from skydance.metrics import NOOP_METRICS, Metrics, relay_labels
+
 
 log = logging.getLogger(__name__)
 
@@ -48,8 +50,15 @@ class DiscoveryProtocol(asyncio.DatagramProtocol):
     _transport: Optional[asyncio.transports.DatagramTransport] = None
     _result: DefaultDict[MacAddress, set]
 
-    def __init__(self):
+    def __init__(self, *, metrics: Metrics = NOOP_METRICS):
+        """
+        Create a DiscoveryProtocol.
+
+        Args:
+            metrics: A sink for reporting metrics.
+        """
         self._result = defaultdict(set)
+        self.metrics = metrics
 
     # implementation of asyncio.DatagramProtocol follows
 
@@ -64,6 +73,7 @@ class DiscoveryProtocol(asyncio.DatagramProtocol):
         _reported_ip_str, mac_str, _model = data.decode("ascii").split(",")
         mac = MacAddress.fromhex(mac_str)
         self._result[mac].add(real_ip)
+        self.metrics.counter("discovery_replies_total", 1, relay_labels(mac=mac))
 
     # public API follows
 
@@ -75,13 +85,19 @@ class DiscoveryProtocol(asyncio.DatagramProtocol):
             )
         log.debug("Sending discovery request")
         self._transport.sendto(self._DISCOVERY_REQUEST)
+        self.metrics.counter("discovery_requests_total")
 
     def get_discovery_result(self) -> DiscoveryResult:
         return self._result
 
 
 async def discover_ips_by_mac(
-    ip: str, *, broadcast: bool = False, retry: int = 3, sleep: float = 1
+    ip: str,
+    *,
+    broadcast: bool = False,
+    retry: int = 3,
+    sleep: float = 1,
+    metrics: Metrics = NOOP_METRICS,
 ) -> DiscoveryResult:
     """
     Discover Skydance Wi-Fi relays.
@@ -93,12 +109,13 @@ async def discover_ips_by_mac(
             `sudo` to operate (to bind 0.0.0.0).
         retry: How many times to retry sending discovery request.
         sleep: Sleep time between subsequent discovery requests.
+        metrics: A sink for reporting metrics.
 
     Returns:
         Mapping of found Skydance Wi-Fi relays. Their MAC address is the key and their
         IP addresses are the values (stored in `set`).
     """
-    protocol = DiscoveryProtocol()
+    protocol = DiscoveryProtocol(metrics=metrics)
     await asyncio.get_event_loop().create_datagram_endpoint(
         lambda: protocol,
         remote_addr=(ip, DiscoveryProtocol.PORT),
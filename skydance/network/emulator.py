@@ -0,0 +1,200 @@
+import asyncio
+import logging
+import struct
+from typing import Dict, List, Mapping, Optional, Set, Tuple
+
+from skydance.enum import ZoneType
+from skydance.network.buffer import FrameBuffer
+from skydance.protocol import DEVICE_BASE_TYPE_NORMAL, HEAD, TAIL
+
+
+log = logging.getLogger(__name__)
+
+# Address bytes copied from responses captured on a physical relay.
+_RESPONSE_ADDRESS = bytes.fromhex("80 00 80 e1 80 26 51")
+
+_CMD_GET_NUMBER_OF_ZONES = 0x79
+_CMD_GET_ZONE_INFO = 0x78
+
+_ZONE_DATA_LENGTH = 16
+
+DEFAULT_ZONES: Mapping[int, Tuple[ZoneType, str]] = {
+    1: (ZoneType.Dimmer, "Zone Dimmer"),
+    2: (ZoneType.CCT, "Zone CCT"),
+    3: (ZoneType.RGBW, "Zone RGBW"),
+    4: (ZoneType.RGBCCT, "Zone RGB+CCT"),
+}
+"""Zones exposed by [RelayEmulator][skydance.network.emulator.RelayEmulator] by default."""
+
+
+class RelayEmulator:
+    """
+    An in-process emulator of a Skydance Wi-Fi relay listening on a TCP port.
+
+    It answers [`GetNumberOfZonesCommand`][skydance.protocol.GetNumberOfZonesCommand]
+    and [`GetZoneInfoCommand`][skydance.protocol.GetZoneInfoCommand] the same
+    way a physical relay does and silently accepts every other command.
+    It is meant for tests, benchmarks and load generation - not for production.
+
+    Example:
+        >>> async with RelayEmulator() as relay:
+        >>>     async with Session(relay.host, relay.port) as session:
+        >>>         await session.write(PingCommand(State()).raw)
+    """
+
+    host: str
+    frames_received: int
+
+    _server: Optional[asyncio.base_events.Server]
+    _zones: Dict[int, Tuple[ZoneType, str]]
+    _writers: List[asyncio.StreamWriter]
+
+    def __init__(
+        self,
+        zones: Optional[Mapping[int, Tuple[ZoneType, str]]] = None,
+        *,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        """
+        Create a RelayEmulator.
+
+        Args:
+            zones: Mapping of zone number (1-16) to its type and name.
+                Defaults to [DEFAULT_ZONES][skydance.network.emulator.DEFAULT_ZONES].
+            host: An interface to listen on.
+            port: A port to listen on. Zero means any free port.
+        """
+        self.host = host
+        self._port = port
+        self._zones = dict(DEFAULT_ZONES if zones is None else zones)
+        self._server = None
+        self._writers = []
+        self._handlers: Set["asyncio.Task[None]"] = set()
+        self.frames_received = 0
+
+    @property
+    def port(self) -> int:
+        """Return a port the emulator actually listens on."""
+        if self._server is None:
+            return self._port
+        return self._server.sockets[0].getsockname()[1]
+
+    @property
+    def connections(self) -> int:
+        """Return number of connected clients."""
+        return len(self._writers)
+
+    def notify(self, zone: int, cmd_type: int, data: bytes = b""):
+        """
+        Send an unsolicited frame to all connected clients.
+
+        A physical relay may do so e.g. when a zone is changed by a remote.
+
+        Args:
+            zone: A zone number (1-16) the frame is about.
+            cmd_type: A command type of the frame.
+            data: Command data.
+        """
+        frame = self._response(bytes([0]), 1 << (zone - 1), cmd_type, data)
+        for writer in self._writers:
+            if not writer.is_closing():
+                writer.write(frame)
+
+    async def start(self):
+        """Start listening for connections."""
+        self._server = await asyncio.start_server(
+            self._handle_connection, self.host, self._port
+        )
+        log.debug("Relay emulator listening on: %s:%d", self.host, self.port)
+
+    async def close(self):
+        """Stop listening and drop all client connections."""
+        if self._server is None:
+            return
+        self._server.close()
+        for writer in self._writers:
+            writer.close()
+        # let the handlers see the closed connections, so none is left pending
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+        await self._server.wait_closed()
+        self._server = None
+
+    async def __aenter__(self):
+        """Return auto-closing context manager."""
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        self._writers.append(writer)
+        handler = asyncio.current_task()
+        if handler is not None:
+            self._handlers.add(handler)
+        buffer = FrameBuffer()
+        try:
+            while True:
+                chunk = await reader.read(4096)
+                if not chunk:
+                    break
+                buffer.feed(chunk)
+                while buffer.is_message_ready:
+                    response = self.handle_frame(buffer.get_message())
+                    if response and not writer.is_closing():
+                        writer.write(response)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self._writers.remove(writer)
+            self._handlers.discard(handler)  # type: ignore
+            writer.close()
+
+    def handle_frame(self, frame: bytes) -> Optional[bytes]:
+        """
+        Process a single command frame and return a response frame (if any).
+
+        Args:
+            frame: Complete command bytes including HEAD and TAIL.
+        """
+        self.frames_received += 1
+        frame_number = frame[len(HEAD) : len(HEAD) + 1]
+        body = frame[len(HEAD) + 1 : -len(TAIL)]
+        if len(body) < 10:
+            return None
+        zone_mask = struct.unpack("<H", body[7:9])[0]
+        cmd_type = body[9]
+
+        if cmd_type == _CMD_GET_NUMBER_OF_ZONES:
+            data = bytes(DEVICE_BASE_TYPE_NORMAL | zone for zone in sorted(self._zones))
+            return self._response(frame_number, zone_mask, cmd_type, data)
+
+        if cmd_type == _CMD_GET_ZONE_INFO:
+            zone = zone_mask.bit_length()
+            if zone not in self._zones:
+                return None
+            zone_type, name = self._zones[zone]
+            data = bytes([zone_type.value, 0]) + name.encode("utf-8")
+            return self._response(frame_number, zone_mask, cmd_type, data)
+
+        return None
+
+    @staticmethod
+    def _response(frame_number: bytes, zone_mask: int, cmd_type: int, data: bytes):
+        data = data[:_ZONE_DATA_LENGTH].ljust(_ZONE_DATA_LENGTH, b"\x00")
+        return bytes().join(
+            (
+                HEAD,
+                frame_number,
+                _RESPONSE_ADDRESS,
+                struct.pack("<H", zone_mask),
+                struct.pack("B", cmd_type + DEVICE_BASE_TYPE_NORMAL),
+                struct.pack("<H", len(data)),
+                data,
+                TAIL,
+            )
+        )
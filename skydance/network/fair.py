@@ -0,0 +1,208 @@
+import asyncio
+import collections
+from typing import TYPE_CHECKING, Deque, Dict, Iterable, List, Optional, Tuple
+
+from skydance.metrics import Labels
+from skydance.protocol import Command
+
+
+if TYPE_CHECKING:
+    from skydance.network.session import Session
+
+
+class _Request:
+    __slots__ = ("future", "remaining", "enqueued")
+
+    def __init__(self, future: "asyncio.Future[None]", remaining: int, enqueued: float):
+        self.future = future
+        self.remaining = remaining
+        self.enqueued = enqueued
+
+
+class Producer:
+    """
+    A handle sending commands through a [FairQueue][skydance.network.fair.FairQueue].
+
+    Create it by [`Session.producer()`][skydance.network.session.Session.producer].
+    """
+
+    def __init__(self, queue: "FairQueue", name: str, weight: float):
+        self.name = name
+        self.weight = weight
+        self.labels: Labels = queue.session.labels + (("producer", name),)
+        self._queue = queue
+        # finish tag, command, request
+        self._pending: Deque[Tuple[float, Command, _Request]] = collections.deque()
+        self._last_finish = 0.0
+
+    @property
+    def pending(self) -> int:
+        """Return number of queued commands."""
+        return len(self._pending)
+
+    async def send(self, command: Command):
+        """
+        Queue a command and wait until it is written.
+
+        Raise:
+            OSError: If writing the batch containing the command failed.
+                Other errors of the write (e.g. encoding a command) are raised as well.
+        """
+        await self.send_many([command])
+
+    async def send_many(self, commands: Iterable[Command]):
+        """
+        Queue commands and wait until all of them are written.
+
+        Commands of other producers may be interleaved with them.
+
+        Raise:
+            OSError: If writing a batch containing the commands failed.
+                Other errors of the write (e.g. encoding a command) are raised as well.
+        """
+        await self._queue._enqueue(self, list(commands))
+
+
+class FairQueue:
+    """
+    Weighted fair queueing of commands from several producers sharing a session.
+
+    Each queued command gets a virtual finish tag of
+    `max(virtual time, producer's previous tag) + 1 / weight` (self-clocked
+    fair queueing) and batches are filled in the order of these tags.
+    A producer with weight 2 therefore gets twice as many frames written as
+    one with weight 1 while both have commands waiting, and a producer which
+    was idle is served right away instead of waiting behind a long backlog
+    of another one.
+
+    Reported metrics, labeled by the session labels and `producer`:
+
+    - `session_producer_queue_depth` (gauge): queued commands.
+    - `session_producer_wait_seconds` (histogram): time from queueing a command
+      to writing it, in the
+      [event loop clock](https://docs.python.org/3/library/asyncio-eventloop.html#asyncio.loop.time).
+
+    Commands sent directly through the session bypass the queue.
+
+    Example:
+        >>> ui = session.producer("ui", weight=4)
+        >>> effects = session.producer("effects")
+        >>> await asyncio.gather(
+        >>>     effects.send_many(animation_frames),
+        >>>     ui.send(PowerCommand(session.state, zone=1, power=False)),  # not stuck behind the animation
+        >>> )
+    """
+
+    def __init__(self, session: "Session", *, batch: int = 16):
+        """
+        Create a FairQueue.
+
+        Args:
+            session: A session to write to.
+            batch: A maximal number of commands written at once.
+
+        Raise:
+            ValueError: If the batch size is not positive.
+        """
+        if batch < 1:
+            raise ValueError("Batch size must be positive.")
+        self.session = session
+        self.batch = batch
+        self._producers: Dict[str, Producer] = {}
+        self._virtual_time = 0.0
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    def producer(self, name: str, *, weight: float = 1.0) -> Producer:
+        """
+        Return a producer handle, creating it if needed.
+
+        Args:
+            name: A name of the producer, used as a metrics label.
+            weight: A share of the session throughput relative to other producers.
+                Replaces the weight of an existing producer.
+
+        Raise:
+            ValueError: If the weight is not positive.
+        """
+        if weight <= 0:
+            raise ValueError("Weight must be positive.")
+        producer = self._producers.get(name)
+        if producer is None:
+            producer = self._producers[name] = Producer(self, name, weight)
+        producer.weight = weight
+        return producer
+
+    @property
+    def pending(self) -> int:
+        """Return number of queued commands of all producers."""
+        return sum(producer.pending for producer in self._producers.values())
+
+    async def _enqueue(self, producer: Producer, commands: List[Command]):
+        if not commands:
+            return
+        loop = asyncio.get_running_loop()
+        request = _Request(loop.create_future(), len(commands), loop.time())
+        finish = max(self._virtual_time, producer._last_finish)
+        for command in commands:
+            finish += 1 / producer.weight
+            producer._pending.append((finish, command, request))
+        producer._last_finish = finish
+        self._report_depth(producer)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        await request.future
+
+    def _report_depth(self, producer: Producer):
+        self.session.metrics.gauge(
+            "session_producer_queue_depth", producer.pending, producer.labels
+        )
+
+    def _next_batch(self) -> List[Tuple[Producer, Command, _Request]]:
+        batch: List[Tuple[Producer, Command, _Request]] = []
+        waiting = [
+            producer for producer in self._producers.values() if producer._pending
+        ]
+        while waiting and len(batch) < self.batch:
+            producer = min(waiting, key=lambda producer: producer._pending[0][0])
+            finish, command, request = producer._pending.popleft()
+            # rest of a failed or cancelled request is dropped
+            if not request.future.done():
+                self._virtual_time = finish
+                batch.append((producer, command, request))
+            if not producer._pending:
+                waiting.remove(producer)
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+            now = loop.time()
+            for producer in {producer for producer, _, _ in batch}:
+                self._report_depth(producer)
+            for producer, _, request in batch:
+                self.session.metrics.histogram(
+                    "session_producer_wait_seconds",
+                    now - request.enqueued,
+                    producer.labels,
+                )
+            try:
+                await self.session.send_many(command for _, command, _ in batch)
+            except Exception as e:
+                # fail only this batch, commands of other batches are still written
+                for _, _, request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+                continue
+            for _, _, request in batch:
+                request.remaining -= 1
+                if not request.remaining and not request.future.done():
+                    request.future.set_result(None)
+
+    async def close(self):
+        """Wait until all queued commands are written."""
+        if self._task is not None:
+            await self._task
+            self._task = None
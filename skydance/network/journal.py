@@ -0,0 +1,114 @@
+from typing import Dict, List, Optional, Tuple, Type
+
+from skydance.protocol import (
+    BrightnessCommand,
+    Command,
+    MasterPowerCommand,
+    PowerCommand,
+    RGBWCommand,
+    TemperatureCommand,
+    ZoneCommand,
+)
+
+
+# type aliases
+JournalKey = Tuple[Optional[int], str]
+
+JOURNALED_COMMANDS: Dict[Type[Command], str] = {
+    PowerCommand: "power",
+    MasterPowerCommand: "master_power",
+    BrightnessCommand: "brightness",
+    TemperatureCommand: "temperature",
+    RGBWCommand: "rgbw",
+}
+"""Commands setting a zone attribute, mapped to the attribute name."""
+
+
+class _Entry:
+    __slots__ = ("command", "sequence", "delivered")
+
+    def __init__(self, command: Command, sequence: int):
+        self.command = command
+        self.sequence = sequence
+        self.delivered = 0
+
+
+class CommandJournal:
+    """
+    The newest intended state of a relay, kept per `(zone, attribute)`.
+
+    Every command in [JOURNALED_COMMANDS][skydance.network.journal.JOURNALED_COMMANDS]
+    sets an absolute value, so resending the newest one of each `(zone, attribute)`
+    restores the intended state, no matter how many older ones were lost.
+    A [Session][skydance.network.session.Session] with a journal replays it in
+    a single batch after each reconnect and skips queued commands the replay
+    has already covered. Catching up after a connection blip then takes at most
+    one frame per `(zone, attribute)`, regardless of the backlog size.
+
+    Other commands (e.g. queries) are not journaled.
+    """
+
+    def __init__(self):
+        """Create an empty CommandJournal."""
+        self._entries: Dict[JournalKey, _Entry] = {}
+        self._sequence = 0
+
+    @staticmethod
+    def key(command: Command) -> Optional[JournalKey]:
+        """Return a `(zone, attribute)` of a command, or `None` if it is not journaled."""
+        attribute = JOURNALED_COMMANDS.get(type(command))
+        if attribute is None:
+            return None
+        zone = command.zone if isinstance(command, ZoneCommand) else None
+        return zone, attribute
+
+    def record(self, command: Command) -> int:
+        """
+        Record a command as the newest intent of its `(zone, attribute)`.
+
+        Returns:
+            A sequence number identifying the record (zero if the command is not journaled).
+        """
+        key = self.key(command)
+        if key is None:
+            return 0
+        self._sequence += 1
+        entry = self._entries.get(key)
+        if entry is None:
+            self._entries[key] = _Entry(command, self._sequence)
+        else:
+            entry.command, entry.sequence = command, self._sequence
+        return self._sequence
+
+    def is_delivered(self, command: Command, sequence: int) -> bool:
+        """Return whether a recorded command (or a newer one of its key) was delivered."""
+        key = self.key(command)
+        entry = self._entries.get(key) if key is not None else None
+        return entry is not None and sequence != 0 and entry.delivered >= sequence
+
+    def mark_delivered(self, command: Command, sequence: int):
+        """Mark a recorded command as delivered."""
+        key = self.key(command)
+        entry = self._entries.get(key) if key is not None else None
+        if entry is not None:
+            entry.delivered = max(entry.delivered, sequence)
+
+    def replay(self) -> List[Command]:
+        """
+        Return the newest command of each `(zone, attribute)` and mark them delivered.
+
+        Commands are ordered as they were recorded, so e.g. a master power
+        off followed by powering a single zone on is replayed in that order.
+        """
+        entries = sorted(self._entries.values(), key=lambda entry: entry.sequence)
+        for entry in entries:
+            entry.delivered = entry.sequence
+        return [entry.command for entry in entries]
+
+    def clear(self):
+        """Forget all recorded commands."""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        """Return number of journaled `(zone, attribute)` pairs."""
+        return len(self._entries)
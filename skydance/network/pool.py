@@ -0,0 +1,159 @@
+import asyncio
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence, Tuple
+
+from skydance.network.session import Session
+from skydance.network.subscribe import Subscription
+from skydance.protocol import PORT
+
+
+class SessionPool:
+    """
+    Keep a single long-lived [Session][skydance.network.session.Session] per relay.
+
+    Sessions are created lazily and connect on first use, unless the pool
+    is [pre-warmed][skydance.network.pool.SessionPool.prewarm].
+
+    Example:
+        >>> async with SessionPool() as pool:
+        >>>     session = pool.get("192.168.1.5")
+        >>>     await session.send(PowerOnCommand(session.state, zone=1))
+
+    Relays found by discovery can be identified by MAC address and reached
+    by any of their IP addresses:
+
+        >>> async with SessionPool() as pool:
+        >>>     for mac, ips in (await discover_ips_by_mac(broadcast_ip)).items():
+        >>>         pool.get(mac.hex(":"), addresses=[str(ip) for ip in ips])
+        >>>     await pool.prewarm()
+    """
+
+    _sessions: Dict[Tuple[str, int], Session]
+
+    def __init__(self, *, port: int = PORT, **session_kwargs: Any):
+        """
+        Create a SessionPool.
+
+        Args:
+            port: A default relay port.
+            **session_kwargs: Passed to each created
+                [Session][skydance.network.session.Session].
+        """
+        self.port = port
+        self._session_kwargs = session_kwargs
+        self._sessions = {}
+
+    def get(
+        self,
+        host: str,
+        port: Optional[int] = None,
+        *,
+        addresses: Optional[Sequence[str]] = None,
+    ) -> Session:
+        """
+        Return a session for a relay, creating it if needed.
+
+        Args:
+            host: A relay IP address or hostname.
+            port: A relay port. Defaults to the pool port.
+            addresses: All known addresses of the relay, see
+                [Session][skydance.network.session.Session].
+                Replaces the addresses of an existing session if they differ.
+        """
+        key = host, self.port if port is None else port
+        try:
+            session = self._sessions[key]
+        except KeyError:
+            kwargs = dict(self._session_kwargs)
+            if addresses is not None:
+                kwargs["addresses"] = addresses
+            session = self._sessions[key] = Session(*key, **kwargs)
+        else:
+            if addresses is not None and set(addresses) != set(session.addresses or ()):
+                session.addresses = list(addresses)
+        return session
+
+    async def prewarm(
+        self,
+        hosts: Optional[Iterable[str]] = None,
+        *,
+        concurrency: int = 32,
+        timeout: Optional[float] = 5.0,
+    ) -> Dict[Tuple[str, int], Optional[Exception]]:
+        """
+        Open connections to many relays in parallel, before traffic arrives.
+
+        Args:
+            hosts: Relays to connect to (using the pool port).
+                Defaults to all sessions already in the pool.
+            concurrency: Maximal number of connections being opened at once.
+            timeout: Maximal time of a single connection attempt in seconds.
+
+        Returns:
+            A mapping of `(host, port)` of each relay to an exception
+            if its connection failed, or `None` if it succeeded.
+        """
+        if hosts is None:
+            sessions = dict(self._sessions)
+        else:
+            sessions = {(host, self.port): self.get(host) for host in hosts}
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def connect(session: Session) -> Optional[Exception]:
+            async with semaphore:
+                try:
+                    await asyncio.wait_for(session.connect(), timeout)
+                except (OSError, asyncio.TimeoutError) as e:
+                    return e
+                return None
+
+        results = await asyncio.gather(*(connect(s) for s in sessions.values()))
+        return dict(zip(sessions, results))
+
+    def subscribe(
+        self, hosts: Optional[Iterable[str]] = None, **kwargs: Any
+    ) -> Subscription:
+        """
+        Subscribe to frames the relays send on their own.
+
+        Args:
+            hosts: Receive only from sessions of these hosts.
+                Defaults to all sessions already in the pool.
+            **kwargs: Filters and options of the
+                [Subscription][skydance.network.subscribe.Subscription].
+
+        Raise:
+            ValueError: If there is no matching session.
+        """
+        selected = set(hosts) if hosts is not None else None
+        sessions = [s for s in self if selected is None or s.host in selected]
+        if not sessions:
+            raise ValueError("No session to subscribe to.")
+        subscription = Subscription(**kwargs)
+        for session in sessions:
+            session.attach(subscription)
+        return subscription
+
+    async def discard(self, host: str, port: Optional[int] = None):
+        """Close and forget a session for a relay (if any)."""
+        session = self._sessions.pop((host, self.port if port is None else port), None)
+        if session is not None:
+            await session.close()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __iter__(self) -> Iterator[Session]:
+        return iter(tuple(self._sessions.values()))
+
+    async def close(self):
+        """Close all sessions."""
+        sessions = tuple(self._sessions.values())
+        self._sessions.clear()
+        await asyncio.gather(*(session.close() for session in sessions))
+
+    async def __aenter__(self):
+        """Return auto-closing context manager."""
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
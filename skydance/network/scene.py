@@ -0,0 +1,237 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional
+
+from skydance.network.session import Session
+from skydance.protocol import Command
+
+
+log = logging.getLogger(__name__)
+
+
+class _Barrier:
+    """Release all waiting tasks at once, when the last party arrives."""
+
+    def __init__(self, parties: int):
+        self._parties = parties
+        self._waiting = 0
+        self._event = asyncio.Event()
+
+    async def wait(self):
+        self._waiting += 1
+        if self._waiting >= self._parties:
+            self._event.set()
+            # yield, so that the last party is resumed in the same tick as others
+            await asyncio.sleep(0)
+        else:
+            await self._event.wait()
+
+    def leave(self):
+        """Stop waiting for a party which failed before arriving."""
+        self._parties -= 1
+        if self._waiting >= self._parties:
+            self._event.set()
+
+
+class SceneReport(NamedTuple):
+    """
+    Results of [`PreparedScene.commit()`][skydance.network.scene.PreparedScene.commit].
+
+    Times are [`time.perf_counter()`](https://docs.python.org/3/library/time.html#time.perf_counter)
+    values.
+    """
+
+    written_at: Dict[Session, float]
+    """Moments the frames were handed to the transport of each session."""
+
+    drained_at: Dict[Session, float]
+    """Moments the frames were accepted by the OS (transport buffers drained)."""
+
+    errors: Dict[Session, Exception]
+    """Sessions which failed to prepare or write, and their exceptions."""
+
+    @property
+    def skew(self) -> float:
+        """Return a difference between the first and the last write in seconds."""
+        return _spread(self.written_at.values())
+
+    @property
+    def drain_skew(self) -> float:
+        """Return a difference between the first and the last drain in seconds."""
+        return _spread(self.drained_at.values())
+
+
+def _spread(times: Iterable[float]) -> float:
+    times = list(times)
+    return max(times) - min(times) if times else 0.0
+
+
+class PreparedScene:
+    """
+    Frames of a scene encoded for each relay, ready to be written at once.
+
+    Create it by [`prepare_scene()`][skydance.network.scene.prepare_scene].
+    """
+
+    frames: Dict[Session, List[bytes]]
+    """Encoded frames of each successfully prepared session."""
+
+    errors: Dict[Session, Exception]
+    """Sessions which failed to connect, and their exceptions."""
+
+    def __init__(
+        self,
+        frames: Dict[Session, List[bytes]],
+        errors: Dict[Session, Exception],
+        *,
+        timeout: Optional[float] = 5.0,
+    ):
+        """
+        Create a PreparedScene.
+
+        Args:
+            frames: Encoded frames of each session.
+            errors: Sessions which failed to prepare.
+            timeout: Maximal time of (re)connecting a single session
+                on commit in seconds.
+        """
+        self.frames = frames
+        self.errors = errors
+        self.timeout = timeout
+        self._committed = False
+
+    async def commit(self) -> SceneReport:
+        """
+        Write the frames to all sessions at the same event loop tick.
+
+        Each session first acquires its write lock (reconnecting if needed) and
+        then waits on a shared barrier. The barrier releases all of them at once,
+        so the writes are not delayed by each other's connects or drains.
+        A session which does not get ready within `timeout` (e.g. because it
+        has to reconnect to a relay which does not accept connections) is
+        reported in `errors` and the others are released without it.
+        A scene can be committed only once, as its frames are already numbered.
+
+        Raise:
+            RuntimeError: If the scene was already committed.
+        """
+        if self._committed:
+            raise RuntimeError("The scene was already committed.")
+        self._committed = True
+
+        barrier = _Barrier(len(self.frames))
+        written_at: Dict[Session, float] = {}
+        drained_at: Dict[Session, float] = {}
+        errors = dict(self.errors)
+        loop = asyncio.get_running_loop()
+
+        async def fire(session: Session, frames: List[bytes]):
+            released = timed_out = False
+            task = asyncio.current_task()
+
+            def expire():
+                nonlocal timed_out
+                timed_out = True
+                task.cancel()  # type: ignore
+
+            # only getting ready is bounded, not waiting for the other sessions
+            expiry = (
+                loop.call_later(self.timeout, expire)
+                if self.timeout is not None
+                else None
+            )
+
+            async def release():
+                nonlocal released
+                released = True
+                if expiry is not None:
+                    expiry.cancel()
+                await barrier.wait()
+
+            def fail(error: Exception):
+                log.debug("Scene write to %s failed: %s", session.host, error)
+                errors[session] = error
+                if not released:
+                    barrier.leave()
+
+            try:
+                written_at[session] = await session.write_released(frames, release)
+                drained_at[session] = time.perf_counter()
+            except OSError as e:
+                fail(e)
+            except asyncio.CancelledError:
+                if not timed_out:
+                    raise
+                fail(asyncio.TimeoutError("The session was not ready in time."))
+            finally:
+                if expiry is not None:
+                    expiry.cancel()
+
+        await asyncio.gather(
+            *(fire(session, frames) for session, frames in self.frames.items())
+        )
+        return SceneReport(written_at, drained_at, errors)
+
+
+async def prepare_scene(
+    commands: Mapping[Session, Iterable[Command]], *, timeout: Optional[float] = 5.0
+) -> PreparedScene:
+    """
+    Connect all sessions of a scene and encode their frames in advance.
+
+    Frame numbers are allocated from each session
+    [`state`][skydance.network.session.Session] now, so avoid sending other
+    commands to the sessions until the scene is committed.
+
+    Example:
+        >>> scene = await prepare_scene({
+        >>>     pool.get(host): [PowerCommand(State(), zone=zone, power=True) for zone in zones]
+        >>>     for host, zones in building.items()
+        >>> })
+        >>> report = await scene.commit()
+        >>> print(f"Skew: {report.skew * 1e3:.3f} ms, failed: {list(report.errors)}")
+
+    Args:
+        commands: Commands to send to each session. The `state` the commands were
+            created with is not used.
+        timeout: Maximal time of connecting a single session in seconds,
+            both now and when (re)connecting on commit.
+
+    Returns:
+        A scene to [`commit()`][skydance.network.scene.PreparedScene.commit].
+        Sessions which failed to connect are only listed in its `errors`.
+    """
+    sessions = {session: list(cmds) for session, cmds in commands.items()}
+
+    async def connect(session: Session) -> Optional[Exception]:
+        try:
+            await asyncio.wait_for(session.connect(), timeout)
+        except (OSError, asyncio.TimeoutError) as e:
+            return e
+        return None
+
+    results = await asyncio.gather(*(connect(session) for session in sessions))
+    frames: Dict[Session, List[bytes]] = {}
+    errors: Dict[Session, Exception] = {}
+    for (session, cmds), error in zip(sessions.items(), results):
+        if error is not None:
+            errors[session] = error
+        elif cmds:
+            frames[session] = [
+                command.encode(session.state.allocate_frame_number())
+                for command in cmds
+            ]
+    return PreparedScene(frames, errors, timeout=timeout)
+
+
+async def fire_scene(
+    commands: Mapping[Session, Iterable[Command]], *, timeout: Optional[float] = 5.0
+) -> SceneReport:
+    """
+    Prepare and immediately commit a scene.
+
+    See [`prepare_scene()`][skydance.network.scene.prepare_scene].
+    """
+    scene = await prepare_scene(commands, timeout=timeout)
+    return await scene.commit()
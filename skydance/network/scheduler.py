@@ -0,0 +1,336 @@
+import asyncio
+import contextlib
+import heapq
+import itertools
+import json
+import logging
+import math
+import os
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from skydance.network.pool import SessionPool
+from skydance.protocol import Command, State
+
+
+log = logging.getLogger(__name__)
+
+SCHEDULE_FORMAT = 1
+"""Version of the persisted schedule layout."""
+
+# tolerance of timers firing a bit early (clock resolution, float rounding)
+_EPSILON = 1e-6
+
+
+class StoredCommand(Command):
+    """A command restored from a persisted schedule, known only by its body."""
+
+    def __init__(self, state: State, body: bytes):
+        """
+        Create a StoredCommand.
+
+        Args:
+            state: See [Command][skydance.protocol.Command].
+            body: A body of the original command.
+        """
+        super().__init__(state)
+        self._body = body
+
+    @property
+    def body(self) -> bytes:
+        return self._body
+
+
+class ScheduledAction:
+    """A command scheduled by a [Scheduler][skydance.network.scheduler.Scheduler]."""
+
+    __slots__ = (
+        "due",
+        "host",
+        "port",
+        "command",
+        "every",
+        "cancelled",
+        "_order",
+        "_queued",
+    )
+
+    def __init__(
+        self,
+        due: float,
+        host: str,
+        port: Optional[int],
+        command: Command,
+        every: Optional[float],
+        order: int,
+    ):
+        self.due = due
+        """A [`time.time()`](https://docs.python.org/3/library/time.html#time.time) of the next run."""
+        self.host = host
+        self.port = port
+        self.command = command
+        self.every = every
+        """A repeat interval in seconds, or `None` for a single run."""
+        self.cancelled = False
+        self._order = order
+        self._queued = False
+
+    def __lt__(self, other: "ScheduledAction") -> bool:
+        return (self.due, self._order) < (other.due, other._order)
+
+    def __repr__(self):
+        return (
+            f"ScheduledAction(due={self.due!r}, host={self.host!r}, "
+            f"command={type(self.command).__name__}, every={self.every!r})"
+        )
+
+
+class Scheduler:
+    """
+    Send many timed commands using a single task.
+
+    Pending actions are kept in a heap, so scheduling costs O(log n) and
+    cancelling O(1) (cancelled actions are skipped when they are due).
+    Time is divided into ticks: the scheduler wakes up at the end of a tick
+    and sends all actions due by then together, as a single
+    [`send_many()`][skydance.network.session.Session.send_many] batch per
+    relay. Actions are never sent early, at most one tick late.
+
+    If a `path` is given, the schedule is loaded from it on start and saved
+    (atomically) on changes and on close, so it survives restarts.
+    Restored commands are [StoredCommand][skydance.network.scheduler.StoredCommand]
+    instances. Actions which became due while the scheduler was not running
+    are sent right away, repeating ones only once.
+
+    Example:
+        >>> async with SessionPool() as pool, Scheduler(pool, path="schedule.json") as scheduler:
+        >>>     at = datetime(2024, 1, 1, 22).timestamp()
+        >>>     scheduler.schedule(at, "192.168.1.5", BrightnessCommand(State(), zone=3, brightness=51), every=86400)
+        >>>     await asyncio.Event().wait()  # run forever
+    """
+
+    def __init__(
+        self,
+        pool: SessionPool,
+        *,
+        path: Optional[str] = None,
+        tick: float = 0.05,
+        save_delay: float = 1.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Create a Scheduler.
+
+        Args:
+            pool: A pool providing sessions of the relays.
+            path: A file to persist the schedule to.
+            tick: A length of a tick in seconds.
+            save_delay: How long to wait after a change before saving the schedule.
+            clock: A source of the current time, compatible with `time.time()`.
+        """
+        self.pool = pool
+        self.path = path
+        self.tick = tick
+        self.save_delay = save_delay
+        self.clock = clock
+        self._heap: List[ScheduledAction] = []
+        self._active = 0
+        self._order = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._dirty = False
+        self._closing = False
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    def __len__(self) -> int:
+        """Return number of pending actions."""
+        return self._active
+
+    def schedule(
+        self,
+        at: float,
+        host: str,
+        command: Command,
+        *,
+        port: Optional[int] = None,
+        every: Optional[float] = None,
+    ) -> ScheduledAction:
+        """
+        Schedule a command.
+
+        Args:
+            at: A [`time.time()`](https://docs.python.org/3/library/time.html#time.time)
+                of the (first) run.
+            host: A relay to send the command to, see
+                [`SessionPool.get()`][skydance.network.pool.SessionPool.get].
+            command: A command to send. Its frame number is allocated when sent.
+            port: A relay port. Defaults to the pool port.
+            every: Repeat the command with this interval in seconds.
+
+        Returns:
+            A handle to [`cancel()`][skydance.network.scheduler.Scheduler.cancel]
+            the action.
+
+        Raise:
+            ValueError: If the interval is not positive.
+        """
+        if every is not None and every <= 0:
+            raise ValueError("Repeat interval must be positive.")
+        action = ScheduledAction(at, host, port, command, every, next(self._order))
+        self._push(action)
+        self._changed()
+        return action
+
+    def cancel(self, action: ScheduledAction):
+        """Cancel a pending action. Cancelling it again (or after it ran) has no effect."""
+        if action.cancelled:
+            return
+        action.cancelled = True
+        if action._queued:
+            self._active -= 1
+            self._changed()
+
+    def actions(self) -> List[ScheduledAction]:
+        """Return pending actions ordered by their due time."""
+        return sorted(action for action in self._heap if not action.cancelled)
+
+    def _push(self, action: ScheduledAction):
+        heapq.heappush(self._heap, action)
+        action._queued = True
+        self._active += 1
+
+    def _changed(self):
+        self._dirty = True
+        self._wakeup.set()
+
+    def _pop_due(self, until: float) -> List[ScheduledAction]:
+        due = []
+        heap = self._heap
+        while heap and heap[0].due <= until:
+            action = heapq.heappop(heap)
+            action._queued = False
+            if action.cancelled:
+                continue
+            self._active -= 1
+            due.append(action)
+        return due
+
+    async def run_due(self) -> int:
+        """
+        Send all actions which are due.
+
+        Returns:
+            Number of sent actions.
+        """
+        now = self.clock()
+        actions = self._pop_due(now + _EPSILON)
+        if not actions:
+            return 0
+
+        batches: Dict[Tuple[str, Optional[int]], List[Command]] = {}
+        for action in actions:
+            batches.setdefault((action.host, action.port), []).append(action.command)
+            if action.every is not None:
+                # skip runs missed e.g. while the scheduler was not running
+                skipped = max(math.floor((now - action.due) / action.every), 0)
+                action.due += (skipped + 1) * action.every
+                action._order = next(self._order)
+                self._push(action)
+        self._dirty = True
+
+        async def send(relay: Tuple[str, Optional[int]], commands: List[Command]):
+            try:
+                await self.pool.get(*relay).send_many(commands)
+            except OSError as e:
+                log.warning("Scheduled commands for %s failed: %s", relay[0], e)
+
+        await asyncio.gather(*(send(*batch) for batch in batches.items()))
+        return len(actions)
+
+    async def _run(self):
+        last_save = self.clock()
+        while not self._closing:
+            self._wakeup.clear()
+            await self.run_due()
+            now = self.clock()
+            saving = self._dirty and self.path is not None
+            if saving and now - last_save >= self.save_delay:
+                self.save()
+                last_save = now
+                saving = False
+            timeout = None
+            if self._heap:
+                # wake up at the end of the tick the first action is due in,
+                # to send the actions due in the same tick together
+                due = self._heap[0].due
+                wakeup = max(math.ceil(due / self.tick) * self.tick, due)
+                timeout = max(wakeup - now, 0)
+            if saving:
+                delay = self.save_delay - (now - last_save)
+                timeout = delay if timeout is None else min(timeout, delay)
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+
+    def save(self):
+        """Save pending actions to the `path` (if set)."""
+        if self.path is None:
+            return
+        data = {
+            "format": SCHEDULE_FORMAT,
+            "actions": [
+                [
+                    action.due,
+                    action.host,
+                    action.port,
+                    action.command.body.hex(),
+                    action.every,
+                ]
+                for action in self.actions()
+            ],
+        }
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(temporary, self.path)
+        self._dirty = False
+
+    def load(self):
+        """
+        Add actions saved in the `path` (if set and it exists).
+
+        Raise:
+            ValueError: If the file has an unknown format.
+        """
+        if self.path is None or not os.path.exists(self.path):
+            return
+        with open(self.path) as f:
+            data = json.load(f)
+        if data.get("format") != SCHEDULE_FORMAT:
+            raise ValueError(f"Unknown schedule format: {data.get('format')}.")
+        state = State()
+        for due, host, port, body, every in data["actions"]:
+            command = StoredCommand(state, bytes.fromhex(body))
+            order = next(self._order)
+            self._push(ScheduledAction(due, host, port, command, every, order))
+
+    async def start(self):
+        """Load the persisted schedule and start sending."""
+        self.load()
+        self._closing = False
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """Stop sending (after a batch being sent) and save the schedule."""
+        if self._task is not None:
+            self._closing = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        self.save()
+
+    async def __aenter__(self):
+        """Return auto-closing context manager."""
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
@@ -1,29 +1,271 @@
 import asyncio
 import contextlib
 import logging
-from typing import Tuple
+import socket
+import time
+from typing import (
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from skydance.metrics import NOOP_METRICS, Labels, Metrics, relay_labels
+from skydance.network.buffer import FrameBuffer
+from skydance.network.capture import Direction, WireRecorder
+from skydance.network.connect import open_first_connection
+from skydance.network.fair import FairQueue, Producer
+from skydance.network.journal import CommandJournal
+from skydance.network.stream import FrameStream
+from skydance.network.subscribe import Notification, Subscription
+from skydance.protocol import (
+    DEVICE_BASE_TYPE_NORMAL,
+    HEAD,
+    Command,
+    State,
+    parse_response,
+)
 
 
 log = logging.getLogger(__name__)
 
+# a zone mask followed by a command type, at the same offset of command
+# and response bodies
+_COMMAND_ZONE_OFFSET = 7
+_COMMAND_CMD_TYPE_OFFSET = 9
+_RESPONSE_ZONE_OFFSET = len(HEAD) + 1 + _COMMAND_ZONE_OFFSET
+_READER_RETRY_DELAY = 1.0
+
+
+class SocketOptions(NamedTuple):
+    """
+    Socket options applied to each connection opened by a [Session][skydance.network.session.Session].
+
+    Options not supported by the platform are skipped.
+    """
+
+    nodelay: bool = True
+    """Disable Nagle's algorithm, so small frames are sent immediately."""
+
+    keepalive: bool = True
+    """Detect dead connections (e.g. a relay losing power) using TCP keepalive."""
+
+    keepalive_idle: int = 30
+    """Seconds of idleness before the first keepalive probe."""
+
+    keepalive_interval: int = 10
+    """Seconds between keepalive probes."""
+
+    keepalive_count: int = 3
+    """Number of failed probes after which the connection is dropped."""
+
+    send_buffer: Optional[int] = None
+    """A size of the kernel send buffer in bytes. Keep system default if not set."""
+
+    receive_buffer: Optional[int] = None
+    """A size of the kernel receive buffer in bytes. Keep system default if not set."""
+
+    def apply(self, sock):
+        """
+        Set the options on a connected TCP socket.
+
+        Args:
+            sock: A socket, e.g. obtained by `writer.get_extra_info("socket")`.
+        """
+        options = [
+            (socket.IPPROTO_TCP, socket.TCP_NODELAY, int(self.nodelay)),
+            (socket.SOL_SOCKET, socket.SO_KEEPALIVE, int(self.keepalive)),
+        ]
+        if self.keepalive:
+            # TCP_KEEPALIVE is the macOS name of TCP_KEEPIDLE
+            idle = getattr(
+                socket, "TCP_KEEPIDLE", getattr(socket, "TCP_KEEPALIVE", None)
+            )
+            for name, value in (
+                (idle, self.keepalive_idle),
+                (getattr(socket, "TCP_KEEPINTVL", None), self.keepalive_interval),
+                (getattr(socket, "TCP_KEEPCNT", None), self.keepalive_count),
+            ):
+                if name is not None:
+                    options.append((socket.IPPROTO_TCP, name, value))
+        if self.send_buffer is not None:
+            options.append((socket.SOL_SOCKET, socket.SO_SNDBUF, self.send_buffer))
+        if self.receive_buffer is not None:
+            options.append((socket.SOL_SOCKET, socket.SO_RCVBUF, self.receive_buffer))
+        for level, name, value in options:
+            try:
+                sock.setsockopt(level, name, value)
+            except OSError as e:
+                log.debug("Cannot set socket option %d/%d: %s", level, name, e)
+
+
+DEFAULT_SOCKET_OPTIONS = SocketOptions()
+"""Socket options used by sessions by default."""
+
+
+def _reply_key(command: Command) -> Optional[bytes]:
+    """Return the zone mask and command type of a response to a command."""
+    body = command.body
+    if len(body) <= _COMMAND_CMD_TYPE_OFFSET:
+        # an unknown layout, any frame is the response
+        return None
+    cmd_type = (body[_COMMAND_CMD_TYPE_OFFSET] + DEVICE_BASE_TYPE_NORMAL) & 0xFF
+    return body[_COMMAND_ZONE_OFFSET:_COMMAND_CMD_TYPE_OFFSET] + bytes([cmd_type])
+
+
+def _is_reply(raw: bytes, key: Optional[bytes]) -> bool:
+    if key is None:
+        return True
+    return raw[_RESPONSE_ZONE_OFFSET : _RESPONSE_ZONE_OFFSET + len(key)] == key
+
 
 class Session:
-    """A session object handling connection re-creation in case of its failure."""
+    """
+    A session object handling connection re-creation in case of its failure.
+
+    The session owns a [State][skydance.protocol.State] used by
+    [`send()`][skydance.network.session.Session.send] to number the frames.
+    After a connection is re-created, the frame numbers continue from where
+    they were, unless `reset_frame_number_on_reconnect` is set.
+    """
+
+    _connection: Optional[Tuple[asyncio.StreamReader, asyncio.StreamWriter]]
+
+    def __init__(
+        self,
+        host,
+        port,
+        *,
+        metrics: Metrics = NOOP_METRICS,
+        labels: Optional[Labels] = None,
+        recorder: Optional[WireRecorder] = None,
+        state: Optional[State] = None,
+        reset_frame_number_on_reconnect: bool = False,
+        socket_options: Optional[SocketOptions] = DEFAULT_SOCKET_OPTIONS,
+        addresses: Optional[Sequence[str]] = None,
+        connect_delay: float = 0.25,
+        journal: Optional[CommandJournal] = None,
+    ):
+        """
+        Create a Session.
 
-    def __init__(self, host, port):
+        Args:
+            host: A relay IP address or hostname.
+            port: A relay port.
+            metrics: A sink for reporting metrics.
+            labels: Labels attached to all reported metrics. Defaults to
+                [`relay_labels(host=host)`][skydance.metrics.relay_labels].
+            recorder: A recorder capturing all written and read data.
+            state: A state used for frame numbering. A new one is created by default.
+            reset_frame_number_on_reconnect: Whether to start numbering frames from
+                zero each time a new connection is opened.
+            socket_options: Options set on each opened socket. If `None`,
+                the socket is left as created by asyncio.
+            addresses: All known addresses of the relay. If set, connections
+                are raced across them using
+                [`open_first_connection()`][skydance.network.connect.open_first_connection]
+                and `host` only identifies the relay (e.g. in metrics).
+                The winning address is tried first next time.
+            connect_delay: Seconds to wait for a connection attempt before
+                racing the next address.
+            journal: A journal of commands written by
+                [`send()`][skydance.network.session.Session.send] and
+                [`send_many()`][skydance.network.session.Session.send_many],
+                replayed after each reconnect (see
+                [CommandJournal][skydance.network.journal.CommandJournal]).
+                Each session needs its own journal.
+        """
         self.host = host
         self.port = port
+        self.metrics = metrics
+        self.labels = relay_labels(host=host) if labels is None else labels
+        self.recorder = recorder
+        self.state = State() if state is None else state
+        self.reset_frame_number_on_reconnect = reset_frame_number_on_reconnect
+        self.socket_options = socket_options
+        self.addresses = list(addresses) if addresses else None
+        self.connect_delay = connect_delay
+        self.address: Optional[str] = None
+        """An address of the current (or last) connection."""
+        self.journal = journal
+        self._replay_journal = False
+        self._subscriptions: Dict[Subscription, Callable[[], None]] = {}
+        self._reader: Optional["asyncio.Task[None]"] = None
+        self._reading = False
+        self._expected: Optional[Tuple[Optional[bytes], "asyncio.Future[bytes]"]] = None
+        self._fair_queue: Optional[FairQueue] = None
         self._connection = None
+        self._connect_lock = asyncio.Lock()
         self._write_lock = asyncio.Lock()
         self._read_lock = asyncio.Lock()
+        self._request_lock = asyncio.Lock()
+        self._response_buffer = FrameBuffer(metrics=metrics, labels=self.labels)
 
     async def _get_connection(
         self,
     ) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
-        if self._connection is None:
+        if self._connection is not None:
+            return self._connection
+        # readers and writers may get here at once, only one of them connects
+        async with self._connect_lock:
+            if self._connection is not None:
+                return self._connection
             log.debug("Opening connection to: %s:%d", self.host, self.port)
-            self._connection = await asyncio.open_connection(self.host, self.port)
-        return self._connection
+            if self.reset_frame_number_on_reconnect:
+                self.state.reset()
+            self._response_buffer.reset()
+            start = time.perf_counter()
+            if self.addresses:
+                address, reader, writer = await open_first_connection(
+                    self.addresses, self.port, delay=self.connect_delay
+                )
+                self._connection = reader, writer
+                # remember the winner, so that it is tried first next time
+                self.addresses.remove(address)
+                self.addresses.insert(0, address)
+                self.address = address
+            else:
+                self._connection = await asyncio.open_connection(self.host, self.port)
+                self.address = self.host
+            if self.socket_options is not None:
+                sock = self._connection[1].get_extra_info("socket")
+                if sock is not None:
+                    self.socket_options.apply(sock)
+            self.metrics.histogram(
+                "session_connect_seconds", time.perf_counter() - start, self.labels
+            )
+            self.metrics.counter("session_connects_total", 1, self.labels)
+            if self._replay_journal:
+                await self._replay(self._connection[1])
+            return self._connection
+
+    async def _replay(self, writer: asyncio.StreamWriter):
+        self._replay_journal = False
+        commands = self.journal.replay() if self.journal is not None else []
+        if commands:
+            log.debug("Replaying %d journaled commands", len(commands))
+            frames = [
+                command.encode(self.state.allocate_frame_number())
+                for command in commands
+            ]
+            self._transmit(writer, frames)
+            await self._drain(writer, frames)
+            self.metrics.counter(
+                "session_journal_replayed_total", len(frames), self.labels
+            )
+
+    async def connect(self):
+        """
+        Open a connection now, unless it is already open.
+
+        Connections are otherwise opened lazily on first use.
+        """
+        await self._get_connection()
 
     async def _close_connection(self) -> None:
         if self._connection:
@@ -34,6 +276,11 @@ class Session:
                 await writer.wait_closed()
             self._connection = None
 
+    async def _reconnect(self) -> None:
+        self.metrics.counter("session_reconnects_total", 1, self.labels)
+        self._replay_journal = self.journal is not None
+        await self._close_connection()
+
     async def write(self, data: bytes):
         """
         Write a data to the transport and drain immediatelly.
@@ -42,15 +289,183 @@ class Session:
         [`asyncio.streams.StreamWriter.write()`](https://docs.python.org/3/library/asyncio-stream.html#asyncio.StreamWriter.write)
         """
         async with self._write_lock:
-            while True:
-                try:
-                    _, writer = await self._get_connection()
-                    log.debug("Sending: %s", data.hex(" "))
-                    writer.write(data)
-                    await writer.drain()
+            await self._write(lambda: [data])
+
+    async def write_many(self, frames: Iterable[bytes]):
+        """
+        Write many frames at once and drain only once.
+
+        The frames are passed to the transport in a single call, so a burst of
+        small frames results in few TCP segments and a single event loop round trip.
+
+        Args:
+            frames: Complete frames to write.
+        """
+        data = list(frames)
+        if data:
+            async with self._write_lock:
+                await self._write(lambda: data)
+
+    async def send(self, command: Command):
+        """
+        Encode a command and write it to the transport.
+
+        The frame number is allocated from the session
+        [`state`][skydance.network.session.Session] at the moment the frame
+        is written, so concurrent senders never share a frame number and
+        frames are numbered in the order they are written. If the write fails
+        and is retried, a new frame number is allocated. A `state` the command
+        was created with is not used.
+
+        If the session has a [`journal`][skydance.network.journal.CommandJournal],
+        the command is recorded there and it is not written at all if a replay
+        after a reconnect has already written it (or a newer command of the same
+        zone and attribute) meanwhile.
+
+        Args:
+            command: A command to send.
+        """
+        await self.send_many([command])
+
+    async def send_many(self, commands: Iterable[Command]):
+        """
+        Encode many commands and write them at once, draining only once.
+
+        Frame numbers are allocated as in
+        [`send()`][skydance.network.session.Session.send], consecutively
+        in the order of the commands.
+
+        Args:
+            commands: Commands to send.
+        """
+        journal = self.journal
+        records = [
+            (command, journal.record(command) if journal is not None else 0)
+            for command in commands
+        ]
+        if not records:
+            return
+
+        def encode() -> List[bytes]:
+            frames = []
+            for command, sequence in records:
+                if journal is not None and journal.is_delivered(command, sequence):
+                    self.metrics.counter(
+                        "session_journal_skipped_total", 1, self.labels
+                    )
+                    continue
+                frames.append(command.encode(self.state.allocate_frame_number()))
+            return frames
+
+        async with self._write_lock:
+            await self._write(encode)
+            if journal is not None:
+                for command, sequence in records:
+                    journal.mark_delivered(command, sequence)
+
+    async def write_released(
+        self, frames: Iterable[bytes], release: Callable[[], Awaitable[object]]
+    ) -> float:
+        """
+        Write frames as soon as `release` completes.
+
+        The connection is opened and the write lock is acquired before waiting,
+        so nothing is awaited between the release and handing the frames to
+        the transport. This is how
+        [`PreparedScene.commit()`][skydance.network.scene.PreparedScene.commit]
+        writes to many relays at the same event loop tick.
+
+        Args:
+            frames: Complete frames to write.
+            release: A coroutine function to wait for, e.g. a barrier.
+
+        Returns:
+            A [`time.perf_counter()`](https://docs.python.org/3/library/time.html#time.perf_counter)
+            value of the moment the frames were written. If the connection
+            broke meanwhile, it is a moment of writing them again after a reconnect.
+        """
+        data = list(frames)
+        async with self._write_lock:
+            _, writer = await self._get_connection()
+            await release()
+            try:
+                self._transmit(writer, data)
+                written = time.perf_counter()
+                await self._drain(writer, data)
+            except (ConnectionResetError, ConnectionAbortedError):
+                await self._reconnect()
+                written = time.perf_counter()
+                await self._write(lambda: data)
+        return written
+
+    async def _write(self, encode: Callable[[], List[bytes]]):
+        while True:
+            try:
+                _, writer = await self._get_connection()
+                frames = encode()
+                if not frames:
                     return
-                except (ConnectionResetError, ConnectionAbortedError):
-                    await self._close_connection()
+                self._transmit(writer, frames)
+                await self._drain(writer, frames)
+                return
+            except (ConnectionResetError, ConnectionAbortedError):
+                await self._reconnect()
+
+    def _transmit(self, writer: asyncio.StreamWriter, frames: List[bytes]):
+        if log.isEnabledFor(logging.DEBUG):
+            for data in frames:
+                log.debug("Sending: %s", data.hex(" "))
+        if self.recorder is not None:
+            for data in frames:
+                self.recorder.record(Direction.SENT, str(self.host), data)
+        if len(frames) == 1:
+            writer.write(frames[0])
+        else:
+            writer.writelines(frames)
+
+    async def _drain(self, writer: asyncio.StreamWriter, frames: List[bytes]):
+        start = time.perf_counter()
+        await writer.drain()
+        self.metrics.histogram(
+            "session_drain_seconds", time.perf_counter() - start, self.labels
+        )
+        self.metrics.counter("session_writes_total", len(frames), self.labels)
+        self.metrics.counter(
+            "session_bytes_sent_total", sum(map(len, frames)), self.labels
+        )
+
+    def stream(self, *, max_delay: float = 0.1) -> FrameStream:
+        """
+        Start streaming commands with deadlines, dropping the outdated ones.
+
+        Use it for animations and music-reactive effects, where a late frame
+        is worse than a skipped one. Must be called with an event loop running.
+
+        Args:
+            max_delay: A default deadline of pushed commands, see
+                [FrameStream][skydance.network.stream.FrameStream].
+        """
+        return FrameStream(self, max_delay=max_delay)
+
+    def producer(self, name: str, *, weight: float = 1.0) -> Producer:
+        """
+        Return a handle for a producer sharing this session fairly with others.
+
+        Commands sent through producer handles are queued per producer and
+        written in weighted fair order (see
+        [FairQueue][skydance.network.fair.FairQueue]), so a chatty producer
+        cannot delay the others by more than its share.
+
+        Args:
+            name: A name of the producer, e.g. `"ui"` or `"effects"`.
+            weight: A share of the session throughput relative to other producers.
+
+        Raise:
+            ValueError: If the weight is not positive.
+        """
+        if self._fair_queue is None:
+            self._fair_queue = FairQueue(self)
+        return self._fair_queue.producer(name, weight=weight)
 
     async def read(self, n=-1) -> bytes:
         """
@@ -58,19 +473,186 @@ class Session:
 
         This is a wrapper on top of
         [`asyncio.streams.StreamReader.read()`](https://docs.python.org/3/library/asyncio-stream.html#asyncio.StreamReader.read)
+
+        Do not use it while the session has
+        [subscriptions][skydance.network.session.Session.subscribe].
         """
         async with self._read_lock:
             while True:
                 try:
                     reader, _ = await self._get_connection()
                     res = await reader.read(n)
-                    log.debug("Received: %s", res.hex(" "))
+                    if log.isEnabledFor(logging.DEBUG):
+                        log.debug("Received: %s", res.hex(" "))
+                    if self.recorder is not None:
+                        self.recorder.record(Direction.RECEIVED, str(self.host), res)
+                    self.metrics.counter(
+                        "session_bytes_received_total", len(res), self.labels
+                    )
                     return res
                 except (ConnectionResetError, ConnectionAbortedError):
-                    await self._close_connection()
+                    await self._reconnect()
+
+    async def request(self, command: Command) -> bytes:
+        """
+        Send a command and return a complete response to it.
+
+        Concurrent requests are serialized. The response is the first frame
+        with the command type and zone mask of the command, other frames
+        (e.g. a late response to a cancelled request) are skipped, so each
+        caller gets the response to its own command. Do not mix this with
+        direct [`read()`][skydance.network.session.Session.read] calls.
+
+        Args:
+            command: A command expecting a response, e.g.
+                [`GetZoneInfoCommand`][skydance.protocol.GetZoneInfoCommand].
+
+        Raise:
+            ConnectionError: If the relay closes the connection before responding.
+        """
+        async with self._request_lock:
+            if self._reading:
+                return await self._request_from_reader(command)
+            key = _reply_key(command)
+            await self.send(command)
+            while True:
+                while not self._response_buffer.is_message_ready:
+                    chunk = await self.read(4096)
+                    if not chunk:
+                        await self._reconnect()
+                        raise ConnectionError(
+                            "Connection closed before a response arrived."
+                        )
+                    self._response_buffer.feed(chunk)
+                raw = self._response_buffer.get_message()
+                if _is_reply(raw, key):
+                    return raw
+                log.debug("Skipping unexpected frame: %s", raw.hex(" "))
+
+    async def _request_from_reader(self, command: Command) -> bytes:
+        # the continuous reader resolves the future with the first frame
+        # of the same zone mask and command type
+        future = asyncio.get_running_loop().create_future()
+        self._expected = _reply_key(command), future
+        try:
+            await self.send(command)
+            return await future
+        finally:
+            self._expected = None
+
+    def subscribe(
+        self,
+        *,
+        zone: Optional[int] = None,
+        cmd_type: Optional[int] = None,
+        maxsize: int = 64,
+        callback: Optional[Callable[[Notification], object]] = None,
+    ) -> Subscription:
+        """
+        Subscribe to frames the relay sends on its own.
+
+        The first subscription starts a task continuously reading from the
+        connection, which runs until the session is closed. Meanwhile,
+        [`request()`][skydance.network.session.Session.request] gets its
+        response from the task, every other frame is published to the
+        matching subscriptions. Do not call
+        [`read()`][skydance.network.session.Session.read] directly then.
+
+        Args:
+            zone: See [Subscription][skydance.network.subscribe.Subscription].
+            cmd_type: See [Subscription][skydance.network.subscribe.Subscription].
+            maxsize: See [Subscription][skydance.network.subscribe.Subscription].
+            callback: See [Subscription][skydance.network.subscribe.Subscription].
+        """
+        subscription = Subscription(
+            zone=zone, cmd_type=cmd_type, maxsize=maxsize, callback=callback
+        )
+        self.attach(subscription)
+        return subscription
+
+    def attach(self, subscription: Subscription):
+        """
+        Publish frames received by this session to an existing subscription.
+
+        A single subscription can be attached to many sessions, it is closed
+        when all of them are closed.
+        """
+        if subscription.closed:
+            raise ValueError("The subscription is closed.")
+
+        def detach():
+            self._subscriptions.pop(subscription, None)
+
+        subscription._attach(detach)
+        self._subscriptions[subscription] = detach
+        if self._reader is None:
+            self._reader = asyncio.create_task(self._read_forever())
+
+    async def _read_forever(self):
+        # wait for a request in progress, it reads its response itself
+        async with self._request_lock:
+            self._reading = True
+        while True:
+            try:
+                chunk = await self.read(4096)
+            except OSError as e:
+                log.debug("Reading from %s:%d failed: %s", self.host, self.port, e)
+                self._fail_expected(e)
+                await self._reconnect()
+                await asyncio.sleep(_READER_RETRY_DELAY)
+                continue
+            if not chunk:
+                self._fail_expected(
+                    ConnectionError("Connection closed before a response arrived.")
+                )
+                await self._reconnect()
+                continue
+            self._response_buffer.feed(chunk)
+            while self._response_buffer.is_message_ready:
+                self._dispatch(self._response_buffer.get_message())
+
+    def _dispatch(self, raw: bytes):
+        try:
+            response = parse_response(raw)
+        except ValueError as e:
+            log.debug("Ignoring malformed frame %s: %s", raw.hex(" "), e)
+            return
+        expected = self._expected
+        if expected is not None and _is_reply(raw, expected[0]):
+            self._expected = None
+            if not expected[1].done():
+                expected[1].set_result(raw)
+            return
+        notification = Notification(str(self.host), response)
+        for subscription in tuple(self._subscriptions):
+            if subscription.matches(response) and not subscription.publish(
+                notification
+            ):
+                self.metrics.counter(
+                    "session_notifications_dropped_total", 1, self.labels
+                )
+
+    def _fail_expected(self, error: Exception):
+        expected, self._expected = self._expected, None
+        if expected is not None and not expected[1].done():
+            expected[1].set_exception(error)
+
+    async def _stop_reader(self):
+        if self._reader is not None:
+            self._reader.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._reader
+            self._reader = None
+            self._reading = False
+            self._fail_expected(ConnectionError("The session was closed."))
+        for subscription, detach in tuple(self._subscriptions.items()):
+            subscription._detach(detach)
 
     async def close(self):
-        """Close connection."""
+        """Close connection and subscriptions which have no other session attached."""
+        if self._fair_queue is not None:
+            await self._fair_queue.close()
+        await self._stop_reader()
         await self._close_connection()
 
     async def __aenter__(self):
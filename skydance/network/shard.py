@@ -0,0 +1,604 @@
+"""
+Spread sessions of a large fleet of relays across several worker processes.
+
+Each worker process runs its own event loop with a
+[SessionPool][skydance.network.pool.SessionPool]. A coordinator in the
+calling process assigns relays to workers and routes commands to them
+over pipes using a compact binary encoding.
+"""
+
+import asyncio
+import builtins
+import concurrent.futures
+import itertools
+import multiprocessing
+import os
+import struct
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from skydance.network.pool import SessionPool
+from skydance.protocol import PORT, Command, State
+
+
+RelayKey = Tuple[str, int]
+
+# request ID, operation, port, host length - followed by host and payload
+_REQUEST = struct.Struct("<IBHB")
+# request ID, status - followed by payload
+_REPLY = struct.Struct("<IB")
+# open sessions, handled commands, errors
+_HEALTH = struct.Struct("<III")
+
+_OP_SEND = 1
+_OP_REQUEST = 2
+_OP_DISCARD = 3
+_OP_HEALTH = 4
+_OP_STOP = 5
+_OP_OFFSET = 4
+
+_STATUS_OK = 0
+_STATUS_ERROR = 1
+
+
+class ShardHealth(NamedTuple):
+    """A health report of a single shard."""
+
+    shard: int
+    pid: Optional[int]
+    alive: bool
+    """Whether the worker process is running and responding."""
+
+    relays: int
+    """Number of relays assigned to the shard."""
+
+    sessions: int
+    """Number of sessions created by the worker."""
+
+    commands: int
+    """Number of commands handled by the worker."""
+
+    errors: int
+    """Number of commands which failed in the worker."""
+
+    latency: Optional[float]
+    """A round trip time (in seconds) of the health check, if it succeeded."""
+
+
+class _EncodedCommand(Command):
+    def __init__(self, state: State, body: bytes):
+        super().__init__(state)
+        self._body = body
+
+    @property
+    def body(self) -> bytes:
+        return self._body
+
+
+def _encode_error(e: BaseException) -> bytes:
+    return f"{type(e).__name__}\0{e}".encode("utf-8", errors="replace")
+
+
+def _decode_error(payload: bytes) -> Exception:
+    name, _, message = payload.decode("utf-8", errors="replace").partition("\0")
+    cls = getattr(builtins, name, None)
+    if isinstance(cls, type) and issubclass(cls, Exception):
+        try:
+            return cls(message)
+        except TypeError:
+            pass
+    return RuntimeError(f"{name}: {message}")
+
+
+class _Worker:
+    """A worker side of a shard, running in its own process and event loop."""
+
+    def __init__(self, conn, pool: SessionPool, timeout: Optional[float]):
+        self._conn = conn
+        self._pool = pool
+        self._timeout = timeout
+        self._commands = 0
+        self._errors = 0
+        # the last scheduled task of each relay, commands of a relay run in order
+        self._tails: Dict[RelayKey, "asyncio.Task[None]"] = {}
+
+    def _reply(self, request_id: int, status: int, payload: bytes = b""):
+        self._conn.send_bytes(_REPLY.pack(request_id, status) + payload)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        messages: "asyncio.Queue[Optional[bytes]]" = asyncio.Queue()
+
+        def receive():
+            while True:
+                try:
+                    message: Optional[bytes] = self._conn.recv_bytes()
+                except (EOFError, OSError):
+                    message = None
+                loop.call_soon_threadsafe(messages.put_nowait, message)
+                if message is None or message[_OP_OFFSET] == _OP_STOP:
+                    return
+
+        threading.Thread(
+            target=receive, name="skydance-shard-pipe", daemon=True
+        ).start()
+        while True:
+            message = await messages.get()
+            if message is None:
+                # the coordinator is gone, there is nobody to reply to
+                return
+            request_id, op, port, host_length = _REQUEST.unpack_from(message)
+            if op == _OP_STOP:
+                await asyncio.gather(*self._tails.values(), return_exceptions=True)
+                await self._pool.close()
+                self._reply(request_id, _STATUS_OK)
+                return
+            if op == _OP_HEALTH:
+                health = _HEALTH.pack(len(self._pool), self._commands, self._errors)
+                self._reply(request_id, _STATUS_OK, health)
+                continue
+            offset = _REQUEST.size + host_length
+            key = message[_REQUEST.size : offset].decode("utf-8"), port
+            self._schedule(request_id, op, key, message[offset:])
+
+    def _schedule(self, request_id: int, op: int, key: RelayKey, payload: bytes):
+        previous = self._tails.get(key)
+        task = asyncio.create_task(self._handle(previous, request_id, op, key, payload))
+        self._tails[key] = task
+
+        def forget(task):
+            if self._tails.get(key) is task:
+                del self._tails[key]
+
+        task.add_done_callback(forget)
+
+    async def _handle(
+        self,
+        previous: Optional["asyncio.Task[None]"],
+        request_id: int,
+        op: int,
+        key: RelayKey,
+        payload: bytes,
+    ):
+        if previous is not None:
+            await asyncio.wait([previous])
+        try:
+            if op == _OP_DISCARD:
+                await self._pool.discard(*key)
+                res = b""
+            else:
+                session = self._pool.get(*key)
+                command = _EncodedCommand(session.state, payload)
+                if op == _OP_REQUEST:
+                    res = await asyncio.wait_for(
+                        session.request(command), self._timeout
+                    )
+                else:
+                    await asyncio.wait_for(session.send(command), self._timeout)
+                    res = b""
+                self._commands += 1
+        except Exception as e:
+            self._errors += 1
+            self._reply(request_id, _STATUS_ERROR, _encode_error(e))
+        else:
+            self._reply(request_id, _STATUS_OK, res)
+
+
+def _worker_main(conn, port: int, timeout: Optional[float], session_kwargs):
+    async def main():
+        async with SessionPool(port=port, **session_kwargs) as pool:
+            await _Worker(conn, pool, timeout).run()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        conn.close()
+
+
+class _Shard:
+    """A coordinator side of a shard."""
+
+    __slots__ = ("index", "process", "conn", "lock", "pending", "relays", "closed")
+
+    def __init__(self, index: int, process, conn):
+        self.index = index
+        self.process = process
+        self.conn = conn
+        self.lock = threading.Lock()
+        self.pending: Dict[int, Tuple[concurrent.futures.Future, int]] = {}
+        self.relays: Set[RelayKey] = set()
+        self.closed = False
+
+    @property
+    def alive(self) -> bool:
+        return not self.closed and self.process.is_alive()
+
+
+class ShardedRuntime:
+    """
+    Drive sessions of many relays from several worker processes.
+
+    Each relay is assigned to one shard (a worker process with its own event
+    loop), so the work of a large fleet is spread over multiple CPU cores.
+    New relays are assigned to the least loaded shard and relays are moved
+    between shards only when the shards become unbalanced.
+
+    Commands are passed to workers as their [`body`][skydance.protocol.Command.body]
+    only, frame numbers are allocated by the worker sessions. Commands of one
+    relay are executed in the order they were submitted.
+
+    Example:
+        >>> with ShardedRuntime(shards=4) as runtime:
+        >>>     futures = [
+        >>>         runtime.submit_send(ip, PowerOnCommand(State(), zone=1))
+        >>>         for ip in ips
+        >>>     ]
+        >>>     for future in futures:
+        >>>         future.result()
+    """
+
+    def __init__(
+        self,
+        shards: Optional[int] = None,
+        *,
+        port: int = PORT,
+        timeout: Optional[float] = 10.0,
+        mp_context=None,
+        **session_kwargs: Any,
+    ):
+        """
+        Create a ShardedRuntime and start its worker processes.
+
+        Args:
+            shards: Number of worker processes. Defaults to the number of CPUs.
+            port: A default relay port.
+            timeout: Maximal time (in seconds) of a single command in a worker.
+            mp_context: A [multiprocessing context](https://docs.python.org/3/library/multiprocessing.html#contexts-and-start-methods).
+                Defaults to the `spawn` one, so that workers inherit no sockets
+                or event loops of the calling process.
+            **session_kwargs: Passed to each created
+                [Session][skydance.network.session.Session]. They must be picklable.
+
+        Raise:
+            ValueError: If the number of shards is not positive.
+        """
+        count = shards if shards is not None else os.cpu_count() or 1
+        if count < 1:
+            raise ValueError("Number of shards must be positive.")
+        self.port = port
+        self._context = mp_context or multiprocessing.get_context("spawn")
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._assignments: Dict[RelayKey, _Shard] = {}
+        self._closed = False
+        self._shards = [
+            self._start_shard(i, timeout, session_kwargs) for i in range(count)
+        ]
+
+    def _start_shard(self, index: int, timeout: Optional[float], session_kwargs):
+        conn, worker_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(worker_conn, self.port, timeout, session_kwargs),
+            name=f"skydance-shard-{index}",
+            daemon=True,
+        )
+        process.start()
+        worker_conn.close()
+        shard = _Shard(index, process, conn)
+        threading.Thread(
+            target=self._receive,
+            args=(shard,),
+            name=f"skydance-shard-{index}-replies",
+            daemon=True,
+        ).start()
+        return shard
+
+    @staticmethod
+    def _receive(shard: _Shard):
+        while True:
+            try:
+                message = shard.conn.recv_bytes()
+            except (EOFError, OSError):
+                break
+            request_id, status = _REPLY.unpack_from(message)
+            with shard.lock:
+                future, op = shard.pending.pop(request_id, (None, 0))
+            if future is None:
+                continue
+            payload = message[_REPLY.size :]
+            if status != _STATUS_OK:
+                future.set_exception(_decode_error(payload))
+            elif op == _OP_REQUEST:
+                future.set_result(payload)
+            elif op == _OP_HEALTH:
+                future.set_result(_HEALTH.unpack(payload))
+            else:
+                future.set_result(None)
+        with shard.lock:
+            shard.closed = True
+            pending, shard.pending = shard.pending, {}
+        for future, _ in pending.values():
+            future.set_exception(ConnectionError("Shard worker process exited."))
+
+    def _call(
+        self, shard: _Shard, op: int, key: RelayKey = ("", 0), payload: bytes = b""
+    ) -> concurrent.futures.Future:
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        request_id = next(self._ids) & 0xFFFFFFFF
+        host = key[0].encode("utf-8")
+        if len(host) > 255:
+            raise ValueError("Host must be at most 255 bytes long.")
+        message = _REQUEST.pack(request_id, op, key[1], len(host)) + host + payload
+        with shard.lock:
+            if shard.closed:
+                future.set_exception(ConnectionError("Shard worker process exited."))
+                return future
+            shard.pending[request_id] = future, op
+            try:
+                shard.conn.send_bytes(message)
+            except OSError as e:
+                del shard.pending[request_id]
+                future.set_exception(ConnectionError(f"Shard is not reachable: {e}"))
+        return future
+
+    def _key(self, host: str, port: Optional[int]) -> RelayKey:
+        return host, self.port if port is None else port
+
+    def _check_open(self):
+        if self._closed:
+            raise RuntimeError("The runtime is closed.")
+
+    @property
+    def shards(self) -> int:
+        """Return number of shards."""
+        return len(self._shards)
+
+    @property
+    def assignments(self) -> Dict[RelayKey, int]:
+        """Return a mapping of `(host, port)` of each known relay to its shard index."""
+        with self._lock:
+            return {key: shard.index for key, shard in self._assignments.items()}
+
+    def add_relay(self, host: str, port: Optional[int] = None) -> int:
+        """
+        Assign a relay to the least loaded shard (unless already assigned).
+
+        Relays are added automatically when a command is submitted for them.
+
+        Returns:
+            An index of the shard owning the relay.
+        """
+        self._check_open()
+        key = self._key(host, port)
+        with self._lock:
+            return self._assign(key).index
+
+    def _assign(self, key: RelayKey) -> _Shard:
+        try:
+            return self._assignments[key]
+        except KeyError:
+            pass
+        candidates = [shard for shard in self._shards if shard.alive] or self._shards
+        shard = min(candidates, key=lambda shard: len(shard.relays))
+        shard.relays.add(key)
+        self._assignments[key] = shard
+        return shard
+
+    def remove_relay(
+        self, host: str, port: Optional[int] = None, *, timeout: Optional[float] = None
+    ):
+        """
+        Close a session of a relay, forget it and rebalance the shards if needed.
+
+        Args:
+            host: A relay IP address or hostname.
+            port: A relay port. Defaults to the runtime port.
+            timeout: Maximal time to wait in seconds.
+        """
+        self._check_open()
+        key = self._key(host, port)
+        with self._lock:
+            shard = self._assignments.pop(key, None)
+            if shard is None:
+                return
+            shard.relays.discard(key)
+            discarded = self._call(shard, _OP_DISCARD, key)
+        concurrent.futures.wait([discarded], timeout)
+        self.rebalance(timeout=timeout)
+
+    def rebalance(self, *, timeout: Optional[float] = None) -> int:
+        """
+        Move relays between shards, so that their counts differ at most by one.
+
+        Relays of shards whose worker process exited are moved to running ones.
+        A moved relay is disconnected by its old shard (after it finishes
+        commands submitted so far) and connects again from the new one when
+        a next command is submitted. Commands submitted while the rebalance
+        is in progress may overtake the ones still running in the old shard.
+
+        Args:
+            timeout: Maximal time to wait for old sessions to close in seconds.
+
+        Returns:
+            Number of moved relays.
+        """
+        self._check_open()
+        with self._lock:
+            alive = [shard for shard in self._shards if shard.alive]
+            if not alive:
+                return 0
+            moves: List[Tuple[RelayKey, _Shard]] = []
+            for shard in self._shards:
+                if shard not in alive:
+                    for key in sorted(shard.relays):
+                        del self._assignments[key]
+                        self._assign(key)
+                        moves.append((key, shard))
+                    shard.relays.clear()
+            while True:
+                alive.sort(key=lambda shard: len(shard.relays))
+                least, most = alive[0], alive[-1]
+                if len(most.relays) - len(least.relays) <= 1:
+                    break
+                key = max(most.relays)
+                most.relays.remove(key)
+                least.relays.add(key)
+                self._assignments[key] = least
+                moves.append((key, most))
+            discarded = [
+                self._call(old, _OP_DISCARD, key) for key, old in moves if old.alive
+            ]
+        concurrent.futures.wait(discarded, timeout)
+        return len(moves)
+
+    def shard_of(self, host: str, port: Optional[int] = None) -> Optional[int]:
+        """Return an index of a shard owning the relay, if it is assigned."""
+        with self._lock:
+            shard = self._assignments.get(self._key(host, port))
+        return None if shard is None else shard.index
+
+    def _submit(
+        self, op: int, host: str, command: Command, port: Optional[int]
+    ) -> concurrent.futures.Future:
+        self._check_open()
+        key = self._key(host, port)
+        with self._lock:
+            shard = self._assign(key)
+            return self._call(shard, op, key, command.body)
+
+    def submit_send(
+        self, host: str, command: Command, *, port: Optional[int] = None
+    ) -> "concurrent.futures.Future[None]":
+        """
+        Schedule sending a command by the shard owning the relay and return immediately.
+
+        Args:
+            host: A relay IP address or hostname.
+            command: A command to send.
+            port: A relay port. Defaults to the runtime port.
+        """
+        return self._submit(_OP_SEND, host, command, port)
+
+    def send(
+        self,
+        host: str,
+        command: Command,
+        *,
+        port: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> None:
+        """
+        Send a command and block until it is written.
+
+        Args:
+            host: A relay IP address or hostname.
+            command: A command to send.
+            port: A relay port. Defaults to the runtime port.
+            timeout: Maximal time to wait in seconds.
+        """
+        self.submit_send(host, command, port=port).result(timeout)
+
+    def submit_request(
+        self, host: str, command: Command, *, port: Optional[int] = None
+    ) -> "concurrent.futures.Future[bytes]":
+        """
+        Schedule sending a command expecting a response and return immediately.
+
+        The future result are raw bytes of the response.
+
+        Args:
+            host: A relay IP address or hostname.
+            command: A command expecting a response.
+            port: A relay port. Defaults to the runtime port.
+        """
+        return self._submit(_OP_REQUEST, host, command, port)
+
+    def request(
+        self,
+        host: str,
+        command: Command,
+        *,
+        port: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> bytes:
+        """
+        Send a command and block until a complete response to it is received.
+
+        Args:
+            host: A relay IP address or hostname.
+            command: A command expecting a response.
+            port: A relay port. Defaults to the runtime port.
+            timeout: Maximal time to wait in seconds.
+        """
+        return self.submit_request(host, command, port=port).result(timeout)
+
+    def health(self, *, timeout: Optional[float] = 1.0) -> List[ShardHealth]:
+        """
+        Check all shards.
+
+        Args:
+            timeout: Maximal time to wait for all shards in seconds.
+        """
+        self._check_open()
+        finished: Dict[int, float] = {}
+
+        def check(shard: _Shard) -> concurrent.futures.Future:
+            future = self._call(shard, _OP_HEALTH)
+            future.add_done_callback(
+                lambda _: finished.setdefault(shard.index, time.perf_counter())
+            )
+            return future
+
+        start = time.perf_counter()
+        checks = [(shard, check(shard)) for shard in self._shards]
+        concurrent.futures.wait([future for _, future in checks], timeout)
+        res = []
+        for shard, future in checks:
+            stats, latency = (0, 0, 0), None
+            if future.done() and future.exception() is None:
+                stats = future.result()
+                # the callback may still be running in the receiving thread
+                latency = finished.get(shard.index, time.perf_counter()) - start
+            with self._lock:
+                relays = len(shard.relays)
+            res.append(
+                ShardHealth(
+                    shard.index,
+                    shard.process.pid,
+                    shard.alive and latency is not None,
+                    relays,
+                    *stats,
+                    latency,
+                )
+            )
+        return res
+
+    def close(self, timeout: Optional[float] = None):
+        """
+        Stop all worker processes after they finish the submitted commands.
+
+        Args:
+            timeout: Maximal time to wait for each worker in seconds.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        stops = [self._call(shard, _OP_STOP) for shard in self._shards]
+        concurrent.futures.wait(stops, timeout)
+        for shard in self._shards:
+            shard.process.join(timeout)
+            if shard.process.is_alive():
+                shard.process.terminate()
+                shard.process.join()
+            shard.conn.close()
+
+    def __enter__(self):
+        """Return auto-closing context manager."""
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,145 @@
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Dict, Hashable, List, NamedTuple, Optional, Tuple
+
+from skydance.protocol import Command
+
+
+if TYPE_CHECKING:
+    from skydance.network.session import Session
+
+
+log = logging.getLogger(__name__)
+
+
+class StreamStats(NamedTuple):
+    """Frame counts of a [FrameStream][skydance.network.stream.FrameStream]."""
+
+    delivered: int
+    """Frames written and drained before their deadline."""
+
+    dropped: int
+    """Frames replaced by a newer one, expired before writing or failed to write."""
+
+    late: int
+    """Frames written before their deadline, but drained after it."""
+
+
+def _key(command: Command) -> Hashable:
+    return getattr(command, "zone", None), type(command)
+
+
+class FrameStream:
+    """
+    A real-time stream of commands with per-frame deadlines.
+
+    Pushed commands wait in a single slot per zone and command type, so
+    a newer command replaces an older one which has not been written yet.
+    Commands are written in the order of their (newest) pushes.
+    All waiting commands are written in one batch as soon as the previous
+    batch drains. When the relay or network stalls, the stream therefore
+    skips to the newest frames instead of lagging further and further behind.
+
+    Create it by [`Session.stream()`][skydance.network.session.Session.stream].
+
+    Example:
+        >>> async with session.stream(max_delay=1 / 25) as stream:
+        >>>     for red, green, blue in animation:
+        >>>         stream.push(RGBWCommand(session.state, zone=1, red=red, green=green, blue=blue, white=0))
+        >>>         await asyncio.sleep(1 / 25)
+        >>> print(stream.stats)
+    """
+
+    def __init__(self, session: "Session", *, max_delay: float = 0.1):
+        """
+        Create a FrameStream and start writing.
+
+        Args:
+            session: A session to write to.
+            max_delay: A default deadline of pushed commands, in seconds after pushing.
+        """
+        self.session = session
+        self.max_delay = max_delay
+        self._loop = asyncio.get_running_loop()
+        self._pending: Dict[Hashable, Tuple[Command, float]] = {}
+        self._wakeup = asyncio.Event()
+        self._closing = False
+        self._counts = dict.fromkeys(StreamStats._fields, 0)
+        self._task = asyncio.create_task(self._run())
+
+    @property
+    def stats(self) -> StreamStats:
+        """Return frame counts so far."""
+        return StreamStats(**self._counts)
+
+    def push(self, command: Command, *, deadline: Optional[float] = None):
+        """
+        Queue a command, replacing a not yet written one of the same zone and type.
+
+        Args:
+            command: A command to write. Its frame number is allocated
+                by the session when written.
+            deadline: A time the command must be written by, in the
+                [event loop clock](https://docs.python.org/3/library/asyncio-eventloop.html#asyncio.loop.time).
+                Defaults to `max_delay` from now.
+
+        Raise:
+            RuntimeError: If the stream is closed.
+        """
+        if self._closing:
+            raise RuntimeError("The stream is closed.")
+        if deadline is None:
+            deadline = self._loop.time() + self.max_delay
+        key = _key(command)
+        # re-insert, so that the batch keeps the order of the newest pushes
+        if self._pending.pop(key, None) is not None:
+            self._count("dropped", 1)
+        self._pending[key] = command, deadline
+        self._wakeup.set()
+
+    async def _run(self):
+        while self._pending or not self._closing:
+            if not self._pending:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+            now = self._loop.time()
+            batch: List[Tuple[Command, float]] = []
+            for command, deadline in self._pending.values():
+                if deadline < now:
+                    self._count("dropped", 1)
+                else:
+                    batch.append((command, deadline))
+            self._pending.clear()
+            if not batch:
+                continue
+            try:
+                await self.session.send_many(command for command, _ in batch)
+            except OSError as e:
+                log.debug("Stream write to %s failed: %s", self.session.host, e)
+                self._count("dropped", len(batch))
+                continue
+            now = self._loop.time()
+            late = sum(1 for _, deadline in batch if deadline < now)
+            self._count("late", late)
+            self._count("delivered", len(batch) - late)
+
+    def _count(self, outcome: str, value: int):
+        if value:
+            self._counts[outcome] += value
+            self.session.metrics.counter(
+                f"stream_frames_{outcome}_total", value, self.session.labels
+            )
+
+    async def close(self):
+        """Write the pending commands (unless they expire) and stop."""
+        self._closing = True
+        self._wakeup.set()
+        await self._task
+
+    async def __aenter__(self):
+        """Return auto-closing context manager."""
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
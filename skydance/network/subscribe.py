@@ -0,0 +1,169 @@
+import asyncio
+import logging
+from typing import Callable, List, NamedTuple, Optional
+
+from skydance.protocol import Response
+
+
+log = logging.getLogger(__name__)
+
+
+class Notification(NamedTuple):
+    """A frame received from a relay, which was not a response to a request."""
+
+    host: str
+    """A host of the [Session][skydance.network.session.Session] which received it."""
+
+    response: Response
+    """The parsed frame, see [`parse_response()`][skydance.protocol.parse_response]."""
+
+
+class Subscription:
+    """
+    A filtered feed of [notifications][skydance.network.subscribe.Notification].
+
+    Notifications are either passed to a callback, or queued for iterating.
+    The queue is bounded: when a consumer is too slow, the oldest notification
+    is dropped, so it never stalls reading from the relays.
+
+    Create it by [`Session.subscribe()`][skydance.network.session.Session.subscribe]
+    or [`SessionPool.subscribe()`][skydance.network.pool.SessionPool.subscribe].
+
+    Example:
+        >>> async with session.subscribe(zone=1) as subscription:
+        >>>     async for notification in subscription:
+        >>>         print(notification.host, notification.response.cmd_type)
+    """
+
+    dropped: int
+    """Number of notifications dropped because the queue was full."""
+
+    def __init__(
+        self,
+        *,
+        zone: Optional[int] = None,
+        cmd_type: Optional[int] = None,
+        maxsize: int = 64,
+        callback: Optional[Callable[[Notification], object]] = None,
+    ):
+        """
+        Create a Subscription.
+
+        Args:
+            zone: Receive only frames addressed to this zone number.
+            cmd_type: Receive only frames of this command type.
+            maxsize: A maximal number of queued notifications.
+            callback: A function called with each notification instead of queuing it.
+                It is called from the reading task, so it must not block.
+
+        Raise:
+            ValueError: If the `maxsize` is not positive.
+        """
+        if maxsize < 1:
+            raise ValueError("Queue size must be positive.")
+        self.zone = zone
+        self.cmd_type = cmd_type
+        self.callback = callback
+        self.maxsize = maxsize
+        self.dropped = 0
+        # the bound is kept by publish(), so the closing sentinel always fits
+        self._queue: "asyncio.Queue[Optional[Notification]]" = asyncio.Queue()
+        self._detachers: List[Callable[[], None]] = []
+        self._closed = False
+
+    @property
+    def closed(self) -> bool:
+        """Return whether the subscription is closed."""
+        return self._closed
+
+    @property
+    def pending(self) -> int:
+        """Return number of queued notifications."""
+        # a closed queue ends with a sentinel
+        return self._queue.qsize() - (1 if self._closed else 0)
+
+    def matches(self, response: Response) -> bool:
+        """Return whether a frame passes the filters."""
+        if self.cmd_type is not None and response.cmd_type != self.cmd_type:
+            return False
+        if self.zone is not None and not response.zone & (1 << (self.zone - 1)):
+            return False
+        return True
+
+    def publish(self, notification: Notification) -> bool:
+        """
+        Deliver a notification, regardless of the filters.
+
+        Returns:
+            `False` if an older notification had to be dropped to make room for it.
+        """
+        if self._closed:
+            return True
+        if self.callback is not None:
+            try:
+                self.callback(notification)
+            except Exception:
+                log.exception("Subscription callback failed")
+            return True
+        dropped = self._make_room()
+        self._queue.put_nowait(notification)
+        if dropped:
+            self.dropped += 1
+        return not dropped
+
+    def _make_room(self) -> bool:
+        if self._queue.qsize() < self.maxsize:
+            return False
+        self._queue.get_nowait()
+        return True
+
+    def _attach(self, detach: Callable[[], None]):
+        self._detachers.append(detach)
+
+    def _detach(self, detach: Callable[[], None]):
+        """Forget a source of notifications; close when no source is left."""
+        if detach in self._detachers:
+            self._detachers.remove(detach)
+            detach()
+        if not self._detachers:
+            self.close()
+
+    async def get(self) -> Notification:
+        """
+        Wait for a next notification.
+
+        Raise:
+            EOFError: If the subscription is closed and no notification is queued.
+        """
+        notification = await self._queue.get()
+        if notification is None:
+            # keep the sentinel for other waiters
+            self._queue.put_nowait(None)
+            raise EOFError("The subscription is closed.")
+        return notification
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Notification:
+        try:
+            return await self.get()
+        except EOFError:
+            raise StopAsyncIteration from None
+
+    def close(self):
+        """Stop receiving notifications. Queued ones can still be iterated."""
+        if self._closed:
+            return
+        self._closed = True
+        for detach in tuple(self._detachers):
+            detach()
+        self._detachers.clear()
+        self._queue.put_nowait(None)
+
+    async def __aenter__(self):
+        """Return auto-closing context manager."""
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.close()
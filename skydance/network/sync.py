@@ -0,0 +1,191 @@
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any, Awaitable, Callable, Optional, Type, TypeVar
+
+from skydance.network.pool import SessionPool
+from skydance.network.session import Session
+from skydance.protocol import PORT, Command, Response
+
+
+T = TypeVar("T")
+R = TypeVar("R", bound=Response)
+
+
+class SyncClient:
+    """
+    A blocking client for synchronous code (WSGI workers, scripts, ...).
+
+    The client owns an event loop running in a background thread and keeps
+    a long-lived [Session][skydance.network.session.Session] per relay,
+    so the connections are reused across calls. The `submit_*` methods return
+    [`concurrent.futures.Future`](https://docs.python.org/3/library/concurrent.futures.html#concurrent.futures.Future)
+    objects, which allows running many sends in parallel.
+
+    Commands may be created with any [State][skydance.protocol.State],
+    because the frame numbers are allocated by the session.
+
+    Example:
+        >>> with SyncClient() as client:
+        >>>     client.send("192.168.1.5", PowerOnCommand(State(), zone=1))
+        >>>     res = client.query(
+        >>>         "192.168.1.5", GetNumberOfZonesCommand(State()), GetNumberOfZonesResponse
+        >>>     )
+        >>>     print(res.zones)
+    """
+
+    _pool: SessionPool
+
+    def __init__(self, *, port: int = PORT, **session_kwargs: Any):
+        """
+        Create a SyncClient and start its event loop thread.
+
+        Args:
+            port: A default relay port.
+            **session_kwargs: Passed to each created
+                [Session][skydance.network.session.Session].
+        """
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="skydance-sync-client", daemon=True
+        )
+        self._thread.start()
+        self._closed = False
+
+        async def create_pool():
+            # sessions must be created inside the loop they will be used with
+            return SessionPool(port=port, **session_kwargs)
+
+        self._pool = self._run(create_pool()).result()
+
+    def _run(self, coro: Awaitable[T]) -> "concurrent.futures.Future[T]":
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)  # type: ignore
+
+    @staticmethod
+    def _result(future: "concurrent.futures.Future[T]", timeout: Optional[float]) -> T:
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            # release the session locks held by the abandoned coroutine
+            future.cancel()
+            raise
+
+    def _with_session(
+        self, host: str, port: Optional[int], fn: Callable[[Session], Awaitable[T]]
+    ) -> "concurrent.futures.Future[T]":
+        if self._closed:
+            raise RuntimeError("The client is closed.")
+
+        async def run():
+            return await fn(self._pool.get(host, port))
+
+        return self._run(run())
+
+    def submit_send(
+        self, host: str, command: Command, *, port: Optional[int] = None
+    ) -> "concurrent.futures.Future[None]":
+        """
+        Schedule sending a command and return immediately.
+
+        Args:
+            host: A relay IP address or hostname.
+            command: A command to send.
+            port: A relay port. Defaults to the client port.
+        """
+        return self._with_session(host, port, lambda session: session.send(command))
+
+    def send(
+        self,
+        host: str,
+        command: Command,
+        *,
+        port: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> None:
+        """
+        Send a command and block until it is written.
+
+        Args:
+            host: A relay IP address or hostname.
+            command: A command to send.
+            port: A relay port. Defaults to the client port.
+            timeout: Maximal time to wait in seconds. The send is cancelled
+                when it times out.
+
+        Raise:
+            concurrent.futures.TimeoutError: If the timeout expires.
+        """
+        self._result(self.submit_send(host, command, port=port), timeout)
+
+    def submit_query(
+        self,
+        host: str,
+        command: Command,
+        response_cls: Type[R],
+        *,
+        port: Optional[int] = None,
+    ) -> "concurrent.futures.Future[R]":
+        """
+        Schedule sending a command and parsing its response, return immediately.
+
+        Args:
+            host: A relay IP address or hostname.
+            command: A command expecting a response.
+            response_cls: A class used to parse the response.
+            port: A relay port. Defaults to the client port.
+        """
+
+        async def query(session: Session) -> R:
+            return response_cls(await session.request(command))
+
+        return self._with_session(host, port, query)
+
+    def query(
+        self,
+        host: str,
+        command: Command,
+        response_cls: Type[R],
+        *,
+        port: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> R:
+        """
+        Send a command and block until its response is received and parsed.
+
+        Args:
+            host: A relay IP address or hostname.
+            command: A command expecting a response.
+            response_cls: A class used to parse the response.
+            port: A relay port. Defaults to the client port.
+            timeout: Maximal time to wait in seconds. The query is cancelled
+                when it times out.
+
+        Raise:
+            concurrent.futures.TimeoutError: If the timeout expires.
+        """
+        future = self.submit_query(host, command, response_cls, port=port)
+        return self._result(future, timeout)
+
+    def close(self, timeout: Optional[float] = None):
+        """
+        Close all sessions and stop the event loop thread.
+
+        Args:
+            timeout: Maximal time to wait for sessions to close in seconds.
+        """
+        if self._closed:
+            return
+        try:
+            self._run(self._pool.close()).result(timeout)
+        finally:
+            self._closed = True
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+
+    def __enter__(self):
+        """Return auto-closing context manager."""
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,379 @@
+import asyncio
+import collections
+import errno
+import itertools
+import selectors
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple, TypeVar
+
+
+T = TypeVar("T")
+
+# type aliases
+Address = Tuple[str, int]
+
+_EPHEMERAL_PORTS = 49152
+
+
+class _VirtualSelector(selectors.DefaultSelector):  # type: ignore
+    """A selector which skips waiting by advancing a virtual clock instead."""
+
+    def __init__(self, now: float):
+        super().__init__()
+        self.now = now
+
+    def select(self, timeout=None):
+        events = super().select(0)
+        if events or timeout == 0:
+            return events
+        if timeout is None:
+            # nothing is scheduled, only another thread can wake the loop up
+            return super().select(None)
+        self.now += timeout
+        return events
+
+
+class _VirtualSocket:
+    """The part of a socket an in-memory server exposes."""
+
+    def __init__(self, address: Address):
+        self._address = address
+
+    def getsockname(self) -> Address:
+        return self._address
+
+
+class _VirtualServer(asyncio.AbstractServer):
+    def __init__(
+        self,
+        loop: "VirtualEventLoop",
+        address: Address,
+        protocol_factory: Callable[[], asyncio.BaseProtocol],
+    ):
+        self._loop = loop
+        self.address = address
+        self.protocol_factory = protocol_factory
+        self._closed = loop.create_future()
+
+    @property
+    def sockets(self):
+        return () if self._closed.done() else (_VirtualSocket(self.address),)
+
+    def close(self):
+        if not self._closed.done():
+            self._loop._servers.pop(self.address, None)
+            self._closed.set_result(None)
+
+    def get_loop(self):
+        return self._loop
+
+    def is_serving(self) -> bool:
+        return not self._closed.done()
+
+    async def start_serving(self):
+        pass
+
+    async def serve_forever(self):
+        await asyncio.shield(self._closed)
+
+    async def wait_closed(self):
+        await asyncio.shield(self._closed)
+
+
+class _MemoryTransport(asyncio.Transport):
+    """One end of an in-memory stream connection."""
+
+    def __init__(
+        self,
+        loop: "VirtualEventLoop",
+        protocol: asyncio.BaseProtocol,
+        sockname: Address,
+        peername: Address,
+    ):
+        super().__init__({"sockname": sockname, "peername": peername, "socket": None})
+        self._loop = loop
+        self._protocol = protocol
+        self._peer: Optional[_MemoryTransport] = None
+        self._in_flight: Deque[Optional[bytes]] = collections.deque()
+        self._paused: Deque[Optional[bytes]] = collections.deque()
+        self._reading = True
+        self._closing = False
+        self._lost = False
+
+    def get_protocol(self):
+        return self._protocol
+
+    def set_protocol(self, protocol):
+        self._protocol = protocol
+
+    def is_closing(self) -> bool:
+        return self._closing
+
+    def is_reading(self) -> bool:
+        return self._reading
+
+    def pause_reading(self):
+        self._reading = False
+
+    def resume_reading(self):
+        self._reading = True
+        while self._paused and self._reading:
+            self._receive(self._paused.popleft())
+
+    def get_write_buffer_size(self) -> int:
+        return 0
+
+    def get_write_buffer_limits(self) -> Tuple[int, int]:
+        return 0, 0
+
+    def set_write_buffer_limits(self, high=None, low=None):
+        pass
+
+    def can_write_eof(self) -> bool:
+        return True
+
+    def _send(self, data: Optional[bytes]):
+        """Deliver data (or EOF if `None`) to the peer after the network latency."""
+        if self._peer is not None:
+            self._in_flight.append(data)
+            self._loop.call_later(self._loop.latency, self._arrive)
+
+    def _arrive(self):
+        # all chunks travel equally long, so the oldest one always arrives first
+        assert self._peer is not None
+        self._peer._receive(self._in_flight.popleft())
+
+    def _receive(self, data: Optional[bytes]):
+        if self._lost:
+            return
+        if not self._reading:
+            self._paused.append(data)
+        elif data is None:
+            if not self._protocol.eof_received():  # type: ignore
+                self.close()
+        else:
+            self._protocol.data_received(data)  # type: ignore
+
+    def write(self, data):
+        if self._closing or not data:
+            return
+        self._send(bytes(data))
+
+    def write_eof(self):
+        if not self._closing:
+            self._send(None)
+
+    def close(self):
+        if self._closing:
+            return
+        self._closing = True
+        self._send(None)
+        self._loop.call_soon(self._connection_lost)
+
+    def abort(self):
+        self.close()
+
+    def _connection_lost(self):
+        if not self._lost:
+            self._lost = True
+            self._protocol.connection_lost(None)
+
+
+class _MemoryDatagramTransport(asyncio.DatagramTransport):
+    """An in-memory UDP endpoint."""
+
+    def __init__(
+        self,
+        loop: "VirtualEventLoop",
+        protocol: asyncio.DatagramProtocol,
+        sockname: Address,
+        peername: Optional[Address],
+    ):
+        super().__init__({"sockname": sockname, "peername": peername, "socket": None})
+        self._loop = loop
+        self._protocol = protocol
+        self._closing = False
+
+    def get_protocol(self):
+        return self._protocol
+
+    def set_protocol(self, protocol):
+        self._protocol = protocol
+
+    def is_closing(self) -> bool:
+        return self._closing
+
+    def sendto(self, data, addr=None):
+        if self._closing:
+            return
+        if addr is None:
+            addr = self.get_extra_info("peername")
+        destination = self._loop._endpoints.get(tuple(addr))
+        # datagrams to unknown addresses are silently lost, as with real UDP
+        if destination is not None:
+            self._loop.call_later(
+                self._loop.latency,
+                destination._receive,
+                bytes(data),
+                self.get_extra_info("sockname"),
+            )
+
+    def _receive(self, data: bytes, addr: Address):
+        if not self._closing:
+            self._protocol.datagram_received(data, addr)
+
+    def close(self):
+        if self._closing:
+            return
+        self._closing = True
+        self._loop._endpoints.pop(self.get_extra_info("sockname"), None)
+        self._loop.call_soon(self._protocol.connection_lost, None)
+
+    def abort(self):
+        self.close()
+
+
+class VirtualEventLoop(asyncio.SelectorEventLoop):
+    """
+    An event loop with a virtual clock and an in-memory network.
+
+    Whenever the loop would wait for a timer, it moves its clock forward
+    instead, so `asyncio.sleep()`, timeouts and `call_later()` callbacks
+    complete immediately, in a deterministic order. Hours of simulated
+    traffic therefore run in milliseconds and give the same result every time.
+
+    TCP servers, connections and UDP endpoints created by the loop (and thus
+    by `asyncio.start_server()`, `asyncio.open_connection()` and
+    `create_datagram_endpoint()`) never touch real sockets. Instead, data is
+    passed between the ends in memory, delayed by `latency`. This makes
+    [Session][skydance.network.session.Session],
+    [RelayEmulator][skydance.network.emulator.RelayEmulator] and
+    [DiscoveryProtocol][skydance.network.discovery.DiscoveryProtocol] run
+    unmodified. Addresses must match exactly, broadcasts are not routed.
+
+    Only the loop clock is virtual: code reading `time.time()` or
+    `time.perf_counter()` directly still sees the real time.
+
+    Example:
+        >>> async def main():
+        >>>     async with RelayEmulator() as relay, Session(relay.host, relay.port) as session:
+        >>>         await asyncio.sleep(3600)  # returns immediately
+        >>>         return await session.request(GetNumberOfZonesCommand(State()))
+        >>> response = run_virtual(main(), latency=0.005)
+    """
+
+    _selector: _VirtualSelector
+
+    def __init__(self, *, start: float = 0.0, latency: float = 0.0):
+        """
+        Create a VirtualEventLoop.
+
+        Args:
+            start: An initial value of the clock.
+            latency: A one-way network delay in seconds.
+        """
+        super().__init__(_VirtualSelector(start))
+        self.latency = latency
+        self._servers: Dict[Address, _VirtualServer] = {}
+        self._endpoints: Dict[Address, _MemoryDatagramTransport] = {}
+        self._ports = itertools.count(_EPHEMERAL_PORTS)
+
+    def time(self) -> float:
+        """Return the virtual time."""
+        return self._selector.now
+
+    def _bind(self, host: Optional[str], port: Optional[int], bound) -> Address:
+        address = host or "0.0.0.0", port or next(self._ports)
+        if address in bound:
+            raise OSError(errno.EADDRINUSE, f"Address already in use: {address}")
+        return address
+
+    async def create_server(  # type: ignore
+        self,
+        protocol_factory: Callable[[], asyncio.BaseProtocol],
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+        **kwargs: Any,
+    ) -> _VirtualServer:
+        """Listen for in-memory connections. Socket options are ignored."""
+        address = self._bind(host, port, self._servers)
+        server = self._servers[address] = _VirtualServer(
+            self, address, protocol_factory
+        )
+        return server
+
+    async def create_connection(  # type: ignore
+        self,
+        protocol_factory: Callable[[], asyncio.BaseProtocol],
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+        *,
+        local_addr: Optional[Address] = None,
+        **kwargs: Any,
+    ) -> Tuple[asyncio.Transport, asyncio.BaseProtocol]:
+        """
+        Connect to an in-memory server. Socket options are ignored.
+
+        Raise:
+            ConnectionRefusedError: If nothing listens on the address.
+        """
+        address = host or "0.0.0.0", port or 0
+        # a handshake takes a round trip
+        await asyncio.sleep(2 * self.latency)
+        server = self._servers.get(address) or self._servers.get(("0.0.0.0", port or 0))
+        if server is None:
+            raise ConnectionRefusedError(
+                errno.ECONNREFUSED, f"Connect call failed {address}"
+            )
+        local = local_addr or ("127.0.0.1", next(self._ports))
+        protocol = protocol_factory()
+        server_protocol = server.protocol_factory()
+        transport = _MemoryTransport(self, protocol, local, address)
+        server_transport = _MemoryTransport(self, server_protocol, address, local)
+        transport._peer, server_transport._peer = server_transport, transport
+        protocol.connection_made(transport)
+        self.call_soon(server_protocol.connection_made, server_transport)
+        return transport, protocol
+
+    async def create_datagram_endpoint(  # type: ignore
+        self,
+        protocol_factory: Callable[[], asyncio.DatagramProtocol],
+        local_addr: Optional[Address] = None,
+        remote_addr: Optional[Address] = None,
+        **kwargs: Any,
+    ) -> Tuple[asyncio.DatagramTransport, asyncio.DatagramProtocol]:
+        """Create an in-memory UDP endpoint. Socket options are ignored."""
+        host, port = local_addr or ("127.0.0.1", 0)
+        address = self._bind(host, port, self._endpoints)
+        protocol = protocol_factory()
+        transport = self._endpoints[address] = _MemoryDatagramTransport(
+            self, protocol, address, remote_addr
+        )
+        protocol.connection_made(transport)
+        return transport, protocol
+
+
+def run_virtual(main: Awaitable[T], *, start: float = 0.0, latency: float = 0.0) -> T:
+    """
+    Run a coroutine in a new [VirtualEventLoop][skydance.network.virtual.VirtualEventLoop].
+
+    Like `asyncio.run()`, tasks left running are cancelled and the loop is closed.
+
+    Args:
+        main: A coroutine to run.
+        start: An initial value of the virtual clock.
+        latency: A one-way network delay in seconds.
+    """
+    loop = VirtualEventLoop(start=start, latency=latency)
+    try:
+        asyncio.set_event_loop(loop)
+        return loop.run_until_complete(main)
+    finally:
+        try:
+            tasks = asyncio.all_tasks(loop)
+            for task in tasks:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            loop.run_until_complete(loop.shutdown_asyncgens())
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
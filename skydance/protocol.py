@@ -1,3 +1,5 @@
+from __future__ import annotations
+
 import struct
 from abc import ABCMeta, abstractmethod
 from functools import partial
@@ -5,6 +7,16 @@ from functools import partial
 from skydance.enum import ZoneType
 
 
+# `typing` alone takes longer to import than this whole module, so it is
+# imported only by type checkers. They treat a module-level
+# `TYPE_CHECKING = False` the same as `typing.TYPE_CHECKING`.
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Callable, Dict, Iterable, Optional, Tuple, Type, TypeVar
+
+    R = TypeVar("R", bound=Type["Response"])
+
+
 PORT = 8899
 """A port used for communication with a relay."""
 
@@ -18,10 +30,21 @@ TAIL = bytes.fromhex("00 7e")
 # It probably has something to do with a relay ID.
 # But as reported by other users, it is working with hardcoded ID as well.
 # See: https://github.com/tomasbedrich/home-assistant-skydance/issues/1
-_COMMAND_MAGIC = bytes.fromhex("80 00 80 e1 80 00 00")
+COMMAND_MAGIC = bytes.fromhex("80 00 80 e1 80 00 00")
+"""A byte sequence starting the body of each command, followed by a zone mask."""
 
 DEVICE_BASE_TYPE_NORMAL = 0x80
 
+# Constant parts of command bodies, see the `body` of each command.
+_POWER = bytes.fromhex("0a 01 00")
+_MASTER_POWER = bytes.fromhex("0F FF 0B 03 00")
+_BRIGHTNESS = bytes.fromhex("07 02 00 00")
+_TEMPERATURE = bytes.fromhex("0D 02 00 00")
+_RGBW = bytes.fromhex("01 07 00")
+_RGBW_SUFFIX = bytes.fromhex("00 00 00")
+_GET_NUMBER_OF_ZONES = bytes.fromhex("01 00 79 00 00")
+_GET_ZONE_INFO = bytes.fromhex("78 00 00")
+
 
 class State:
     """Holds state of a connection."""
@@ -36,10 +59,39 @@ class State:
         Increment a frame number used by a relay to reconstruct a network stream.
 
         !!! important
-            The frame number must be (manually) incremented after each command.
+            The frame number must be (manually) incremented after each command,
+            unless the commands are sent using
+            [`Session.send()`][skydance.network.session.Session.send],
+            which allocates frame numbers automatically.
         """
         self._frame_number = (self._frame_number + 1) % 256
 
+    def allocate_frame_number(self) -> bytes:
+        """
+        Return a current frame number and increment it in a single step.
+
+        There is no `await` between reading and incrementing the frame number,
+        so two coroutines sharing the state never get the same frame number.
+        """
+        res = self.frame_number
+        self.increment_frame_number()
+        return res
+
+    def allocate_frame_numbers(self, count: int) -> int:
+        """
+        Allocate `count` consecutive frame numbers in a single step.
+
+        Returns:
+            The first allocated frame number. The following ones wrap around 255.
+        """
+        res = self._frame_number
+        self._frame_number = (self._frame_number + count) % 256
+        return res
+
+    def reset(self):
+        """Start numbering frames from zero again."""
+        self._frame_number = 0
+
     @property
     def frame_number(self) -> bytes:
         return bytes([self._frame_number])
@@ -48,6 +100,28 @@ class State:
 class Command(metaclass=ABCMeta):
     """A base command."""
 
+    _BODY: Optional[struct.Struct] = None
+    """A precompiled layout of the body, filled by `_fields()`."""
+
+    _FRAME: Optional[struct.Struct] = None
+    """A layout of a complete frame, derived from `_BODY` automatically."""
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if "_BODY" in cls.__dict__ and cls._BODY is not None:
+            body_format = cls._BODY.format.lstrip("<")
+            cls._FRAME = struct.Struct(f"<{len(HEAD)}sB{body_format}{len(TAIL)}s")
+
+    def _fields(self) -> tuple:
+        """
+        Return values of the `_BODY` layout.
+
+        Only called if `_BODY` is set. Built-in commands override it to avoid
+        building the body first, the default unpacks the [`body`][skydance.protocol.Command.body].
+        """
+        assert self._BODY is not None
+        return self._BODY.unpack(self.body)
+
     def __init__(self, state: State):
         """
         Create a Command.
@@ -60,7 +134,55 @@ class Command(metaclass=ABCMeta):
     @property
     def raw(self):
         """Return complete byte output of a command ready to send over network."""
-        return bytes().join((HEAD, self.state.frame_number, self.body, TAIL))
+        return self.encode(self.state.frame_number)
+
+    def encode(self, frame_number: bytes) -> bytes:
+        """
+        Return complete byte output of a command using a given frame number.
+
+        Args:
+            frame_number: A single byte frame number, usually obtained by
+                [`State.allocate_frame_number()`][skydance.protocol.State.allocate_frame_number].
+        """
+        if self._FRAME is not None:
+            return self._FRAME.pack(HEAD, frame_number[0], *self._fields(), TAIL)
+        return bytes().join((HEAD, frame_number, self.body, TAIL))
+
+    @property
+    def size(self) -> int:
+        """Return a length of a complete frame in bytes."""
+        if self._FRAME is not None:
+            return self._FRAME.size
+        return len(HEAD) + 1 + len(self.body) + len(TAIL)
+
+    def pack_into(
+        self, buffer, offset: int = 0, *, frame_number: Optional[int] = None
+    ) -> int:
+        """
+        Write a complete frame of a command into a writable buffer.
+
+        Unlike [`raw`][skydance.protocol.Command.raw], no intermediate
+        objects are created for the built-in commands.
+
+        Args:
+            buffer: A writable buffer, e.g. `bytearray` or `memoryview`.
+            offset: A position in the buffer to write to.
+            frame_number: A frame number (0-255). Defaults to the current frame
+                number of the command state, which is not incremented.
+
+        Returns:
+            Number of bytes written, i.e. [`size`][skydance.protocol.Command.size].
+        """
+        if frame_number is None:
+            frame_number = self.state._frame_number
+        if self._FRAME is not None:
+            self._FRAME.pack_into(
+                buffer, offset, HEAD, frame_number, *self._fields(), TAIL
+            )
+            return self._FRAME.size
+        data = self.encode(bytes([frame_number]))
+        buffer[offset : offset + len(data)] = data
+        return len(data)
 
     @property
     @abstractmethod
@@ -77,7 +199,14 @@ class Command(metaclass=ABCMeta):
 class PingCommand(Command):
     """Ping a relay to raise a communication error if something is wrong."""
 
-    body = bytes.fromhex("80 00 80 e1 80 00 00 01 00 79 00 00")
+    _BODY = struct.Struct(f"<{len(COMMAND_MAGIC)}s{len(_GET_NUMBER_OF_ZONES)}s")
+
+    def _fields(self) -> tuple:
+        return COMMAND_MAGIC, _GET_NUMBER_OF_ZONES
+
+    @property
+    def body(self) -> bytes:
+        return self._BODY.pack(*self._fields())
 
 
 class ZoneCommand(Command, metaclass=ABCMeta):
@@ -126,17 +255,20 @@ class PowerCommand(ZoneCommand):
         super().__init__(*args, **kwargs)
         self.power = power
 
+    _BODY = struct.Struct("<7sH3sB")
+
+    def _fields(self) -> tuple:
+        return (
+            COMMAND_MAGIC,
+            # TODO: zone number is probably a 2 byte bitmask of what zones to power on/off
+            1 << (self.zone - 1),
+            _POWER,
+            1 if self.power else 0,
+        )
+
     @property
     def body(self) -> bytes:
-        return bytes().join(
-            (
-                _COMMAND_MAGIC,
-                # TODO: zone number is probably a 2 byte bitmask of what zones to power on/off
-                struct.pack("<H", 1 << (self.zone - 1)),
-                bytes.fromhex("0a 01 00"),
-                bytes.fromhex("01" if self.power else "00"),
-            )
-        )
+        return self._BODY.pack(*self._fields())
 
 
 PowerOnCommand = partial(PowerCommand, power=True)
@@ -158,17 +290,20 @@ class MasterPowerCommand(Command):
         super().__init__(*args, **kwargs)
         self.power = power
 
+    _BODY = struct.Struct("<7s5sBBB")
+
+    def _fields(self) -> tuple:
+        return (
+            COMMAND_MAGIC,
+            _MASTER_POWER,
+            3 if self.power else 0,
+            0,
+            1 if self.power else 0,
+        )
+
     @property
     def body(self) -> bytes:
-        return bytes().join(
-            (
-                _COMMAND_MAGIC,
-                bytes.fromhex("0F FF 0B 03 00"),
-                bytes.fromhex("03" if self.power else "00"),
-                bytes.fromhex("00"),
-                bytes.fromhex("01" if self.power else "00"),
-            )
-        )
+        return self._BODY.pack(*self._fields())
 
 
 MasterPowerOnCommand = partial(MasterPowerCommand, power=True)
@@ -205,16 +340,14 @@ class BrightnessCommand(ZoneCommand):
         except TypeError as e:
             raise ValueError("Brightness level must be int-like.") from e
 
+    _BODY = struct.Struct("<7sH4sB")
+
+    def _fields(self) -> tuple:
+        return COMMAND_MAGIC, 1 << (self.zone - 1), _BRIGHTNESS, self.brightness
+
     @property
     def body(self) -> bytes:
-        return bytes().join(
-            (
-                _COMMAND_MAGIC,
-                struct.pack("<H", 2 ** (self.zone - 1)),
-                bytes.fromhex("07 02 00 00"),
-                struct.pack("B", self.brightness),
-            )
-        )
+        return self._BODY.pack(*self._fields())
 
 
 class TemperatureCommand(ZoneCommand):
@@ -247,16 +380,14 @@ class TemperatureCommand(ZoneCommand):
         except TypeError as e:
             raise ValueError("Temperature level must be int-like.") from e
 
+    _BODY = struct.Struct("<7sH4sB")
+
+    def _fields(self) -> tuple:
+        return COMMAND_MAGIC, 1 << (self.zone - 1), _TEMPERATURE, self.temperature
+
     @property
     def body(self) -> bytes:
-        return bytes().join(
-            (
-                _COMMAND_MAGIC,
-                struct.pack("<H", 2 ** (self.zone - 1)),
-                bytes.fromhex("0D 02 00 00"),
-                struct.pack("B", self.temperature),
-            )
-        )
+        return self._BODY.pack(*self._fields())
 
 
 class RGBWCommand(ZoneCommand):
@@ -308,47 +439,49 @@ class RGBWCommand(ZoneCommand):
         except TypeError as e:
             raise ValueError(f"Component level of {hint} must be int-like.") from e
 
+    _BODY = struct.Struct("<7sH3sBBBB3s")
+
+    def _fields(self) -> tuple:
+        return (
+            COMMAND_MAGIC,
+            1 << (self.zone - 1),
+            _RGBW,
+            self.red,
+            self.green,
+            self.blue,
+            self.white,
+            _RGBW_SUFFIX,
+        )
+
     @property
     def body(self) -> bytes:
-        return bytes().join(
-            (
-                _COMMAND_MAGIC,
-                struct.pack("<H", 2 ** (self.zone - 1)),
-                bytes.fromhex("01 07 00"),
-                struct.pack("B", self.red),
-                struct.pack("B", self.green),
-                struct.pack("B", self.blue),
-                struct.pack("B", self.white),
-                bytes.fromhex("00 00 00"),
-            )
-        )
+        return self._BODY.pack(*self._fields())
 
 
 class GetNumberOfZonesCommand(Command):
     """Get number of zones available."""
 
+    _BODY = struct.Struct("<7s5s")
+
+    def _fields(self) -> tuple:
+        return COMMAND_MAGIC, _GET_NUMBER_OF_ZONES
+
     @property
     def body(self) -> bytes:
-        return bytes().join(
-            (
-                _COMMAND_MAGIC,
-                bytes.fromhex("01 00 79 00 00"),
-            )
-        )
+        return self._BODY.pack(*self._fields())
 
 
 class GetZoneInfoCommand(ZoneCommand):
     """Discover a zone according to it's number."""
 
+    _BODY = struct.Struct("<7sH3s")
+
+    def _fields(self) -> tuple:
+        return COMMAND_MAGIC, 1 << (self.zone - 1), _GET_ZONE_INFO
+
     @property
     def body(self) -> bytes:
-        return bytes().join(
-            (
-                _COMMAND_MAGIC,
-                struct.pack("<H", 2 ** (self.zone - 1)),
-                bytes.fromhex("78 00 00"),
-            )
-        )
+        return self._BODY.pack(*self._fields())
 
     @staticmethod
     def validate_zone(zone: int):
@@ -368,6 +501,41 @@ class GetZoneInfoCommand(ZoneCommand):
             raise ValueError("Zone number must be int-like.") from e
 
 
+def encode_batch(commands: Iterable[Command], state: State) -> bytearray:
+    """
+    Encode many commands into one contiguous buffer.
+
+    The commands get consecutive frame numbers allocated from the state
+    (a `state` the commands were created with is not used). The result
+    is the same as concatenated [`encode()`][skydance.protocol.Command.encode]
+    outputs, but only a single buffer is allocated.
+
+    Args:
+        commands: Commands to encode.
+        state: A state used to allocate frame numbers.
+    """
+    commands = list(commands)
+    res = bytearray(sum(command.size for command in commands))
+    frame_number = state.allocate_frame_numbers(len(commands))
+    offset = 0
+    for command in commands:
+        frame = command._FRAME
+        if frame is None:
+            offset += command.pack_into(res, offset, frame_number=frame_number)
+        else:
+            # inlined `pack_into()` of built-in commands
+            frame.pack_into(res, offset, HEAD, frame_number, *command._fields(), TAIL)
+            offset += frame.size
+        frame_number = (frame_number + 1) & 0xFF
+    return res
+
+
+# device type, source address, destination address, zone, command type, data length
+_RESPONSE_HEADER_LENGTH = 12
+_RESPONSE_CMD_TYPE_OFFSET = len(HEAD) + 1 + 9
+_RESPONSE_CMD_DATA_LENGTH = struct.Struct("<H")
+
+
 class Response(metaclass=ABCMeta):
     """A base response."""
 
@@ -381,6 +549,8 @@ class Response(metaclass=ABCMeta):
         self.raw = raw
 
         lbody = self.body
+        if len(lbody) < _RESPONSE_HEADER_LENGTH:
+            raise ValueError("Response is too short.")
         li = 0
 
         self.device_type = lbody[li : li + 3]
@@ -403,9 +573,8 @@ class Response(metaclass=ABCMeta):
         cmd_data_lenght = struct.unpack("<H", lbody[li : li + 2])[0]
         li += 2
 
-        if cmd_data_lenght > 0:
-            self.cmd_data = lbody[li : li + cmd_data_lenght]
-            li += cmd_data_lenght
+        self.cmd_data = lbody[li : li + cmd_data_lenght]
+        li += cmd_data_lenght
 
     @property
     def body(self) -> bytes:
@@ -418,6 +587,63 @@ class Response(metaclass=ABCMeta):
         return self.raw[len(HEAD) + 1 : -len(TAIL)]
 
 
+class UnknownResponse(Response):
+    """
+    A response which is not recognized by this library.
+
+    Only the common fields (like `cmd_type` and `cmd_data`) are parsed.
+    """
+
+
+_RESPONSE_TYPES: Dict[Tuple[int, Optional[int]], Type[Response]] = {}
+
+
+def register_response(
+    cmd_type: int, data_length: Optional[int] = None
+) -> Callable[[R], R]:
+    """
+    Register a response class to be chosen by [`parse_response()`][skydance.protocol.parse_response].
+
+    Args:
+        cmd_type: A command type of responses parsed by the class.
+        data_length: A length of command data. If set, the class is chosen
+            only for responses of this length, which allows to distinguish
+            different data layouts of the same command type.
+    """
+
+    def decorator(cls: R) -> R:
+        _RESPONSE_TYPES[cmd_type, data_length] = cls
+        return cls
+
+    return decorator
+
+
+def parse_response(raw: bytes) -> Response:
+    """
+    Parse a response choosing its class by command type and data length.
+
+    Responses of unregistered command types are parsed as
+    [`UnknownResponse`][skydance.protocol.UnknownResponse].
+
+    Args:
+        raw: Raw bytes of a complete response.
+
+    Raise:
+        ValueError: If the response is malformed.
+    """
+    if len(raw) < _RESPONSE_CMD_TYPE_OFFSET + 3:
+        raise ValueError("Response is too short.")
+    cmd_type = raw[_RESPONSE_CMD_TYPE_OFFSET] - DEVICE_BASE_TYPE_NORMAL
+    (data_length,) = _RESPONSE_CMD_DATA_LENGTH.unpack_from(
+        raw, _RESPONSE_CMD_TYPE_OFFSET + 1
+    )
+    cls = _RESPONSE_TYPES.get((cmd_type, data_length)) or _RESPONSE_TYPES.get(
+        (cmd_type, None), UnknownResponse
+    )
+    return cls(raw)
+
+
+@register_response(0x79)
 class GetNumberOfZonesResponse(Response):
     """
     Parse a response for `GetNumberOfZonesCommand`.
@@ -457,6 +683,7 @@ class GetNumberOfZonesResponse(Response):
         return self._zones
 
 
+@register_response(0x78)
 class GetZoneInfoResponse(Response):
     """
     Parse a response for `GetZoneInfoCommand`.
@@ -0,0 +1,21 @@
+import asyncio
+import threading
+
+import pytest
+
+from skydance.network.emulator import RelayEmulator
+
+
+@pytest.fixture(name="threaded_relay")
+def threaded_relay_fixture():
+    """Run a relay emulator in its own event loop thread (for blocking code under test)."""
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    relay = RelayEmulator()
+    asyncio.run_coroutine_threadsafe(relay.start(), loop).result()
+    yield relay
+    asyncio.run_coroutine_threadsafe(relay.close(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
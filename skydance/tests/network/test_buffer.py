@@ -1,6 +1,8 @@
 import pytest
 
-from skydance.network.buffer import Buffer
+from skydance.metrics import InMemoryMetrics
+from skydance.network.buffer import Buffer, FrameBuffer
+from skydance.protocol import HEAD, GetZoneInfoCommand, PingCommand, RGBWCommand, State
 
 
 def test_init():
@@ -67,3 +69,77 @@ def test_reset():
     buffer.reset()
     buffer.feed(bytes([1, 2, 3, 0, 0]))
     assert buffer.get_message() == bytes([1, 2, 3, 0, 0])
+
+
+def test_metrics():
+    metrics = InMemoryMetrics()
+    buffer = Buffer(bytes([0, 0]), metrics=metrics, labels=(("relay", "a"),))
+    buffer.feed(bytes([1, 2, 0, 0, 3]))
+    assert metrics.gauges["buffer_size_bytes", (("relay", "a"),)] == 5
+    buffer.get_message()
+    assert metrics.gauges["buffer_size_bytes", (("relay", "a"),)] == 1
+    assert metrics.counters["buffer_messages_total", (("relay", "a"),)] == 1
+
+
+FRAMES = [
+    PingCommand(State()).raw,
+    # data contains 00 7e
+    RGBWCommand(State(), zone=1, red=0, green=0x7E, blue=0, white=0x7E).raw,
+    GetZoneInfoCommand(State(), zone=2).raw,
+]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 5, 7, 20, 1000])
+def test_frame_buffer_chunks(chunk_size):
+    stream = b"".join(FRAMES)
+    buffer = FrameBuffer()
+    res = []
+    for i in range(0, len(stream), chunk_size):
+        buffer.feed(stream[i : i + chunk_size])
+        while buffer.is_message_ready:
+            res.append(buffer.get_message())
+    assert res == FRAMES
+    assert buffer.size == 0
+    assert buffer.discarded_bytes == 0
+
+
+def test_frame_buffer_resync():
+    metrics = InMemoryMetrics()
+    buffer = FrameBuffer(metrics=metrics)
+    garbage = bytes([1, 0, 0x7E]) + HEAD[:3]
+    # HEAD followed by a length pointing to a position without TAIL
+    fake = HEAD + bytes(11) + bytes([2, 0]) + bytes(4)
+    buffer.feed(garbage + fake + FRAMES[0])
+    buffer.feed(HEAD[:2])
+    buffer.feed(FRAMES[1][2:])
+    assert buffer.get_message() == FRAMES[0]
+    assert buffer.get_message() == FRAMES[1]
+    assert not buffer.is_message_ready
+    assert buffer.discarded_bytes == len(garbage) + len(fake)
+    assert metrics.counters["buffer_discarded_bytes_total", ()] == len(garbage) + len(
+        fake
+    )
+    assert metrics.counters["buffer_messages_total", ()] == 2
+
+
+def test_frame_buffer_bounded():
+    buffer = FrameBuffer(max_size=64)
+    # a length field of 65535 is not trusted
+    buffer.feed(HEAD + bytes(11) + bytes([0xFF, 0xFF]))
+    for _ in range(100):
+        buffer.feed(bytes(range(256)))
+        assert buffer.size < len(HEAD)
+    buffer.feed(FRAMES[2])
+    assert buffer.get_message() == FRAMES[2]
+
+
+def test_frame_buffer_reset():
+    buffer = FrameBuffer()
+    buffer.feed(FRAMES[0][:10])
+    buffer.reset()
+    buffer.feed(FRAMES[1])
+    assert buffer.get_message() == FRAMES[1]
+    with pytest.raises(expected_exception=ValueError):
+        buffer.get_message()
+    with pytest.raises(expected_exception=ValueError):
+        FrameBuffer(max_size=10)
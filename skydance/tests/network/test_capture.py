@@ -0,0 +1,108 @@
+import pytest
+
+from skydance.network.capture import *
+from skydance.network.emulator import RelayEmulator
+from skydance.network.session import Session
+from skydance.protocol import GetNumberOfZonesCommand, PingCommand, State
+
+
+class FakeSession:
+    def __init__(self):
+        self.written = []
+
+    async def write(self, data: bytes):
+        self.written.append(data)
+
+
+def test_invalid_capacity():
+    with pytest.raises(expected_exception=ValueError):
+        WireRecorder(capacity=0)
+
+
+def test_ring():
+    recorder = WireRecorder(capacity=2)
+    for i in range(3):
+        recorder.record(Direction.SENT, "a", bytes([i]))
+    assert [frame.data for frame in recorder] == [bytes([1]), bytes([2])]
+    recorder.clear()
+    assert len(recorder) == 0
+
+
+def test_dump_load(tmp_path):
+    path = str(tmp_path / "capture.bin")
+    recorder = WireRecorder()
+    recorder.record(Direction.SENT, "192.168.1.5", bytes([1, 2, 3]))
+    recorder.record(Direction.RECEIVED, "192.168.1.5", bytes([4, 5]))
+    assert recorder.dump(path) == 2
+    assert load_capture(path) == list(recorder)
+
+
+def test_record_oversized(tmp_path):
+    path = str(tmp_path / "capture.bin")
+    recorder = WireRecorder()
+    data = bytes(range(256)) * 300
+    recorder.record(Direction.RECEIVED, "192.168.1.5", data)
+    assert [len(frame.data) for frame in recorder] == [65535, 11265]
+    assert recorder.dump(path) == 2
+    assert b"".join(frame.data for frame in load_capture(path)) == data
+    with pytest.raises(ValueError):
+        recorder.record(Direction.SENT, "a" * 256, b"")
+
+
+def test_load_empty(tmp_path):
+    path = str(tmp_path / "capture.bin")
+    WireRecorder().dump(path)
+    assert load_capture(path) == []
+
+
+@pytest.mark.parametrize("content", [b"garbage", b"SKYCAP\x00\x01\x00"])
+def test_load_invalid(tmp_path, content):
+    path = tmp_path / "capture.bin"
+    path.write_bytes(content)
+    with pytest.raises(expected_exception=ValueError):
+        load_capture(str(path))
+
+
+@pytest.mark.asyncio
+async def test_replay_filter():
+    frames = [
+        CapturedFrame(0, Direction.SENT, "a", bytes([1])),
+        CapturedFrame(1, Direction.RECEIVED, "a", bytes([2])),
+        CapturedFrame(2, Direction.SENT, "b", bytes([3])),
+    ]
+    session = FakeSession()
+    report = await replay(frames, session, relay="a", speed=0)
+    assert session.written == [bytes([1])]
+    assert report.frames == 1
+    assert report.bytes == 1
+
+
+@pytest.mark.asyncio
+async def test_replay_timing():
+    frames = [
+        CapturedFrame(0, Direction.SENT, "a", bytes([1])),
+        CapturedFrame(int(0.2e9), Direction.SENT, "a", bytes([2])),
+    ]
+    report = await replay(frames, FakeSession(), speed=2)
+    assert 0.1 <= report.elapsed < 0.2
+
+
+@pytest.mark.asyncio
+async def test_session_recording_and_replay():
+    recorder = WireRecorder()
+    state = State()
+    async with RelayEmulator() as relay:
+        async with Session(relay.host, relay.port, recorder=recorder) as session:
+            await session.write(PingCommand(state).raw)
+            await session.write(GetNumberOfZonesCommand(state).raw)
+            await session.read(64)
+        assert [frame.direction for frame in recorder] == [
+            Direction.SENT,
+            Direction.SENT,
+            Direction.RECEIVED,
+        ]
+
+        async with Session(relay.host, relay.port) as session:
+            await replay(recorder, session, speed=0)
+            await session.read(64)
+        assert relay.frames_received == 4
@@ -0,0 +1,67 @@
+import asyncio
+import time
+from typing import List
+from unittest.mock import Mock, patch
+
+import pytest
+
+from skydance.network.connect import open_first_connection
+
+
+def fake_open_connection(delays, closed):
+    """Return a fake `asyncio.open_connection` with per-address delays (or errors)."""
+
+    async def open_connection(address, port):
+        delay = delays[address]
+        if isinstance(delay, Exception):
+            raise delay
+        await asyncio.sleep(delay)
+        writer = Mock()
+        writer.close = Mock(side_effect=lambda: closed.append(address))
+        return Mock(), writer
+
+    return open_connection
+
+
+@pytest.mark.parametrize(
+    "delays, winner",
+    [
+        ({"a": 0, "b": 1}, "a"),
+        ({"a": 1, "b": 0}, "b"),
+        ({"a": OSError(), "b": 0}, "b"),
+        ({"a": 0.15, "b": 0.1}, "a"),
+    ],
+)
+async def test_winner(delays, winner):
+    closed: List[str] = []
+    with patch("asyncio.open_connection", fake_open_connection(delays, closed)):
+        address, _, _ = await open_first_connection(list(delays), 1, delay=0.1)
+    assert address == winner
+    assert winner not in closed
+
+
+async def test_failed_attempt_starts_next_immediately():
+    delays = {"a": ConnectionRefusedError(), "b": 0}
+    with patch("asyncio.open_connection", fake_open_connection(delays, [])):
+        start = time.perf_counter()
+        await open_first_connection(["a", "b"], 1, delay=5)
+    assert time.perf_counter() - start < 1
+
+
+async def test_late_winner_is_closed():
+    closed: List[str] = []
+    delays = {"a": 0.05, "b": 0.05}
+    with patch("asyncio.open_connection", fake_open_connection(delays, closed)):
+        address, _, _ = await open_first_connection(["a", "b"], 1, delay=0)
+    assert closed == ["b" if address == "a" else "a"]
+
+
+async def test_all_fail():
+    delays = {"a": ConnectionRefusedError("a"), "b": OSError("b")}
+    with patch("asyncio.open_connection", fake_open_connection(delays, [])):
+        with pytest.raises(expected_exception=ConnectionRefusedError):
+            await open_first_connection(["a"], 1)
+        with pytest.raises(expected_exception=OSError, match="Multiple exceptions"):
+            await open_first_connection(["a", "b"], 1)
+        with pytest.raises(expected_exception=ValueError):
+            await open_first_connection([], 1)
@@ -1,5 +1,8 @@
+from unittest.mock import Mock
+
 import pytest
 
+from skydance.metrics import InMemoryMetrics, relay_labels
 from skydance.network.discovery import DiscoveryProtocol
 
 
@@ -7,3 +10,20 @@ def test_misuse():
     protocol = DiscoveryProtocol()
     with pytest.raises(expected_exception=ValueError):
         protocol.send_discovery_request()
+
+
+def test_metrics():
+    metrics = InMemoryMetrics()
+    protocol = DiscoveryProtocol(metrics=metrics)
+    protocol.connection_made(Mock())
+    protocol.send_discovery_request()
+    protocol.datagram_received(
+        b"192.168.1.5,98D863A59E5C,HF-LPT130", ("192.168.1.5", 48899)
+    )
+    assert metrics.counters["discovery_requests_total", ()] == 1
+    assert (
+        metrics.counters[
+            "discovery_replies_total", relay_labels(mac=bytes.fromhex("98d863a59e5c"))
+        ]
+        == 1
+    )
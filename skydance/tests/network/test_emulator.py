@@ -0,0 +1,56 @@
+import pytest
+
+from skydance.enum import ZoneType
+from skydance.network.buffer import Buffer
+from skydance.network.emulator import RelayEmulator
+from skydance.network.session import Session
+from skydance.protocol import *
+
+
+@pytest.fixture(name="state")
+def state_fixture():
+    return State()
+
+
+async def _query(session: Session, command: Command) -> bytes:
+    buffer = Buffer(TAIL)
+    await session.write(command.raw)
+    while not buffer.is_message_ready:
+        buffer.feed(await session.read(64))
+    return buffer.get_message()
+
+
+@pytest.mark.asyncio
+async def test_get_number_of_zones(state):
+    async with RelayEmulator() as relay:
+        async with Session(relay.host, relay.port) as session:
+            res = GetNumberOfZonesResponse(
+                await _query(session, GetNumberOfZonesCommand(state))
+            )
+    assert res.zones == [1, 2, 3, 4]
+
+
+@pytest.mark.asyncio
+async def test_get_zone_info(state):
+    zones = {15: (ZoneType.RGBCCT, "Kuchyň top")}
+    async with RelayEmulator(zones) as relay:
+        async with Session(relay.host, relay.port) as session:
+            res = GetZoneInfoResponse(
+                await _query(session, GetZoneInfoCommand(state, zone=15))
+            )
+    assert res.type == ZoneType.RGBCCT
+    assert res.name == "Kuchyň top"
+    assert res.zone == 1 << 14
+
+
+def test_handle_frame_silent(state):
+    relay = RelayEmulator()
+    assert relay.handle_frame(PowerOnCommand(state, zone=1).raw) is None
+    assert relay.frames_received == 1
+
+
+def test_handle_frame_frame_number(state):
+    state.increment_frame_number()
+    res = RelayEmulator().handle_frame(GetNumberOfZonesCommand(state).raw)
+    assert res is not None
+    assert res[len(HEAD)] == 1
@@ -0,0 +1,131 @@
+import asyncio
+
+import pytest
+
+from skydance.metrics import InMemoryMetrics
+from skydance.network.emulator import RelayEmulator
+from skydance.network.fair import FairQueue
+from skydance.network.session import Session
+from skydance.network.virtual import run_virtual
+from skydance.protocol import PowerCommand, State
+
+
+class FakeSession:
+    def __init__(self, *, fail=False, fail_zone=None):
+        self.metrics = InMemoryMetrics()
+        self.labels = (("host", "fake"),)
+        self.batches = []
+        self.fail = fail
+        self.fail_zone = fail_zone
+
+    async def send_many(self, commands):
+        commands = list(commands)
+        await asyncio.sleep(0.01)
+        if self.fail:
+            raise ConnectionError("fake")
+        if any(command.zone == self.fail_zone for command in commands):
+            raise ValueError("fake")
+        self.batches.append([command.zone for command in commands])
+
+
+def _commands(zone, count):
+    return [PowerCommand(State(), zone=zone, power=True) for _ in range(count)]
+
+
+async def test_weighted_shares():
+    session = FakeSession()
+    queue = FairQueue(session, batch=8)  # type: ignore
+    heavy = queue.producer("heavy", weight=3)
+    light = queue.producer("light")
+    await asyncio.gather(
+        heavy.send_many(_commands(1, 300)), light.send_many(_commands(2, 100))
+    )
+    first = [zone for batch in session.batches[:10] for zone in batch]
+    assert first.count(1) == 60
+    assert first.count(2) == 20
+    assert sum(map(len, session.batches)) == 400
+    assert queue.pending == 0
+
+
+async def test_idle_producer_not_stuck_behind_backlog():
+    session = FakeSession()
+    queue = FairQueue(session, batch=4)  # type: ignore
+    effects = queue.producer("effects")
+    ui = queue.producer("ui")
+    backlog = asyncio.create_task(effects.send_many(_commands(1, 1000)))
+    await asyncio.sleep(0.05)
+
+    await ui.send(_commands(2, 1)[0])
+    assert len(session.batches) < 10
+    assert effects.pending > 900
+
+    # the rest of a cancelled request is dropped
+    backlog.cancel()
+    await queue.close()
+    assert effects.pending == 0
+    assert sum(map(len, session.batches)) < 100
+
+
+async def test_metrics():
+    session = FakeSession()
+    queue = FairQueue(session, batch=2)  # type: ignore
+    producer = queue.producer("ui")
+    await producer.send_many(_commands(1, 5))
+
+    labels = (("host", "fake"), ("producer", "ui"))
+    assert session.metrics.gauges["session_producer_queue_depth", labels] == 0
+    waits = session.metrics.histograms["session_producer_wait_seconds", labels]
+    assert waits.count == 5
+    assert waits.sum > 0
+
+
+async def test_failed_write():
+    session = FakeSession(fail=True)
+    producer = FairQueue(session, batch=2).producer("ui")  # type: ignore
+    with pytest.raises(ConnectionError):
+        await producer.send_many(_commands(1, 5))
+    # the rest of the failed request is dropped
+    await asyncio.sleep(0.1)
+    assert producer.pending == 0
+
+
+async def test_failed_encoding():
+    session = FakeSession(fail_zone=1)
+    queue = FairQueue(session, batch=2)  # type: ignore
+    broken = queue.producer("broken")
+    other = queue.producer("other")
+    results = await asyncio.wait_for(
+        asyncio.gather(
+            broken.send_many(_commands(1, 2)),
+            *(other.send(command) for command in _commands(2, 4)),
+            return_exceptions=True,
+        ),
+        1,
+    )
+    # the other producer's command in the failed batch fails with it,
+    # the rest is still written
+    assert [type(result) for result in results] == [ValueError] * 2 + [type(None)] * 3
+    assert sum(map(len, session.batches)) == 3
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        FairQueue(FakeSession(), batch=0)  # type: ignore
+    with pytest.raises(ValueError):
+        FairQueue(FakeSession()).producer("ui", weight=0)  # type: ignore
+
+
+def test_session_producers():
+    async def main():
+        async with RelayEmulator() as relay:
+            async with Session(relay.host, relay.port) as session:
+                ui = session.producer("ui", weight=2)
+                assert session.producer("ui", weight=2) is ui
+                effects = session.producer("effects")
+                await asyncio.gather(
+                    effects.send_many(_commands(1, 50)), ui.send_many(_commands(2, 5))
+                )
+            await asyncio.sleep(0.1)
+            return relay.frames_received
+
+    assert run_virtual(main(), latency=0.001) == 55
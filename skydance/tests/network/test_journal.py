@@ -0,0 +1,112 @@
+import asyncio
+from unittest.mock import AsyncMock, Mock, patch
+
+from skydance.metrics import InMemoryMetrics
+from skydance.network.journal import CommandJournal
+from skydance.network.session import Session
+from skydance.protocol import (
+    HEAD,
+    TAIL,
+    BrightnessCommand,
+    GetZoneInfoCommand,
+    MasterPowerCommand,
+    PowerCommand,
+    State,
+)
+
+
+def _brightness(zone, brightness):
+    return BrightnessCommand(State(), zone=zone, brightness=brightness)
+
+
+def test_key():
+    assert CommandJournal.key(_brightness(1, 10)) == (1, "brightness")
+    assert CommandJournal.key(MasterPowerCommand(State(), power=True)) == (
+        None,
+        "master_power",
+    )
+    assert CommandJournal.key(GetZoneInfoCommand(State(), zone=1)) is None
+
+
+def test_replay_newest_per_key():
+    journal = CommandJournal()
+    master_off = MasterPowerCommand(State(), power=False)
+    zone_on = PowerCommand(State(), zone=2, power=True)
+    for brightness in range(1, 100):
+        journal.record(_brightness(1, brightness))
+    journal.record(master_off)
+    journal.record(zone_on)
+    newest = _brightness(1, 100)
+    journal.record(newest)
+    assert journal.record(GetZoneInfoCommand(State(), zone=1)) == 0
+    assert len(journal) == 3
+    assert journal.replay() == [master_off, zone_on, newest]
+
+
+def test_delivered():
+    journal = CommandJournal()
+    old, new = _brightness(1, 10), _brightness(1, 20)
+    old_sequence = journal.record(old)
+    new_sequence = journal.record(new)
+    journal.mark_delivered(old, old_sequence)
+    assert journal.is_delivered(old, old_sequence)
+    assert not journal.is_delivered(new, new_sequence)
+    journal.replay()
+    assert journal.is_delivered(new, new_sequence)
+    assert not journal.is_delivered(GetZoneInfoCommand(State(), zone=1), 0)
+
+
+def _body(frame: bytes) -> bytes:
+    return frame[len(HEAD) + 1 : -len(TAIL)]
+
+
+@patch("asyncio.open_connection")
+async def test_session_replays_after_reconnect(open_connection_mock):
+    fake_reader, fake_writer = AsyncMock(), AsyncMock()
+
+    async def open_connection(*args):
+        await asyncio.sleep(0.01)  # other commands are queued meanwhile
+        return fake_reader, fake_writer
+
+    open_connection_mock.side_effect = open_connection
+    written = []
+    fake_writer.write = Mock(side_effect=lambda data: written.append([data]))
+    fake_writer.writelines = Mock(side_effect=lambda data: written.append(list(data)))
+    fake_writer.close = Mock()
+    fake_writer.get_extra_info = Mock(return_value=None)
+    metrics = InMemoryMetrics()
+    session = Session("127.0.0.1", 123, journal=CommandJournal(), metrics=metrics)
+
+    async with session:
+        await session.send(_brightness(1, 1))
+        # the connection breaks, while many commands are queued
+        fake_writer.drain = AsyncMock(side_effect=[ConnectionResetError(), None])
+        power = PowerCommand(State(), zone=2, power=True)
+        await asyncio.gather(
+            *(session.send(_brightness(1, b)) for b in range(2, 100)),
+            session.send(power),
+        )
+
+    # initial write, the failed one and a single replay batch
+    assert len(written) == 3
+    assert [_body(frame) for frame in written[2]] == [
+        _brightness(1, 99).body,
+        power.body,
+    ]
+    labels = session.labels
+    assert metrics.counters["session_journal_replayed_total", labels] == 2
+    assert metrics.counters["session_journal_skipped_total", labels] == 99
+
+
+@patch("asyncio.open_connection")
+async def test_session_without_journal(open_connection_mock):
+    fake_reader, fake_writer = AsyncMock(), AsyncMock()
+    open_connection_mock.return_value = fake_reader, fake_writer
+    fake_writer.write = Mock()
+    fake_writer.drain = AsyncMock(side_effect=[None, ConnectionResetError(), None])
+    fake_writer.close = Mock()
+    fake_writer.get_extra_info = Mock(return_value=None)
+    async with Session("127.0.0.1", 123) as session:
+        await session.send(_brightness(1, 1))
+        await session.send(_brightness(1, 2))
+    assert fake_writer.write.call_count == 3
@@ -0,0 +1,54 @@
+import pytest
+
+from skydance.network.emulator import RelayEmulator
+from skydance.network.pool import SessionPool
+from skydance.protocol import PORT, PingCommand
+
+
+def test_get_reuses_session():
+    pool = SessionPool()
+    session = pool.get("127.0.0.1")
+    assert pool.get("127.0.0.1") is session
+    assert pool.get("127.0.0.1", PORT) is session
+    assert pool.get("127.0.0.1", 123) is not session
+    assert len(pool) == 2
+
+
+@pytest.mark.asyncio
+async def test_close():
+    async with RelayEmulator() as relay:
+        async with SessionPool(port=relay.port) as pool:
+            session = pool.get(relay.host)
+            await session.send(PingCommand(session.state))
+            await pool.discard(relay.host)
+            assert len(pool) == 0
+            pool.get(relay.host)
+        assert len(pool) == 0
+
+
+@pytest.mark.asyncio
+async def test_prewarm():
+    async with RelayEmulator() as first, RelayEmulator(port=0) as second:
+        async with SessionPool(port=first.port) as pool:
+            pool.get(second.host, second.port)
+            res = await pool.prewarm([first.host, "127.0.0.2"], concurrency=1)
+            assert res[first.host, first.port] is None
+            assert isinstance(res["127.0.0.2", first.port], OSError)
+            assert len(pool) == 3
+
+            res = await pool.prewarm()
+            assert list(res.values()).count(None) == 2
+
+
+@pytest.mark.asyncio
+async def test_get_with_addresses():
+    async with RelayEmulator() as relay:
+        async with SessionPool(port=relay.port) as pool:
+            session = pool.get("aa:bb:cc:dd:ee:ff", addresses=["127.0.0.2", relay.host])
+            await session.connect()
+            assert session.address == relay.host
+            assert session.addresses == [relay.host, "127.0.0.2"]
+            pool.get("aa:bb:cc:dd:ee:ff", addresses=["127.0.0.2", relay.host])
+            assert session.addresses == [relay.host, "127.0.0.2"]
+            assert pool.get("aa:bb:cc:dd:ee:ff", addresses=["127.0.0.3"]) is session
+            assert session.addresses == ["127.0.0.3"]
@@ -0,0 +1,122 @@
+import asyncio
+import socket
+
+import pytest
+
+from skydance.network.emulator import RelayEmulator
+from skydance.network.scene import PreparedScene, fire_scene, prepare_scene
+from skydance.network.session import Session
+from skydance.protocol import PowerCommand, State
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_for_frames(relays, count):
+    for _ in range(100):
+        if all(relay.frames_received == count for relay in relays):
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError([relay.frames_received for relay in relays])
+
+
+@pytest.fixture(name="relays")
+async def relays_fixture():
+    relays = [RelayEmulator() for _ in range(5)]
+    await asyncio.gather(*(relay.start() for relay in relays))
+    yield relays
+    await asyncio.gather(*(relay.close() for relay in relays))
+
+
+def _commands(zones=(1, 2)):
+    return [PowerCommand(State(), zone=zone, power=True) for zone in zones]
+
+
+async def test_prepare_and_commit(relays):
+    sessions = [Session(relay.host, relay.port) for relay in relays]
+    try:
+        scene = await prepare_scene({session: _commands() for session in sessions})
+        assert not scene.errors
+        for session in sessions:
+            # frames are numbered by the session state, not the command state
+            assert [frame[5] for frame in scene.frames[session]] == [0, 1]
+            assert session.address is not None  # connected
+
+        report = await scene.commit()
+        assert not report.errors
+        assert set(report.written_at) == set(report.drained_at) == set(sessions)
+        assert 0 <= report.skew < 0.1
+        assert report.drain_skew >= 0
+        await _wait_for_frames(relays, 2)
+    finally:
+        await asyncio.gather(*(session.close() for session in sessions))
+
+
+async def test_commit_once(relays):
+    async with Session(relays[0].host, relays[0].port) as session:
+        scene = await prepare_scene({session: _commands()})
+        await scene.commit()
+        with pytest.raises(RuntimeError):
+            await scene.commit()
+
+
+async def test_unreachable_relay(relays):
+    unreachable = Session("127.0.0.1", _free_port())
+    reachable = Session(relays[0].host, relays[0].port)
+    try:
+        report = await fire_scene({unreachable: _commands(), reachable: _commands()})
+        assert set(report.errors) == {unreachable}
+        assert set(report.written_at) == {reachable}
+        assert report.skew == 0
+        await _wait_for_frames(relays[:1], 2)
+    finally:
+        await reachable.close()
+
+
+async def test_commit_failure_does_not_block_others(relays):
+    relay = relays[0]
+    session = Session(relay.host, relay.port)
+    broken = Session(relays[1].host, relays[1].port)
+    try:
+        scene = await prepare_scene({session: _commands(), broken: _commands()})
+        # the connection breaks and the relay goes away before the commit
+        await broken.close()
+        await relays[1].close()
+        report = await asyncio.wait_for(scene.commit(), 1)
+        assert set(report.errors) == {broken}
+        assert set(report.written_at) == {session}
+    finally:
+        await session.close()
+
+
+async def test_commit_reconnect_timeout(relays, monkeypatch):
+    relay = relays[0]
+    session = Session(relay.host, relay.port)
+    stalled = Session(relays[1].host, relays[1].port)
+    open_connection = asyncio.open_connection
+
+    async def stalling_open_connection(host, port, **kwargs):
+        if port == relays[1].port:
+            await asyncio.Event().wait()  # the relay stopped accepting connections
+        return await open_connection(host, port, **kwargs)
+
+    try:
+        scene = await prepare_scene(
+            {session: _commands(), stalled: _commands()}, timeout=0.1
+        )
+        await stalled.close()  # the commit has to reconnect
+        monkeypatch.setattr(asyncio, "open_connection", stalling_open_connection)
+        report = await asyncio.wait_for(scene.commit(), 1)
+        assert isinstance(report.errors[stalled], asyncio.TimeoutError)
+        assert set(report.written_at) == {session}
+        await _wait_for_frames(relays[:1], 2)
+    finally:
+        await session.close()
+
+
+async def test_empty_scene():
+    report = await PreparedScene({}, {}).commit()
+    assert report.skew == report.drain_skew == 0
@@ -0,0 +1,172 @@
+import asyncio
+import json
+import time
+from typing import List
+
+import pytest
+
+from skydance.network.emulator import RelayEmulator
+from skydance.network.pool import SessionPool
+from skydance.network.scheduler import Scheduler, StoredCommand
+from skydance.protocol import BrightnessCommand, PowerCommand, State
+
+
+class FakeSession:
+    def __init__(self):
+        self.batches = []
+
+    async def send_many(self, commands):
+        self.batches.append(list(commands))
+
+
+class FakePool:
+    def __init__(self):
+        self.sessions = {}
+
+    def get(self, host, port=None):
+        return self.sessions.setdefault((host, port), FakeSession())
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _power(zone=1):
+    return PowerCommand(State(), zone=zone, power=True)
+
+
+async def test_run_due_batches_per_relay():
+    pool, clock = FakePool(), Clock()
+    scheduler = Scheduler(pool, tick=1.0, clock=clock)  # type: ignore
+    for zone in range(1, 6):
+        scheduler.schedule(1000.2 + zone / 10, "a", _power(zone))
+    scheduler.schedule(1000.5, "b", _power())
+    scheduler.schedule(1001.0, "a", _power())  # next tick
+    assert len(scheduler) == 7
+
+    # nothing is sent early
+    assert await scheduler.run_due() == 0
+    clock.now = 1000.9
+    assert await scheduler.run_due() == 6
+    assert [len(batch) for batch in pool.sessions["a", None].batches] == [5]
+    assert [len(batch) for batch in pool.sessions["b", None].batches] == [1]
+    assert len(scheduler) == 1
+
+    assert await scheduler.run_due() == 0
+    clock.now = 1001.0
+    assert await scheduler.run_due() == 1
+    assert len(scheduler) == 0
+
+
+async def test_cancel():
+    pool, clock = FakePool(), Clock()
+    scheduler = Scheduler(pool, clock=clock)  # type: ignore
+    action = scheduler.schedule(1000.0, "a", _power())
+    scheduler.cancel(action)
+    scheduler.cancel(action)
+    assert len(scheduler) == 0
+    assert scheduler.actions() == []
+    assert await scheduler.run_due() == 0
+    assert not pool.sessions
+
+
+async def test_cancel_after_run():
+    pool, clock = FakePool(), Clock()
+    scheduler = Scheduler(pool, clock=clock)  # type: ignore
+    action = scheduler.schedule(1000.0, "a", _power())
+    assert await scheduler.run_due() == 1
+    scheduler.cancel(action)
+    assert len(scheduler) == 0
+
+
+async def test_every_skips_missed_runs():
+    pool, clock = FakePool(), Clock(1035.0)
+    scheduler = Scheduler(pool, tick=1.0, clock=clock)  # type: ignore
+    action = scheduler.schedule(1000.0, "a", _power(), every=10)
+    assert await scheduler.run_due() == 1
+    assert action.due == 1040.0
+    assert len(scheduler) == 1
+    assert len(pool.sessions["a", None].batches) == 1
+
+
+def test_schedule_invalid_interval():
+    with pytest.raises(ValueError):
+        Scheduler(FakePool()).schedule(0, "a", _power(), every=0)  # type: ignore
+
+
+async def test_persistence(tmp_path):
+    path = str(tmp_path / "schedule.json")
+    command = BrightnessCommand(State(), zone=3, brightness=51)
+    at = time.time() + 3600
+
+    async with Scheduler(FakePool(), path=path) as scheduler:  # type: ignore
+        scheduler.schedule(at, "a", command, port=1234, every=86400)
+        scheduler.cancel(scheduler.schedule(at, "a", _power()))
+
+    async with Scheduler(FakePool(), path=path) as scheduler:  # type: ignore
+        (action,) = scheduler.actions()
+        assert (action.due, action.host, action.port, action.every) == (
+            at,
+            "a",
+            1234,
+            86400,
+        )
+        assert isinstance(action.command, StoredCommand)
+        assert action.command.body == command.body
+        assert action.command.encode(b"\x07") == command.encode(b"\x07")
+
+
+def test_load_unknown_format(tmp_path):
+    path = tmp_path / "schedule.json"
+    path.write_text(json.dumps({"format": 0, "actions": []}))
+    with pytest.raises(ValueError):
+        Scheduler(FakePool(), path=str(path)).load()  # type: ignore
+
+
+async def test_not_sent_early():
+    pool = FakePool()
+    async with Scheduler(pool, tick=0.5) as scheduler:  # type: ignore
+        loop = asyncio.get_running_loop()
+        at = time.time() + 0.04
+        sent: List[float] = []
+        session = pool.get("a")
+        session.send_many = lambda commands: _record(sent, loop.time())
+        start = loop.time()
+        scheduler.schedule(at, "a", _power())
+        for _ in range(100):
+            if sent:
+                break
+            await asyncio.sleep(0.01)
+    assert sent[0] - start >= 0.035
+
+
+async def _record(sent, value):
+    sent.append(value)
+
+
+async def test_sends_to_relays():
+    relays = [RelayEmulator() for _ in range(2)]
+    await asyncio.gather(*(relay.start() for relay in relays))
+    try:
+        async with SessionPool() as pool, Scheduler(pool, tick=0.01) as scheduler:
+            at = time.time() + 0.05
+            for relay in relays:
+                for zone in range(1, 4):
+                    scheduler.schedule(at, relay.host, _power(zone), port=relay.port)
+            repeated = scheduler.schedule(
+                at, relays[0].host, _power(4), port=relays[0].port, every=0.05
+            )
+            for _ in range(100):
+                if relays[0].frames_received >= 5:
+                    break
+                await asyncio.sleep(0.01)
+            scheduler.cancel(repeated)
+            assert relays[0].frames_received >= 5
+            assert relays[1].frames_received == 3
+            assert len(scheduler) == 0
+    finally:
+        await asyncio.gather(*(relay.close() for relay in relays))
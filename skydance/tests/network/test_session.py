@@ -1,7 +1,21 @@
-import pytest
+import asyncio
+import socket
 from unittest.mock import AsyncMock, Mock, patch
 
-from skydance.network.session import Session
+import pytest
+
+from skydance.metrics import InMemoryMetrics
+from skydance.network.emulator import RelayEmulator
+from skydance.network.session import Session, SocketOptions
+from skydance.network.virtual import run_virtual
+from skydance.protocol import (
+    HEAD,
+    GetZoneInfoCommand,
+    GetZoneInfoResponse,
+    PingCommand,
+    PowerOnCommand,
+    State,
+)
 
 
 @pytest.mark.asyncio
@@ -14,6 +28,7 @@ async def test_read_fail(open_connection_mock):
         side_effect=[ConnectionResetError(), ConnectionAbortedError(), bytes([1, 2, 3])]
     )
     fake_writer.close = Mock()
+    fake_writer.get_extra_info = Mock(return_value=None)
     async with Session("127.0.0.1", 123) as session:
         res = await session.read()
         assert fake_reader.read.call_count == 3
@@ -30,6 +45,7 @@ async def test_write_fail(open_connection_mock):
         side_effect=[ConnectionResetError(), ConnectionAbortedError(), None]
     )
     fake_writer.close = Mock()
+    fake_writer.get_extra_info = Mock(return_value=None)
     async with Session("127.0.0.1", 123) as session:
         await session.write(bytes([0]))
         assert fake_writer.write.call_count == 3
@@ -49,6 +65,7 @@ async def test_drain_and_wait_closed_fail(open_connection_mock):
     fake_writer.write = Mock()
     fake_writer.drain = AsyncMock(side_effect=[ConnectionResetError(), None])
     fake_writer.close = Mock()
+    fake_writer.get_extra_info = Mock(return_value=None)
     fake_writer.wait_closed = AsyncMock(
         side_effect=[BrokenPipeError(), TimeoutError(), None]
     )
@@ -64,3 +81,165 @@ async def test_drain_and_wait_closed_fail(open_connection_mock):
 async def test_close_unopened():
     s = Session("127.0.0.1", 123)
     await s.close()
+
+
+@pytest.mark.asyncio
+@patch("asyncio.open_connection")
+async def test_metrics(open_connection_mock):
+    fake_reader, fake_writer = AsyncMock(), AsyncMock()
+    open_connection_mock.return_value = fake_reader, fake_writer
+    fake_writer.write = Mock(side_effect=[ConnectionResetError(), None])
+    fake_writer.close = Mock()
+    fake_writer.get_extra_info = Mock(return_value=None)
+    fake_reader.read = AsyncMock(return_value=bytes([1, 2, 3]))
+    metrics = InMemoryMetrics()
+    async with Session("127.0.0.1", 123, metrics=metrics) as session:
+        await session.write(bytes([0, 0]))
+        await session.read()
+    labels = (("relay", "127.0.0.1"),)
+    assert metrics.counters["session_connects_total", labels] == 2
+    assert metrics.counters["session_reconnects_total", labels] == 1
+    assert metrics.counters["session_writes_total", labels] == 1
+    assert metrics.counters["session_bytes_sent_total", labels] == 2
+    assert metrics.counters["session_bytes_received_total", labels] == 3
+    assert metrics.histograms["session_drain_seconds", labels].count == 1
+
+
+@pytest.mark.asyncio
+@patch("asyncio.open_connection")
+async def test_send_concurrent(open_connection_mock):
+    fake_reader, fake_writer = AsyncMock(), AsyncMock()
+    open_connection_mock.return_value = fake_reader, fake_writer
+    fake_writer.write = Mock()
+    fake_writer.close = Mock()
+    fake_writer.get_extra_info = Mock(return_value=None)
+    async with Session("127.0.0.1", 123) as session:
+        commands = [PingCommand(State()) for _ in range(5)]
+        await asyncio.gather(*(session.send(command) for command in commands))
+    frame_numbers = [call.args[0][len(HEAD)] for call in fake_writer.write.mock_calls]
+    assert frame_numbers == [0, 1, 2, 3, 4]
+    assert session.state.frame_number == bytes([5])
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("reset, expected", [(False, [0, 1, 2]), (True, [0, 1, 0])])
+@patch("asyncio.open_connection")
+async def test_send_reconnect_policy(open_connection_mock, reset, expected):
+    fake_reader, fake_writer = AsyncMock(), AsyncMock()
+    open_connection_mock.return_value = fake_reader, fake_writer
+    fake_writer.write = Mock()
+    fake_writer.drain = AsyncMock(side_effect=[None, ConnectionResetError(), None])
+    fake_writer.close = Mock()
+    fake_writer.get_extra_info = Mock(return_value=None)
+    session = Session("127.0.0.1", 123, reset_frame_number_on_reconnect=reset)
+    async with session:
+        await session.send(PingCommand(session.state))
+        await session.send(PingCommand(session.state))
+    frame_numbers = [call.args[0][len(HEAD)] for call in fake_writer.write.mock_calls]
+    assert frame_numbers == expected
+
+
+@pytest.mark.asyncio
+@patch("asyncio.open_connection")
+async def test_request(open_connection_mock):
+    fake_reader, fake_writer = AsyncMock(), AsyncMock()
+    open_connection_mock.return_value = fake_reader, fake_writer
+    # responses to a ping are numbers of zones
+    first = RelayEmulator._response(bytes([0]), 1, 0x79, b"\x81")
+    second = RelayEmulator._response(bytes([1]), 1, 0x79, b"\x82")
+    fake_reader.read = AsyncMock(side_effect=[first[:10], first[10:] + second])
+    fake_writer.write = Mock()
+    fake_writer.close = Mock()
+    fake_writer.get_extra_info = Mock(return_value=None)
+    async with Session("127.0.0.1", 123) as session:
+        assert await session.request(PingCommand(session.state)) == first
+        assert await session.request(PingCommand(session.state)) == second
+        assert fake_reader.read.call_count == 2
+
+
+def test_request_after_timeout():
+    async def main():
+        async with RelayEmulator() as relay:
+            async with Session(relay.host, relay.port) as session:
+                with pytest.raises(asyncio.TimeoutError):
+                    await asyncio.wait_for(
+                        session.request(GetZoneInfoCommand(State(), zone=1)), 0.005
+                    )
+                # the late response to zone 1 is skipped
+                return GetZoneInfoResponse(
+                    await session.request(GetZoneInfoCommand(State(), zone=2))
+                )
+
+    assert run_virtual(main(), latency=0.01).name == "Zone CCT"
+
+
+@pytest.mark.asyncio
+@patch("asyncio.open_connection")
+async def test_request_closed(open_connection_mock):
+    fake_reader, fake_writer = AsyncMock(), AsyncMock()
+    open_connection_mock.return_value = fake_reader, fake_writer
+    fake_reader.read = AsyncMock(return_value=bytes())
+    fake_writer.write = Mock()
+    fake_writer.close = Mock()
+    fake_writer.get_extra_info = Mock(return_value=None)
+    async with Session("127.0.0.1", 123) as session:
+        with pytest.raises(expected_exception=ConnectionError):
+            await session.request(PingCommand(session.state))
+
+
+@pytest.mark.asyncio
+@patch("asyncio.open_connection")
+async def test_send_many(open_connection_mock):
+    fake_reader, fake_writer = AsyncMock(), AsyncMock()
+    open_connection_mock.return_value = fake_reader, fake_writer
+    fake_writer.writelines = Mock(side_effect=[ConnectionResetError(), None])
+    fake_writer.close = Mock()
+    fake_writer.get_extra_info = Mock(return_value=None)
+    metrics = InMemoryMetrics()
+    async with Session("127.0.0.1", 123, metrics=metrics) as session:
+        await session.send_many(PingCommand(State()) for _ in range(3))
+        await session.send_many([])
+    [call] = fake_writer.writelines.mock_calls[1:]
+    # frame numbers allocated by the failed attempt are not reused
+    assert [frame[len(HEAD)] for frame in call.args[0]] == [3, 4, 5]
+    assert fake_writer.drain.call_count == 1
+    labels = (("relay", "127.0.0.1"),)
+    assert metrics.counters["session_writes_total", labels] == 3
+    assert metrics.counters["session_bytes_sent_total", labels] == 3 * 20
+
+
+async def test_write_many_and_socket_options():
+    options = SocketOptions(keepalive_idle=42, send_buffer=65536)
+    async with RelayEmulator() as relay:
+        async with Session(relay.host, relay.port, socket_options=options) as session:
+            frames = [PowerOnCommand(State(), zone=zone).raw for zone in (1, 2, 3)]
+            await session.write_many(frames)
+            sock = session._connection[1].get_extra_info("socket")
+            assert sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY)
+            assert sock.getsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE)
+            if hasattr(socket, "TCP_KEEPIDLE"):
+                assert sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE) == 42
+            for _ in range(100):
+                if relay.frames_received == 3:
+                    break
+                await asyncio.sleep(0.01)
+            assert relay.frames_received == 3
+
+
+async def test_connect_once():
+    metrics = InMemoryMetrics()
+    async with RelayEmulator() as relay:
+        session = Session(relay.host, relay.port, metrics=metrics)
+        session.subscribe()
+        await asyncio.gather(
+            *(session.send(PowerOnCommand(State(), zone=zone)) for zone in (1, 2, 3))
+        )
+        await session.close()
+    assert metrics.counters["session_connects_total", (("relay", relay.host),)] == 1
+
+
+def test_socket_options_unsupported():
+    sock = Mock()
+    sock.setsockopt = Mock(side_effect=[OSError(), None, None, None, None])
+    SocketOptions().apply(sock)
+    assert sock.setsockopt.call_count >= 2
@@ -0,0 +1,95 @@
+import pytest
+
+from skydance.network.shard import ShardedRuntime, _decode_error, _encode_error
+from skydance.protocol import *
+
+
+@pytest.fixture(name="runtime", scope="module")
+def runtime_fixture():
+    with ShardedRuntime(shards=2) as runtime:
+        yield runtime
+
+
+def test_send_and_request(runtime, threaded_relay):
+    state = State()
+    host, port = threaded_relay.host, threaded_relay.port
+    futures = [
+        runtime.submit_send(host, PowerOnCommand(state, zone=zone), port=port)
+        for zone in (1, 2, 3)
+    ]
+    assert [f.result(10) for f in futures] == [None, None, None]
+    raw = runtime.request(host, GetNumberOfZonesCommand(state), port=port, timeout=10)
+    assert GetNumberOfZonesResponse(raw).zones == [1, 2, 3, 4]
+    assert threaded_relay.frames_received == 4
+    runtime.remove_relay(host, port, timeout=10)
+
+
+def test_worker_error(runtime, unused_tcp_port):
+    with pytest.raises(expected_exception=ConnectionRefusedError):
+        runtime.send(
+            "127.0.0.1", PingCommand(State()), port=unused_tcp_port, timeout=10
+        )
+    runtime.remove_relay("127.0.0.1", unused_tcp_port)
+
+
+def test_assign_and_rebalance(runtime):
+    hosts = [f"10.0.0.{i}" for i in range(5)]
+    shards = [runtime.add_relay(host) for host in hosts]
+    assert sorted(shards) == [0, 0, 0, 1, 1]
+    assert runtime.add_relay(hosts[0]) == shards[0]
+    assert runtime.rebalance() == 0
+
+    for host, shard in zip(hosts, shards):
+        if shard == 0:
+            runtime.remove_relay(host, timeout=10)
+    # one relay moved from shard 1 to make the shards even again
+    assert sorted(runtime.assignments.values()) == [0, 1]
+    for host in hosts:
+        runtime.remove_relay(host, timeout=10)
+    assert runtime.assignments == {}
+
+
+def test_health(runtime, threaded_relay):
+    before = sum(h.commands for h in runtime.health(timeout=10))
+    host, port = threaded_relay.host, threaded_relay.port
+    for zone in (1, 2, 3, 4):
+        runtime.send(host, PowerOnCommand(State(), zone=zone), port=port, timeout=10)
+    runtime.remove_relay(host, port, timeout=10)
+
+    health = runtime.health(timeout=10)
+    assert [h.shard for h in health] == [0, 1]
+    assert all(h.alive and h.latency is not None and h.pid for h in health)
+    assert sum(h.commands for h in health) - before == 4
+
+
+def test_dead_shard():
+    with ShardedRuntime(shards=2) as runtime:
+        runtime.add_relay("10.0.0.1")
+        runtime.add_relay("10.0.0.2")
+        dead = runtime.shard_of("10.0.0.1")
+        runtime._shards[dead].process.kill()
+        runtime._shards[dead].process.join()
+
+        assert runtime.rebalance(timeout=10) == 1
+        assert set(runtime.assignments.values()) == {1 - dead}
+        assert not runtime.health(timeout=10)[dead].alive
+
+
+def test_closed():
+    runtime = ShardedRuntime(shards=1)
+    runtime.close()
+    runtime.close()
+    with pytest.raises(expected_exception=RuntimeError):
+        runtime.send("127.0.0.1", PingCommand(State()))
+
+
+def test_invalid_shards():
+    with pytest.raises(expected_exception=ValueError):
+        ShardedRuntime(shards=0)
+
+
+def test_error_encoding():
+    assert isinstance(_decode_error(_encode_error(TimeoutError("x"))), TimeoutError)
+    error = _decode_error(b"CustomError\0boom")
+    assert isinstance(error, RuntimeError)
+    assert str(error) == "CustomError: boom"
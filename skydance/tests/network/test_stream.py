@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+
+from skydance.metrics import NOOP_METRICS, InMemoryMetrics
+from skydance.network.emulator import RelayEmulator
+from skydance.network.session import Session
+from skydance.network.stream import FrameStream, StreamStats
+from skydance.protocol import BrightnessCommand, MasterPowerCommand, PowerCommand, State
+
+
+def _brightness(zone, brightness=128):
+    return BrightnessCommand(State(), zone=zone, brightness=brightness)
+
+
+class FakeSession:
+    host = "fake"
+    labels = ()
+
+    def __init__(self, delay=0.0, error=None):
+        self.metrics = NOOP_METRICS
+        self.delay = delay
+        self.error = error
+        self.release = asyncio.Event()
+        self.release.set()
+        self.sent = []
+
+    async def send_many(self, commands):
+        await self.release.wait()
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        self.sent.append(list(commands))
+
+
+async def test_stream_emulator():
+    async with RelayEmulator() as relay:
+        metrics = InMemoryMetrics()
+        async with Session(relay.host, relay.port, metrics=metrics) as session:
+            async with session.stream(max_delay=1) as stream:
+                for zone in range(1, 5):
+                    stream.push(_brightness(zone))
+                    stream.push(PowerCommand(State(), zone=zone, power=True))
+            assert stream.stats == StreamStats(delivered=8, dropped=0, late=0)
+            assert (
+                metrics.counters["stream_frames_delivered_total", session.labels] == 8
+            )
+        for _ in range(100):
+            if relay.frames_received == 8:
+                break
+            await asyncio.sleep(0.01)
+        assert relay.frames_received == 8
+
+
+async def test_newest_replaces_pending():
+    session = FakeSession()
+    session.release.clear()  # the relay stalls
+    async with FrameStream(session) as stream:  # type: ignore
+        stream.push(_brightness(1, 1))
+        await asyncio.sleep(0)  # the first frame is being written
+        for brightness in range(2, 10):
+            stream.push(_brightness(1, brightness))
+        session.release.set()
+    assert [[c.brightness for c in batch] for batch in session.sent] == [[1], [9]]
+    assert stream.stats == StreamStats(delivered=2, dropped=7, late=0)
+
+
+async def test_replaced_frame_keeps_push_order():
+    session = FakeSession()
+    session.release.clear()
+    async with FrameStream(session) as stream:  # type: ignore
+        stream.push(PowerCommand(State(), zone=1, power=True))
+        await asyncio.sleep(0)  # the first frame is being written
+        stream.push(PowerCommand(State(), zone=1, power=True))
+        stream.push(MasterPowerCommand(State(), power=False))
+        stream.push(PowerCommand(State(), zone=1, power=True))
+        session.release.set()
+    assert [type(command) for command in session.sent[1]] == [
+        MasterPowerCommand,
+        PowerCommand,
+    ]
+
+
+async def test_expired_frames_dropped():
+    session = FakeSession()
+    loop = asyncio.get_running_loop()
+    async with FrameStream(session) as stream:  # type: ignore
+        stream.push(_brightness(1), deadline=loop.time() - 1)
+        stream.push(_brightness(2))
+    assert [[c.zone for c in batch] for batch in session.sent] == [[2]]
+    assert stream.stats == StreamStats(delivered=1, dropped=1, late=0)
+
+
+async def test_late_frames():
+    session = FakeSession(delay=0.05)
+    async with FrameStream(session, max_delay=0.01) as stream:  # type: ignore
+        stream.push(_brightness(1))
+    assert stream.stats == StreamStats(delivered=0, dropped=0, late=1)
+
+
+async def test_write_failure():
+    session = FakeSession(error=ConnectionRefusedError())
+    async with FrameStream(session) as stream:  # type: ignore
+        stream.push(_brightness(1))
+    assert stream.stats == StreamStats(delivered=0, dropped=1, late=0)
+
+
+async def test_push_closed():
+    stream = FrameStream(FakeSession())  # type: ignore
+    await stream.close()
+    with pytest.raises(RuntimeError):
+        stream.push(_brightness(1))
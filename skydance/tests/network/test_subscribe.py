@@ -0,0 +1,173 @@
+import asyncio
+from typing import List
+
+import pytest
+
+from skydance.metrics import InMemoryMetrics
+from skydance.network.emulator import RelayEmulator
+from skydance.network.pool import SessionPool
+from skydance.network.session import Session
+from skydance.network.subscribe import Notification, Subscription
+from skydance.protocol import (
+    GetZoneInfoCommand,
+    GetZoneInfoResponse,
+    PowerOnCommand,
+    State,
+)
+
+
+_POWER = 0x0A
+_BRIGHTNESS = 0x07
+_ZONE_INFO = 0x78
+
+
+async def _wait_for(predicate):
+    for _ in range(100):
+        if predicate():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("Condition not met.")
+
+
+@pytest.fixture(name="relay")
+async def relay_fixture():
+    async with RelayEmulator() as relay:
+        yield relay
+
+
+@pytest.fixture(name="session")
+async def session_fixture(relay):
+    async with Session(relay.host, relay.port, metrics=InMemoryMetrics()) as session:
+        await _wait_for(lambda: relay.connections == 1)
+        yield session
+
+
+async def test_subscribe(relay, session):
+    subscription = session.subscribe()
+    relay.notify(zone=2, cmd_type=_POWER, data=b"\x01")
+    notification = await asyncio.wait_for(subscription.get(), 1)
+    assert isinstance(notification, Notification)
+    assert notification.host == relay.host
+    assert notification.response.cmd_type == _POWER
+    assert notification.response.zone == 0b10
+
+
+async def test_filters(relay, session):
+    by_zone = session.subscribe(zone=2)
+    by_cmd_type = session.subscribe(cmd_type=_BRIGHTNESS)
+    relay.notify(zone=1, cmd_type=_BRIGHTNESS)
+    relay.notify(zone=2, cmd_type=_POWER)
+    zone_notification = await asyncio.wait_for(by_zone.get(), 1)
+    cmd_type_notification = await asyncio.wait_for(by_cmd_type.get(), 1)
+    assert zone_notification.response.cmd_type == _POWER
+    assert cmd_type_notification.response.zone == 0b1
+
+
+async def test_request_while_subscribed(relay, session):
+    subscription = session.subscribe()
+    relay.notify(zone=1, cmd_type=_POWER)
+    response = GetZoneInfoResponse(
+        await asyncio.wait_for(session.request(GetZoneInfoCommand(State(), zone=3)), 1)
+    )
+    assert response.name == "Zone RGBW"
+    notification = await asyncio.wait_for(subscription.get(), 1)
+    assert notification.response.cmd_type == _POWER
+
+
+async def test_request_skips_other_zone(relay, session):
+    subscription = session.subscribe()
+    relay.notify(zone=4, cmd_type=_ZONE_INFO)
+    response = GetZoneInfoResponse(
+        await asyncio.wait_for(session.request(GetZoneInfoCommand(State(), zone=3)), 1)
+    )
+    assert response.name == "Zone RGBW"
+    notification = await asyncio.wait_for(subscription.get(), 1)
+    assert notification.response.zone == 1 << 3
+
+
+async def test_request_read_error(relay, session):
+    session.subscribe()
+    # no response comes to a power command
+    request = asyncio.create_task(session.request(PowerOnCommand(State(), zone=1)))
+    await _wait_for(lambda: session._expected is not None)
+    session._connection[0].set_exception(TimeoutError("read timed out"))
+    with pytest.raises(TimeoutError):
+        await asyncio.wait_for(request, 1)
+    # the broken connection is dropped
+    await _wait_for(lambda: relay.connections == 0)
+
+
+async def test_slow_consumer(relay, session):
+    subscription = session.subscribe(maxsize=2)
+    for zone in range(1, 6):
+        relay.notify(zone=zone, cmd_type=_POWER)
+    await _wait_for(lambda: subscription.dropped == 3)
+    zones = [(await subscription.get()).response.zone for _ in range(2)]
+    assert zones == [1 << 3, 1 << 4]
+    assert (
+        session.metrics.counters[  # type: ignore
+            "session_notifications_dropped_total", session.labels
+        ]
+        == 3
+    )
+
+
+async def test_callback(relay, session):
+    received: List[Notification] = []
+    session.subscribe(callback=received.append)
+    relay.notify(zone=1, cmd_type=_POWER)
+    await _wait_for(lambda: len(received) == 1)
+
+
+async def test_close_session_ends_iteration(relay):
+    session = Session(relay.host, relay.port)
+    subscription = session.subscribe()
+    await _wait_for(lambda: relay.connections == 1)
+    relay.notify(zone=1, cmd_type=_POWER)
+    await _wait_for(lambda: subscription.pending == 1)
+    await session.close()
+    assert subscription.closed
+    # queued notifications are still delivered
+    assert [n.response.cmd_type async for n in subscription] == [_POWER]
+
+
+async def test_close_full_queue(relay, session):
+    subscription = session.subscribe(maxsize=2)
+    for zone in range(1, 3):
+        relay.notify(zone=zone, cmd_type=_POWER)
+    await _wait_for(lambda: subscription.pending == 2)
+    subscription.close()
+    assert subscription.pending == 2
+    assert [n.response.zone async for n in subscription] == [0b1, 0b10]
+    assert subscription.dropped == 0
+
+
+async def test_close_subscription(relay, session):
+    subscription = session.subscribe()
+    subscription.close()
+    relay.notify(zone=1, cmd_type=_POWER)
+    with pytest.raises(EOFError):
+        await subscription.get()
+    with pytest.raises(ValueError):
+        session.attach(subscription)
+
+
+async def test_pool_subscribe():
+    async with RelayEmulator() as first, RelayEmulator() as second:
+        async with SessionPool() as pool:
+            pool.get(first.host, first.port)
+            pool.get(second.host, second.port)
+            subscription = pool.subscribe(cmd_type=_POWER)
+            await _wait_for(lambda: first.connections == second.connections == 1)
+            first.notify(zone=1, cmd_type=_POWER)
+            second.notify(zone=2, cmd_type=_POWER)
+            zones = {(await subscription.get()).response.zone for _ in range(2)}
+            assert zones == {0b1, 0b10}
+            with pytest.raises(ValueError):
+                pool.subscribe(["192.0.2.1"])
+        assert subscription.closed
+
+
+def test_invalid_maxsize():
+    with pytest.raises(ValueError):
+        Subscription(maxsize=0)
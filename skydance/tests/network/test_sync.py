@@ -0,0 +1,61 @@
+import concurrent.futures
+
+import pytest
+
+from skydance.network.sync import SyncClient
+from skydance.protocol import *
+
+
+def test_send_and_query(threaded_relay):
+    state = State()
+    with SyncClient(port=threaded_relay.port) as client:
+        client.send(threaded_relay.host, PowerOnCommand(state, zone=1), timeout=5)
+        res = client.query(
+            threaded_relay.host,
+            GetNumberOfZonesCommand(state),
+            GetNumberOfZonesResponse,
+        )
+        assert res.zones == [1, 2, 3, 4]
+    assert threaded_relay.frames_received == 2
+
+
+def test_parallel_queries(threaded_relay):
+    state = State()
+    with SyncClient(port=threaded_relay.port) as client:
+        futures = [
+            client.submit_query(
+                threaded_relay.host,
+                GetZoneInfoCommand(state, zone=zone),
+                GetZoneInfoResponse,
+            )
+            for zone in (1, 2, 3, 4)
+        ]
+        assert [f.result(5).zone for f in futures] == [1, 2, 4, 8]
+
+
+def test_query_after_timeout(threaded_relay):
+    state = State()
+    with SyncClient(port=threaded_relay.port) as client:
+        with pytest.raises(concurrent.futures.TimeoutError):
+            # the relay never responds to this one
+            client.query(
+                threaded_relay.host,
+                PowerOnCommand(state, zone=1),
+                GetNumberOfZonesResponse,
+                timeout=0.3,
+            )
+        res = client.query(
+            threaded_relay.host,
+            GetNumberOfZonesCommand(state),
+            GetNumberOfZonesResponse,
+            timeout=5,
+        )
+        assert res.zones == [1, 2, 3, 4]
+
+
+def test_closed():
+    client = SyncClient()
+    client.close()
+    client.close()
+    with pytest.raises(expected_exception=RuntimeError):
+        client.submit_send("127.0.0.1", PingCommand(State()))
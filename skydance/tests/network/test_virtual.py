@@ -0,0 +1,138 @@
+import asyncio
+
+import pytest
+
+from skydance.network.discovery import DiscoveryProtocol, discover_ips_by_mac
+from skydance.network.emulator import RelayEmulator
+from skydance.network.pool import SessionPool
+from skydance.network.scheduler import Scheduler
+from skydance.network.session import Session
+from skydance.network.virtual import VirtualEventLoop, run_virtual
+from skydance.protocol import (
+    GetNumberOfZonesCommand,
+    GetNumberOfZonesResponse,
+    PowerCommand,
+    State,
+)
+
+
+def test_sleep_advances_virtual_time():
+    async def main():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await asyncio.sleep(3600)
+        return loop.time() - start
+
+    assert run_virtual(main(), start=100.0) == 3600
+
+
+def test_deterministic_order():
+    async def main():
+        order = []
+
+        async def sleeper(name, delay):
+            await asyncio.sleep(delay)
+            order.append((name, asyncio.get_running_loop().time()))
+
+        await asyncio.gather(*(sleeper(i, 10 - i) for i in range(10)))
+        return order
+
+    assert run_virtual(main()) == run_virtual(main())
+    assert run_virtual(main()) == [(9 - i, i + 1) for i in range(10)]
+
+
+def test_timeout():
+    async def main():
+        await asyncio.wait_for(asyncio.Event().wait(), 30)
+
+    with pytest.raises(asyncio.TimeoutError):
+        run_virtual(main())
+
+
+def test_session_request_with_latency():
+    async def main():
+        loop = asyncio.get_running_loop()
+        async with RelayEmulator() as relay:
+            async with Session(relay.host, relay.port) as session:
+                await session.connect()
+                connected = loop.time()
+                response = await session.request(GetNumberOfZonesCommand(State()))
+                return connected, loop.time() - connected, response
+
+    connected, round_trip, response = run_virtual(main(), latency=0.25)
+    assert connected == 0.5
+    assert round_trip == 0.5
+    assert GetNumberOfZonesResponse(response).number == 4
+
+
+def test_connection_refused():
+    async def main():
+        async with Session("127.0.0.1", 8899) as session:
+            await session.connect()
+
+    with pytest.raises(ConnectionRefusedError):
+        run_virtual(main())
+
+
+def test_relay_closes_connection():
+    async def main():
+        relay = RelayEmulator()
+        await relay.start()
+        async with Session(relay.host, relay.port) as session:
+            await session.connect()
+            while not relay.connections:
+                await asyncio.sleep(0)
+            await relay.close()
+            return await session.read()
+
+    assert run_virtual(main()) == b""
+
+
+class _Responder(asyncio.DatagramProtocol):
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.transport.sendto(b"192.168.1.5,98D863A59E5C,HF-LPT130", addr)
+
+
+def test_discovery():
+    async def main():
+        loop = asyncio.get_running_loop()
+        await loop.create_datagram_endpoint(
+            _Responder, local_addr=("192.168.1.5", DiscoveryProtocol.PORT)
+        )
+        result = await discover_ips_by_mac("192.168.1.5", sleep=1)
+        await asyncio.sleep(0.01)  # let the last reply arrive
+        return loop.time(), {
+            mac: {str(ip) for ip in ips} for mac, ips in result.items()
+        }
+
+    elapsed, result = run_virtual(main(), latency=0.001)
+    assert elapsed == pytest.approx(2.01)
+    assert result == {bytes.fromhex("98d863a59e5c"): {"192.168.1.5"}}
+
+
+def test_scheduler_day_of_traffic():
+    async def main():
+        loop = asyncio.get_running_loop()
+        async with RelayEmulator() as relay, SessionPool() as pool:
+            async with Scheduler(pool, clock=loop.time) as scheduler:
+                command = PowerCommand(State(), zone=1, power=True)
+                scheduler.schedule(60, relay.host, command, port=relay.port, every=60)
+                await asyncio.sleep(24 * 3600 + 1)
+            return relay.frames_received
+
+    assert run_virtual(main(), latency=0.01) == 24 * 60
+
+
+def test_address_in_use():
+    loop = VirtualEventLoop()
+    try:
+        loop.run_until_complete(loop.create_server(asyncio.Protocol, "127.0.0.1", 1))
+        with pytest.raises(OSError):
+            loop.run_until_complete(
+                loop.create_server(asyncio.Protocol, "127.0.0.1", 1)
+            )
+    finally:
+        loop.close()
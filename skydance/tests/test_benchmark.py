@@ -0,0 +1,52 @@
+import json
+
+from skydance.benchmark import benchmarks, compare, main, measure, run
+
+
+def _results(**ns_per_op):
+    return {"benchmarks": {name: {"ns_per_op": ns} for name, ns in ns_per_op.items()}}
+
+
+def test_benchmark_names_unique():
+    names = [name for name, _ in benchmarks()]
+    assert len(names) == len(set(names))
+
+
+def test_measure():
+    result = measure(lambda: None, 10, min_time=0.001, repeat=2)
+    assert result["ns_per_op"] > 0
+    assert result["repeat"] == 2
+
+
+def test_run_filter():
+    results = run("parse.", min_time=0.001, repeat=1)
+    assert set(results["benchmarks"]) == {
+        "parse.GetNumberOfZonesResponse",
+        "parse.GetZoneInfoResponse",
+    }
+
+
+def test_run_session():
+    results = run("session.write", min_time=0.001, repeat=1)
+    assert results["benchmarks"]["session.write"]["ns_per_op"] > 0
+
+
+def test_compare():
+    rows = compare(_results(a=100, b=100, c=100), _results(a=105, b=150, d=1))
+    assert rows == [("a", 100, 105, 0.05, False), ("b", 100, 150, 0.5, True)]
+
+
+def test_main_compare(tmp_path):
+    base, head = tmp_path / "base.json", tmp_path / "head.json"
+    base.write_text(json.dumps(_results(a=100)))
+    head.write_text(json.dumps(_results(a=200)))
+    assert main(["compare", str(base), str(head)]) == 1
+    assert main(["compare", str(base), str(base)]) == 0
+
+
+def test_main_profile(tmp_path, capsys):
+    assert main(["profile", "-o", str(tmp_path), "-k", "parse.", "--calls", "1"]) == 0
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "parse.GetNumberOfZonesResponse.prof",
+        "parse.GetZoneInfoResponse.prof",
+    ]
@@ -0,0 +1,221 @@
+"""
+Allocation and CPU budgets of hot paths.
+
+Budgets are deterministic (allocated bytes measured by `tracemalloc` and
+executed bytecode instructions), so they don't depend on machine speed.
+They are set with a reserve of at least 40 % above the values measured on
+CPython 3.9 (used by CI) up to 3.13, whose instruction counts differ by up
+to 30 % - an innocent-looking change doubling allocations or work fails them.
+
+The budgets are skipped when a tracer or coverage measurement is active,
+because it inflates both numbers. `make test` runs with `--cov`, so run
+them by `make test-budget` (as CI does).
+
+Set `SKYDANCE_PROFILE_DIR` to also dump cProfile statistics of each
+scenario to `<scenario>.prof` files for diagnosis (see
+[`profile()`][skydance.benchmark.profile]).
+"""
+
+import asyncio
+import os
+import sys
+import time
+import tracemalloc
+
+import pytest
+
+from skydance.benchmark import profile
+from skydance.network.buffer import Buffer, FrameBuffer
+from skydance.network.emulator import RelayEmulator
+from skydance.network.session import Session
+from skydance.protocol import (
+    TAIL,
+    GetNumberOfZonesCommand,
+    GetNumberOfZonesResponse,
+    GetZoneInfoResponse,
+    RGBWCommand,
+    State,
+    encode_batch,
+    parse_response,
+)
+
+
+PROFILE_DIR = os.environ.get("SKYDANCE_PROFILE_DIR")
+
+
+def _traced() -> bool:
+    if sys.gettrace() is not None:
+        return True
+    # coverage may measure using sys.monitoring instead of a tracer (Python 3.12+)
+    coverage = sys.modules.get("coverage")
+    return coverage is not None and coverage.Coverage.current() is not None
+
+
+untraced = pytest.mark.skipif(
+    _traced(), reason="Budgets are measured without a tracer or coverage."
+)
+
+NUMBER_OF_ZONES_RESPONSE = bytes.fromhex(
+    "55aa5aa57e00800080e18026510100f910008182838485868788898a8b8c8d8e8f90007e"
+)
+ZONE_INFO_RESPONSE = bytes.fromhex(
+    "55aa5aa57e00800080e18026514000f8100051005a6f6e65205247422b4343540000007e"
+)
+
+
+def peak_allocation(operation, *, warmup: int = 3) -> int:
+    """Return peak of bytes allocated (and not freed before) during one call."""
+    for _ in range(warmup):
+        operation()
+    tracemalloc.start()
+    try:
+        result = None
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        result = operation()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return peak - before
+
+
+def instructions(operation) -> int:
+    """Return number of bytecode instructions executed during one call."""
+    count = 0
+
+    def tracer(frame, event, arg):
+        nonlocal count
+        frame.f_trace_opcodes = True
+        if event == "opcode":
+            count += 1
+        return tracer
+
+    previous = sys.gettrace()
+    # Python 3.12 counts nothing the first time a tracer is installed
+    # in the process, so the first round is only a warm-up
+    for _ in range(2):
+        count = 0
+        sys.settrace(tracer)
+        try:
+            operation()
+        finally:
+            sys.settrace(previous)
+    return count
+
+
+def rgbw_raw():
+    command = RGBWCommand(State(), zone=2, red=255, green=128, blue=64, white=1)
+    return lambda: command.raw
+
+
+def rgbw_pack_into():
+    command = RGBWCommand(State(), zone=2, red=255, green=128, blue=64, white=1)
+    buffer = bytearray(command.size)
+    return lambda: command.pack_into(buffer)
+
+
+def rgbw_encode_batch():
+    state = State()
+    commands = [
+        RGBWCommand(state, zone=zone % 16 + 1, red=zone, green=1, blue=2, white=3)
+        for zone in range(64)
+    ]
+    return lambda: encode_batch(commands, state)
+
+
+def parse_zone_info():
+    return lambda: parse_response(ZONE_INFO_RESPONSE)
+
+
+def parse_number_of_zones():
+    return lambda: GetNumberOfZonesResponse(NUMBER_OF_ZONES_RESPONSE).zones
+
+
+def zone_info_name():
+    return lambda: GetZoneInfoResponse(ZONE_INFO_RESPONSE).name
+
+
+def _framing(create_buffer, messages: int = 16, chunk_size: int = 16):
+    stream = NUMBER_OF_ZONES_RESPONSE * messages
+    chunks = [stream[i : i + chunk_size] for i in range(0, len(stream), chunk_size)]
+    buffer = create_buffer()
+
+    def run():
+        for chunk in chunks:
+            buffer.feed(chunk)
+            while buffer.is_message_ready:
+                buffer.get_message()
+
+    return run
+
+
+def buffer_framing():
+    return _framing(lambda: Buffer(TAIL))
+
+
+def frame_buffer_framing():
+    return _framing(FrameBuffer)
+
+
+# scenario: (peak allocated bytes, bytecode instructions) per call
+BUDGETS = {
+    rgbw_raw: (250, 100),
+    rgbw_pack_into: (350, 100),
+    rgbw_encode_batch: (4000, 7000),
+    parse_zone_info: (800, 350),
+    parse_number_of_zones: (1000, 800),
+    zone_info_name: (800, 300),
+    buffer_framing: (700, 28000),
+    frame_buffer_framing: (400, 9500),
+}
+
+
+def dump_profile(name: str, operation, *, calls: int = 1):
+    if PROFILE_DIR:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        profile(operation, os.path.join(PROFILE_DIR, f"{name}.prof"), calls=calls)
+
+
+@untraced
+@pytest.mark.parametrize("scenario", BUDGETS, ids=lambda scenario: scenario.__name__)
+def test_budget(scenario):
+    operation = scenario()
+    allocated, executed = peak_allocation(operation), instructions(operation)
+    allocation_budget, instruction_budget = BUDGETS[scenario]
+    assert allocated <= allocation_budget, f"{allocated} bytes allocated"
+    assert executed > 0, "no instructions counted"
+    assert executed <= instruction_budget, f"{executed} instructions executed"
+    dump_profile(scenario.__name__, operation, calls=1000)
+
+
+async def session_roundtrips(roundtrips: int):
+    """Return bytes retained and seconds spent per emulator round trip."""
+    command = GetNumberOfZonesCommand(State())
+    async with RelayEmulator() as relay:
+        async with Session(relay.host, relay.port) as session:
+
+            async def run():
+                for _ in range(roundtrips):
+                    await session.request(command)
+
+            await run()  # warm up
+            tracemalloc.start()
+            try:
+                before, _ = tracemalloc.get_traced_memory()
+                start = time.perf_counter()
+                await run()
+                elapsed = time.perf_counter() - start
+                after, _ = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+    return (after - before) / roundtrips, elapsed / roundtrips
+
+
+@untraced
+def test_budget_session_roundtrip():
+    retained, elapsed = asyncio.run(session_roundtrips(200))
+    assert retained < 100, f"{retained} bytes retained per round trip"
+    # wall clock is not deterministic, so the budget is very generous
+    assert elapsed < 0.01, f"{elapsed * 1e3} ms per round trip"
+    dump_profile("session_roundtrip", lambda: asyncio.run(session_roundtrips(200)))
@@ -0,0 +1,114 @@
+import io
+import ipaddress
+import json
+import time
+
+import pytest
+
+from skydance.cli import Executor, expand_spec, main, parse_zones
+from skydance.network.emulator import RelayEmulator
+from skydance.network.pool import SessionPool
+
+
+def _results(capsys):
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+@pytest.mark.parametrize(
+    "value, zones",
+    [("1", [1]), ("1-4", [1, 2, 3, 4]), ("1-2,7", [1, 2, 7])],
+)
+def test_parse_zones(value, zones):
+    assert parse_zones(value) == zones
+
+
+def test_parse_zones_invalid():
+    with pytest.raises(expected_exception=ValueError):
+        parse_zones("a-b")
+
+
+def test_expand_spec():
+    assert list(expand_spec({"zone": [1, 2]})) == [{"zone": 1}, {"zone": 2}]
+    assert list(expand_spec({"zone": 1})) == [{"zone": 1}]
+
+
+def test_power(threaded_relay, capsys):
+    port = str(threaded_relay.port)
+    assert (
+        main(["power", "on", threaded_relay.host, "--zone", "1-4", "--port", port]) == 0
+    )
+    results = _results(capsys)
+    assert [res["zone"] for res in results] == [1, 2, 3, 4]
+    assert all(res["ok"] for res in results)
+    # the relay runs in another thread, it may not have read the frames yet
+    for _ in range(100):
+        if threaded_relay.frames_received == 4:
+            break
+        time.sleep(0.01)
+    assert threaded_relay.frames_received == 4
+
+
+def test_invalid_value(threaded_relay, capsys):
+    port = str(threaded_relay.port)
+    assert (
+        main(
+            [
+                "rgbw",
+                threaded_relay.host,
+                "--zone",
+                "1",
+                "--color",
+                "0,0,0,0",
+                "--port",
+                port,
+            ]
+        )
+        == 1
+    )
+    [res] = _results(capsys)
+    assert not res["ok"]
+    assert res["error"].startswith("ValueError")
+
+
+def test_zones(threaded_relay, capsys):
+    assert main(["zones", threaded_relay.host, "--port", str(threaded_relay.port)]) == 0
+    [res] = _results(capsys)
+    assert [zone["type"] for zone in res["zones"]] == [
+        "Dimmer",
+        "CCT",
+        "RGBW",
+        "RGBCCT",
+    ]
+
+
+def test_batch(threaded_relay, capsys, monkeypatch):
+    host = threaded_relay.host
+    lines = [
+        {"host": host, "command": "brightness", "zone": 1, "brightness": 10},
+        {"host": host, "command": "get_zone_info", "zone": 3},
+        {"host": host, "command": "unknown"},
+        {"host": "98:d8:63:a5:9e:5c", "command": "ping"},
+    ]
+    stdin = "\n".join(map(json.dumps, lines)) + "\n\nnot json\n"
+    monkeypatch.setattr("sys.stdin", io.StringIO(stdin))
+    assert main(["batch", "--port", str(threaded_relay.port)]) == 1
+    results = {res["id"]: res for res in _results(capsys)}
+    assert results["line 1"]["ok"]
+    assert results["line 2"]["result"] == {"type": "RGBW", "name": "Zone RGBW"}
+    assert not results["line 3"]["ok"]
+    assert "not discovered" in results["line 4"]["error"]
+    assert "Invalid JSON" in results["line 6"]["error"]
+
+
+async def test_executor_resolves_mac():
+    mac = bytes.fromhex("98d863a59e5c")
+    ips = {ipaddress.IPv4Address("127.0.0.1"), ipaddress.IPv4Address("127.0.0.2")}
+    out = io.StringIO()
+    async with RelayEmulator() as relay:
+        async with SessionPool(port=relay.port) as pool:
+            executor = Executor(pool, out, macs={mac: ips})
+            await executor.submit({"host": "98-D8-63-A5-9E-5C", "command": "ping"})
+            await executor.join()
+            [session] = pool
+            assert session.address == "127.0.0.1"
+    assert json.loads(out.getvalue())["ok"]
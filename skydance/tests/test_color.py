@@ -0,0 +1,138 @@
+import pytest
+
+from skydance.color import *
+from skydance.protocol import RGBWCommand, State
+
+
+def test_gamma_lut():
+    assert len(GAMMA_LUT) == 256
+    assert GAMMA_LUT[0] == 0
+    assert min(GAMMA_LUT[1:]) == 1
+    assert GAMMA_LUT[255] == 255
+    assert GAMMA_LUT[128] < 128
+
+
+def test_brightness_lut():
+    assert len(BRIGHTNESS_LUT) == 256
+    assert BRIGHTNESS_LUT[0] == 1
+    assert BRIGHTNESS_LUT[255] == 255
+    assert list(BRIGHTNESS_LUT) == sorted(BRIGHTNESS_LUT)
+
+
+@pytest.mark.parametrize(
+    "hsv, rgbw",
+    [
+        ((0, 1, 1), (255, 0, 0, 0)),
+        ((120, 1, 1), (0, 255, 0, 0)),
+        ((240, 1, 1), (0, 0, 255, 0)),
+        ((360, 1, 1), (255, 0, 0, 0)),
+        ((-1e-15, 1, 1), (255, 0, 0, 0)),
+        ((0, 0, 1), (0, 0, 0, 255)),
+        ((0, 0, 0), (0, 0, 0, 0)),
+        ((0, 0, 0.05), (0, 0, 0, 1)),
+        ((200, 1, 0.05), (0, 1, 1, 0)),
+        ((60, 0.5, 1), (GAMMA_LUT[128], GAMMA_LUT[128], 0, GAMMA_LUT[128])),
+    ],
+)
+def test_hsv_to_rgbw(hsv, rgbw):
+    assert hsv_to_rgbw(*hsv) == rgbw
+
+
+@pytest.mark.parametrize(
+    "level, expected", [(-1, 1), (0, 1), (1, 255), (2, 255), (0.5, BRIGHTNESS_LUT[128])]
+)
+def test_perceptual_brightness(level, expected):
+    assert perceptual_brightness(level) == expected
+
+
+@pytest.mark.parametrize(
+    "kelvin, expected", [(2000, 0), (2700, 0), (6500, 255), (10000, 255)]
+)
+def test_kelvin_to_temperature(kelvin, expected):
+    assert kelvin_to_temperature(kelvin) == expected
+
+
+@pytest.mark.parametrize("kelvin", [0, -2700])
+def test_kelvin_to_temperature_invalid(kelvin):
+    with pytest.raises(expected_exception=ValueError):
+        kelvin_to_temperature(kelvin)
+
+
+def test_kelvin_to_temperature_array_invalid():
+    np = pytest.importorskip("numpy")
+    with pytest.raises(expected_exception=ValueError):
+        kelvin_to_temperature_array(np.array([2700, 0]))
+
+
+def test_kelvin_to_temperature_mired():
+    # 4000 K is closer to the cold end in mireds
+    assert kelvin_to_temperature(4000) > 255 * (4000 - 2700) / (6500 - 2700)
+
+
+def test_hsv_to_rgbw_array():
+    np = pytest.importorskip("numpy")
+    hues = [*range(0, 360, 7), -1e-15]
+    hsv = [(h, s, v) for h in hues for s in (0, 0.3, 1) for v in (0.2, 1)]
+    res = hsv_to_rgbw_array(np.array(hsv))
+    assert res.dtype == np.uint8
+    assert [tuple(row) for row in res.tolist()] == [hsv_to_rgbw(*c) for c in hsv]
+
+
+def test_scalar_and_array_agree():
+    np = pytest.importorskip("numpy")
+    levels = np.linspace(0, 1, 101)
+    assert perceptual_brightness_array(levels).tolist() == [
+        perceptual_brightness(level) for level in levels
+    ]
+    kelvins = np.linspace(2000, 7000, 51)
+    assert kelvin_to_temperature_array(kelvins).tolist() == [
+        kelvin_to_temperature(kelvin) for kelvin in kelvins
+    ]
+
+
+def test_encode_rgbw_frames():
+    np = pytest.importorskip("numpy")
+    zones = np.array([1, 2, 16])
+    rgbw = np.array([[255, 0, 0, 0], [1, 2, 3, 4], [0, 0, 0, 255]])
+    state = State()
+    state.allocate_frame_numbers(255)
+
+    expected_state = State()
+    expected_state.allocate_frame_numbers(255)
+    expected = bytes().join(
+        RGBWCommand(State(), zone=int(zone), red=r, green=g, blue=b, white=w).encode(
+            expected_state.allocate_frame_number()
+        )
+        for zone, (r, g, b, w) in zip(zones, rgbw.tolist())
+    )
+    assert encode_rgbw_frames(zones, rgbw, state) == expected
+    assert state.frame_number == expected_state.frame_number
+
+
+def test_encode_rgbw_frames_dim():
+    np = pytest.importorskip("numpy")
+    rgbw = hsv_to_rgbw_array(np.array([(0, 1, 1), (0, 0, 0.05), (200, 1, 0.05)]))
+    frames = encode_rgbw_frames(np.array([1, 2, 3]), rgbw, State())
+    assert len(frames) == 3 * len(_RGBW_FRAME)
+
+
+_RGBW_FRAME = RGBWCommand(State(), zone=1, red=1, green=0, blue=0, white=0).raw
+
+
+@pytest.mark.parametrize(
+    "zones, rgbw",
+    [
+        ([0], [[1, 0, 0, 0]]),
+        ([17], [[1, 0, 0, 0]]),
+        ([1], [[0, 0, 0, 0]]),
+        ([1], [[256, 0, 0, 0]]),
+        ([1, 2], [[1, 0, 0, 0]]),
+        ([1], [[0.5, 0, 0, 1]]),
+        ([1.5], [[1, 0, 0, 0]]),
+        ([1], [[float("nan"), 0, 0, 1]]),
+    ],
+)
+def test_encode_rgbw_frames_invalid(zones, rgbw):
+    np = pytest.importorskip("numpy")
+    with pytest.raises(expected_exception=ValueError):
+        encode_rgbw_frames(np.array(zones), np.array(rgbw), State())
@@ -0,0 +1,65 @@
+from skydance.connection import Connection
+from skydance.protocol import *
+
+
+NUMBER_OF_ZONES = bytes.fromhex(
+    "55aa5aa57e00800080e18026510100f910008182838485868788898a8b8c8d8e8f90007e"
+)
+ZONE_INFO = bytes.fromhex(
+    "55aa5aa57e00800080e18026514000f8100051005a6f6e65205247422b4343540000007e"
+)
+UNKNOWN = bytes.fromhex("55aa5aa57e00800080e18026510100aa0100ff007e")
+
+
+def test_send_advances_frame_number():
+    conn = Connection()
+    first = conn.send(PingCommand(State()))
+    second = conn.send(PingCommand(State()))
+    assert first[len(HEAD)] == 0
+    assert second[len(HEAD)] == 1
+
+
+def test_receive_data_typed_events():
+    conn = Connection()
+    events = conn.receive_data(NUMBER_OF_ZONES + ZONE_INFO[:10])
+    assert len(events) == 1
+    assert isinstance(events[0], GetNumberOfZonesResponse)
+    assert events[0].number == 16
+
+    [event] = conn.receive_data(ZONE_INFO[10:])
+    assert isinstance(event, GetZoneInfoResponse)
+    assert event.name == "Zone RGB+CCT"
+
+
+def test_receive_data_unknown():
+    conn = Connection()
+    [event] = conn.receive_data(UNKNOWN)
+    assert isinstance(event, UnknownResponse)
+    assert event.cmd_type == 0x2A
+    assert event.cmd_data == bytes([0xFF])
+
+
+def test_receive_data_garbage():
+    conn = Connection()
+    # TAIL inside garbage does not make a frame
+    assert conn.receive_data(bytes([1, 2, 0, 0x7E])) == []
+    [event] = conn.receive_data(bytes([0, 0x7E]) + NUMBER_OF_ZONES)
+    assert isinstance(event, GetNumberOfZonesResponse)
+    assert conn.discarded_bytes == 6
+
+
+def test_receive_data_tail_in_payload():
+    # a zone name ending with 00 7e
+    frame = ZONE_INFO[:-6] + bytes([0, 0x7E]) + ZONE_INFO[-4:]
+    conn = Connection()
+    [event] = conn.receive_data(frame)
+    assert isinstance(event, GetZoneInfoResponse)
+    assert event.cmd_data.endswith(bytes([0, 0x7E, 0, 0]))
+
+
+def test_reset():
+    conn = Connection()
+    conn.receive_data(bytes([1, 2, 3]))
+    conn.reset()
+    [event] = conn.receive_data(NUMBER_OF_ZONES)
+    assert isinstance(event, GetNumberOfZonesResponse)
@@ -0,0 +1,85 @@
+import pytest
+
+from skydance.enum import ZoneType
+from skydance.fleet import FleetRegistry
+from skydance.network.emulator import RelayEmulator
+from skydance.network.session import Session
+from skydance.protocol import GetNumberOfZonesResponse, GetZoneInfoResponse
+
+
+MAC_A = bytes.fromhex("aabbccddeeff")
+MAC_B = bytes.fromhex("112233445566")
+
+NUMBER_OF_ZONES = bytes.fromhex(
+    "55aa5aa57e00800080e18026510100f9100081828300000000000000000000000000007e"
+)
+ZONE_INFO = bytes.fromhex(
+    "55aa5aa57e00800080e18026514000f8100051005a6f6e65205247422b4343540000007e"
+)
+
+
+@pytest.fixture
+def fleet():
+    fleet = FleetRegistry()
+    fleet.add_relay(MAC_A, "192.168.1.5")
+    fleet.add_zone(MAC_A, 1, ZoneType.Dimmer, "Kitchen")
+    fleet.add_zone(MAC_A, 2, ZoneType.RGBW, "Hall")
+    fleet.add_zone(MAC_B, 1, ZoneType.Dimmer, "Kitchen")
+    return fleet
+
+
+def test_lookups(fleet):
+    assert len(fleet) == 3
+    assert (MAC_A, 2) in fleet
+    assert fleet.get(MAC_A, 2).name == "Hall"
+    assert fleet.get(MAC_A, 2).relay.host == "192.168.1.5"
+    assert {z.key for z in fleet.by_name("Kitchen")} == {(MAC_A, 1), (MAC_B, 1)}
+    assert [z.key for z in fleet.by_type(ZoneType.RGBW)] == [(MAC_A, 2)]
+    assert fleet.by_name("Garage") == []
+    assert fleet.get(MAC_A, 1).relay is fleet.get(MAC_A, 2).relay
+    with pytest.raises(KeyError):
+        fleet.get(MAC_B, 2)
+
+
+def test_replace_zone_updates_indexes(fleet):
+    fleet.add_zone(MAC_A, 1, ZoneType.CCT, "Bedroom")
+    assert [z.key for z in fleet.by_name("Kitchen")] == [(MAC_B, 1)]
+    assert [z.key for z in fleet.by_name("Bedroom")] == [(MAC_A, 1)]
+    assert [z.key for z in fleet.by_type(ZoneType.Dimmer)] == [(MAC_B, 1)]
+    assert len(fleet) == 3
+
+
+def test_remove_relay(fleet):
+    fleet.remove_relay(MAC_A)
+    assert len(fleet) == 1
+    assert fleet.by_type(ZoneType.RGBW) == []
+    assert [r.mac for r in fleet.relays] == [MAC_B]
+    with pytest.raises(KeyError):
+        fleet.remove_relay(MAC_A)
+
+
+def test_update_from_responses(fleet):
+    fleet.add_zone(MAC_A, 5, ZoneType.RGB, "Gone")
+    fleet.update_zones(MAC_A, GetNumberOfZonesResponse(NUMBER_OF_ZONES))
+    assert [z.zone for z in fleet.zones_of(MAC_A)] == [1, 2]
+
+    zone = fleet.update_zone(MAC_A, 3, GetZoneInfoResponse(ZONE_INFO))
+    assert zone.type == ZoneType.RGBCCT
+    assert zone.name == "Zone RGB+CCT"
+    assert not hasattr(zone, "__dict__")
+    assert fleet.by_name("Zone RGB+CCT") == [zone]
+
+
+async def test_load():
+    fleet = FleetRegistry()
+    async with RelayEmulator() as emulator:
+        async with Session(emulator.host, emulator.port) as session:
+            zones = await fleet.load(session, MAC_A, host=emulator.host)
+    assert [(z.zone, z.type) for z in zones] == [
+        (1, ZoneType.Dimmer),
+        (2, ZoneType.CCT),
+        (3, ZoneType.RGBW),
+        (4, ZoneType.RGBCCT),
+    ]
+    assert fleet.relay(MAC_A).host == emulator.host
+    assert fleet.by_name("Zone CCT")[0].zone == 2
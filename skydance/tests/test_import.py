@@ -0,0 +1,59 @@
+import subprocess
+import sys
+
+import pytest
+
+import skydance
+
+
+# The import time is compared to that of `json` (a few modules of a similar
+# size) measured the same way, so it does not depend on machine speed.
+# Heavy dependencies (e.g. `pkg_resources`) take 10+ times longer than `json`.
+IMPORT_BUDGET_RATIO = 3
+
+
+def _python(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args], capture_output=True, text=True, check=True
+    )
+
+
+def _cumulative_import_time_us(module: str) -> int:
+    stderr = _python("-X", "importtime", "-c", f"import {module}").stderr
+    for line in stderr.splitlines():
+        # format: "import time: self [us] | cumulative | imported package"
+        _self, cumulative, name = line.split("|")
+        if name.strip() == module:
+            return int(cumulative)
+    raise AssertionError(f"Module {module} not found in -X importtime output.")
+
+
+def test_protocol_import_time_budget():
+    protocol, reference = [], []
+    for _ in range(3):
+        protocol.append(_cumulative_import_time_us("skydance.protocol"))
+        reference.append(_cumulative_import_time_us("json"))
+    assert min(protocol) < IMPORT_BUDGET_RATIO * min(reference)
+
+
+@pytest.mark.parametrize(
+    "module", ["skydance", "skydance.protocol", "skydance.network"]
+)
+def test_no_heavy_imports(module):
+    code = f"import sys, {module}; print(*sys.modules, sep='\\n')"
+    modules = set(_python("-c", code).stdout.split())
+    assert not modules & {"asyncio", "pkg_resources", "importlib.metadata"}
+
+
+def test_version():
+    assert isinstance(skydance.__version__, str)
+
+
+def test_network_lazy_attributes():
+    import skydance.network
+    from skydance.network.session import Session
+
+    assert skydance.network.Session is Session
+    assert "Session" in dir(skydance.network)
+    with pytest.raises(expected_exception=AttributeError):
+        skydance.network.Foo
@@ -0,0 +1,97 @@
+import json
+
+import pytest
+
+from skydance.loadgen import (
+    CLOSED_LOOP,
+    OPEN_LOOP,
+    generate_emulated_load,
+    generate_load,
+    main,
+    percentile,
+)
+from skydance.metrics import InMemoryMetrics
+from skydance.network.emulator import RelayEmulator
+from skydance.network.session import Session
+
+
+def test_percentile():
+    values = [float(i) for i in range(1, 101)]
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile(values, 100) == 100
+    assert percentile(values, 0) == 1
+    assert percentile([], 50) == 0
+
+
+@pytest.mark.parametrize("model", [OPEN_LOOP, CLOSED_LOOP])
+async def test_generate_emulated_load(model):
+    report = await generate_emulated_load(
+        3, rate=200, duration=0.25, model=model, concurrency=4, seed=1
+    )
+    assert report.model == model
+    assert report.relays == 3
+    assert report.completed == 50
+    assert report.errors == 0
+    assert sum(report.completed_by_operation.values()) == 50
+    assert report.connects == 3
+    assert report.reconnects == 0
+    assert 0 < report.latency_p50 <= report.latency_p99 <= report.latency_max
+    assert report.throughput > 0
+
+
+async def test_generate_emulated_load_mix():
+    report = await generate_emulated_load(
+        1, rate=100, duration=0.1, mix={"zone_info": 1, "power": 0}
+    )
+    assert report.completed_by_operation == {"zone_info": 10}
+
+
+async def test_generate_load_unexpected_response():
+    # zone info of zone 4 returned for any query
+    stale = RelayEmulator._response(bytes([0]), 1 << 3, 0x78, b"\x03\x00Zone RGBW")
+
+    async def request(command):
+        return stale
+
+    metrics = InMemoryMetrics()
+    async with RelayEmulator() as relay:
+        async with Session(relay.host, relay.port, metrics=metrics) as session:
+            session.request = request  # type: ignore
+            report = await generate_load(
+                [session],
+                metrics,
+                rate=100,
+                duration=0.05,
+                mix={"zone_info": 1},
+                zones=[1],
+            )
+    assert report.completed == 0
+    assert report.errors == 5
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"mix": {"dance": 1}},
+        {"mix": {"power": 0}},
+        {"rate": 0},
+        {"model": "half-open"},
+    ],
+)
+async def test_generate_emulated_load_invalid(kwargs):
+    with pytest.raises(ValueError):
+        await generate_emulated_load(1, **kwargs)
+
+
+def test_main(capsys):
+    argv = ["--emulate", "2", "--rate", "100", "--duration", "0.1", "--json"]
+    assert main(argv + ["--mix", "power=1,rgbw=1"]) == 0
+    report = json.loads(capsys.readouterr().out)
+    assert report["completed"] == 10
+    assert set(report["completed_by_operation"]) == {"power", "rgbw"}
+
+
+def test_main_requires_relays():
+    with pytest.raises(SystemExit):
+        main(["--rate", "100"])
@@ -0,0 +1,64 @@
+import math
+
+from skydance.metrics import *
+
+
+def test_relay_labels():
+    assert relay_labels(host="1.2.3.4") == (("relay", "1.2.3.4"),)
+    assert relay_labels(host="1.2.3.4", mac=bytes([1, 2, 3, 4, 5, 6])) == (
+        ("relay", "01:02:03:04:05:06"),
+    )
+    assert relay_labels() == ()
+
+
+def test_noop():
+    NOOP_METRICS.counter("foo")
+    NOOP_METRICS.gauge("foo", 1)
+    NOOP_METRICS.histogram("foo", 1)
+
+
+def test_histogram():
+    histogram = Histogram([1, 2])
+    for value in (0.5, 1, 1.5, 3):
+        histogram.observe(value)
+    assert histogram.cumulative_counts() == [(1, 2), (2, 3), (math.inf, 4)]
+    assert histogram.sum == 6
+    assert histogram.count == 4
+
+
+def test_in_memory():
+    metrics = InMemoryMetrics()
+    labels = relay_labels(host="a")
+    metrics.counter("frames_total", 1, labels)
+    metrics.counter("frames_total", 2, labels)
+    metrics.gauge("size", 5)
+    metrics.gauge("size", 3)
+    metrics.histogram("latency", 0.2)
+    assert metrics.counters["frames_total", labels] == 3
+    assert metrics.gauges["size", ()] == 3
+    assert metrics.histograms["latency", ()].count == 1
+    metrics.reset()
+    assert not metrics.counters
+
+
+def test_to_prometheus():
+    metrics = InMemoryMetrics(buckets=[0.1, 1])
+    metrics.counter("frames_total", 3, (("relay", 'a"b'),))
+    metrics.gauge("size", 1.5)
+    metrics.histogram("latency_seconds", 0.5, (("relay", "a"),))
+    assert to_prometheus(metrics) == (
+        "# TYPE skydance_frames_total counter\n"
+        'skydance_frames_total{relay="a\\"b"} 3\n'
+        "# TYPE skydance_size gauge\n"
+        "skydance_size 1.5\n"
+        "# TYPE skydance_latency_seconds histogram\n"
+        'skydance_latency_seconds_bucket{relay="a",le="0.1"} 0\n'
+        'skydance_latency_seconds_bucket{relay="a",le="1"} 1\n'
+        'skydance_latency_seconds_bucket{relay="a",le="+Inf"} 1\n'
+        'skydance_latency_seconds_sum{relay="a"} 0.5\n'
+        'skydance_latency_seconds_count{relay="a"} 1\n'
+    )
+
+
+def test_to_prometheus_empty():
+    assert to_prometheus(InMemoryMetrics()) == ""
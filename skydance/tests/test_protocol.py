@@ -1,5 +1,8 @@
+import struct
+
 import pytest
 
+import skydance.protocol as protocol_module
 from skydance.protocol import *
 
 
@@ -244,3 +247,109 @@ zone_info_params = {
 def test_get_zone_info_response_types(raw, expected_type):
     zone_info = GetZoneInfoResponse(raw)
     assert zone_info.type == expected_type
+
+
+def test_state_allocate_frame_number():
+    s = State()
+    assert s.allocate_frame_number() == bytes([0])
+    assert s.allocate_frame_number() == bytes([1])
+    assert s.frame_number == bytes([2])
+    s.reset()
+    assert s.frame_number == bytes([0])
+
+
+def test_command_encode(state):
+    assert PingCommand(state).encode(bytes([7])) == bytes.fromhex(
+        "55aa5aa57e07800080e18000000100790000007e"
+    )
+
+
+@pytest.mark.parametrize(
+    "raw, expected_cls",
+    [
+        (bytes.fromhex(next(iter(number_of_zones_params))), GetNumberOfZonesResponse),
+        (bytes.fromhex(next(iter(zone_info_params))), GetZoneInfoResponse),
+        (bytes.fromhex("55aa5aa57e00800080e18026510100aa0000007e"), UnknownResponse),
+    ],
+)
+def test_parse_response(raw, expected_cls):
+    assert type(parse_response(raw)) is expected_cls
+
+
+@pytest.mark.parametrize(
+    "raw", [bytes(), bytes.fromhex("55aa5aa57e00800080e18026510100aa007e")]
+)
+def test_parse_response_malformed(raw):
+    with pytest.raises(expected_exception=ValueError):
+        parse_response(raw)
+
+
+def test_register_response_data_length():
+    @register_response(0x2A, data_length=1)
+    class Specific(Response):
+        pass
+
+    try:
+        raw = bytes.fromhex("55aa5aa57e00800080e18026510100aa0100ff007e")
+        assert type(parse_response(raw)) is Specific
+        raw = bytes.fromhex("55aa5aa57e00800080e18026510100aa0000007e")
+        assert type(parse_response(raw)) is UnknownResponse
+    finally:
+        del protocol_module._RESPONSE_TYPES[0x2A, 1]
+
+
+def test_state_allocate_frame_numbers():
+    s = State()
+    s.increment_frame_number()
+    assert s.allocate_frame_numbers(256) == 1
+    assert s.frame_number == bytes([1])
+
+
+def _all_commands(state):
+    return [
+        PingCommand(state),
+        PowerOnCommand(state, zone=16),
+        MasterPowerOffCommand(state),
+        BrightnessCommand(state, zone=2, brightness=3),
+        TemperatureCommand(state, zone=3, temperature=4),
+        RGBWCommand(state, zone=4, red=1, green=2, blue=3, white=4),
+        GetNumberOfZonesCommand(state),
+        GetZoneInfoCommand(state, zone=5),
+    ]
+
+
+class CustomCommand(Command):
+    body = bytes.fromhex("80 00 80 e1 80 00 00 01 00 42 01 00 ff")
+
+
+class CustomLayoutCommand(Command):
+    # the default `_fields()` unpacks the body
+    _BODY = struct.Struct("<13s")
+    body = CustomCommand.body
+
+
+def test_pack_into(state):
+    state.increment_frame_number()
+    custom = [CustomCommand(state), CustomLayoutCommand(state)]
+    for command in _all_commands(state) + custom:
+        buffer = bytearray(64)
+        assert command.pack_into(buffer, 3) == command.size == len(command.raw)
+        assert buffer[3 : 3 + command.size] == command.raw
+        assert command.pack_into(buffer, frame_number=7) == command.size
+        assert buffer[: command.size] == command.encode(bytes([7]))
+    assert state.frame_number == bytes([1])
+
+
+def test_encode_batch(state):
+    commands = _all_commands(State()) + [
+        CustomCommand(State()),
+        CustomLayoutCommand(State()),
+    ]
+    state.allocate_frame_numbers(250)
+    res = encode_batch(commands, state)
+    assert isinstance(res, bytearray)
+    assert bytes(res) == b"".join(
+        command.encode(bytes([(250 + i) % 256])) for i, command in enumerate(commands)
+    )
+    assert state.frame_number == bytes([(250 + len(commands)) % 256])
+    assert encode_batch([], state) == bytearray()
@@ -0,0 +1,132 @@
+import multiprocessing
+
+import pytest
+
+from skydance.enum import ZoneType
+from skydance.protocol import (
+    BrightnessCommand,
+    GetZoneInfoCommand,
+    MasterPowerCommand,
+    PowerCommand,
+    RGBWCommand,
+    State,
+    TemperatureCommand,
+)
+from skydance.zonestate import _SEQUENCE, ZoneState, ZoneStateTable
+
+
+MAC = bytes.fromhex("aabbccddeeff")
+OTHER_MAC = bytes.fromhex("001122334455")
+
+
+@pytest.fixture(name="table")
+def table_fixture():
+    with ZoneStateTable.create(capacity=8) as table:
+        yield table
+
+
+def test_update_and_get(table):
+    assert table.get(MAC, 1) is None
+    table.update(MAC, 1, type=ZoneType.RGBW, power=True)
+    table.update(MAC, 1, brightness=128, rgbw=(1, 2, 3, 4))
+    state = table.get(MAC, 1)
+    assert state == ZoneState(
+        mac=MAC,
+        zone=1,
+        type=ZoneType.RGBW,
+        power=True,
+        brightness=128,
+        temperature=None,
+        rgbw=(1, 2, 3, 4),
+        updated=state.updated,
+    )
+    assert table.get(MAC, 2) is None
+    assert table.get(OTHER_MAC, 1) is None
+
+
+def test_apply(table):
+    state = State()
+    table.apply(MAC, PowerCommand(state, zone=1, power=True))
+    table.apply(MAC, BrightnessCommand(state, zone=2, brightness=10))
+    table.apply(MAC, TemperatureCommand(state, zone=2, temperature=20))
+    table.apply(MAC, RGBWCommand(state, zone=3, red=1, green=2, blue=3, white=4))
+    table.apply(OTHER_MAC, PowerCommand(state, zone=1, power=True))
+    table.apply(MAC, GetZoneInfoCommand(state, zone=4))
+    table.apply(MAC, MasterPowerCommand(state, power=False))
+
+    states = {(s.mac, s.zone): s for s in table}
+    assert set(states) == {(MAC, 1), (MAC, 2), (MAC, 3), (OTHER_MAC, 1)}
+    assert [states[MAC, zone].power for zone in (1, 2, 3)] == [False] * 3
+    assert states[OTHER_MAC, 1].power is True
+    assert states[MAC, 2].temperature == 20
+    assert states[MAC, 3].rgbw == (1, 2, 3, 4)
+
+
+def test_full(table):
+    for zone in range(1, 9):
+        table.update(MAC, zone, power=True)
+    with pytest.raises(ValueError):
+        table.update(MAC, 9, power=True)
+    assert len(list(table)) == 8
+
+
+def test_invalid(table):
+    with pytest.raises(ValueError):
+        table.update(MAC, 1, brightness=256)
+    with pytest.raises(ValueError):
+        table.update(MAC[:3], 1, brightness=1)
+    with pytest.raises(ValueError):
+        ZoneStateTable.create(capacity=0)
+
+
+def test_torn_read_retried(table, monkeypatch):
+    table.update(MAC, 1, power=True)
+    index = [i for i in range(table.capacity) if table._read_slot(i)[3]][0]
+    offset = table._offset(index)
+    sequence = _SEQUENCE.unpack_from(table._buffer, offset)[0]
+    _SEQUENCE.pack_into(table._buffer, offset, sequence + 1)  # a write in progress
+    monkeypatch.setattr("skydance.zonestate._READ_RETRIES", 3)
+    with pytest.raises(RuntimeError):
+        table.get(MAC, 1)
+    _SEQUENCE.pack_into(table._buffer, offset, sequence)
+    assert table.get(MAC, 1).power is True
+
+
+def test_sequence_wraps(table):
+    table.update(MAC, 1, power=True)
+    index = [i for i in range(table.capacity) if table._read_slot(i)[3]][0]
+    offset = table._offset(index)
+    _SEQUENCE.pack_into(table._buffer, offset, 0xFFFFFFFE)
+    table.update(MAC, 1, brightness=10)
+    assert _SEQUENCE.unpack_from(table._buffer, offset)[0] == 0
+    assert table.get(MAC, 1).brightness == 10
+
+
+def test_attach(table):
+    table.update(MAC, 1, power=True)
+    with ZoneStateTable.attach(table.name) as reader:
+        assert reader.capacity == 8
+        assert reader.get(MAC, 1).power is True
+        table.update(MAC, 1, power=False)
+        assert reader.get(MAC, 1).power is False
+    # the reader does not remove the table
+    assert table.get(MAC, 1).power is False
+
+
+def _read_power(name, zone):
+    with ZoneStateTable.attach(name) as table:
+        return table.get(MAC, zone).power
+
+
+def test_attach_other_process(table):
+    table.update(MAC, 1, power=True)
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        assert pool.apply(_read_power, (table.name, 1)) is True
+    # still readable after the reader process exited
+    with ZoneStateTable.attach(table.name) as reader:
+        assert reader.get(MAC, 1).power is True
+
+
+def test_attach_missing():
+    with pytest.raises(FileNotFoundError):
+        ZoneStateTable.attach("skydance-test-missing")
@@ -0,0 +1,313 @@
+import struct
+import time
+import zlib
+from multiprocessing import resource_tracker, shared_memory
+from typing import Iterator, NamedTuple, Optional, Tuple
+
+from skydance.enum import ZoneType
+from skydance.protocol import (
+    BrightnessCommand,
+    Command,
+    MasterPowerCommand,
+    PowerCommand,
+    RGBWCommand,
+    TemperatureCommand,
+)
+
+
+# type aliases
+MacAddress = bytes
+RGBW = Tuple[int, int, int, int]
+
+_MAGIC = b"SKZS"
+_VERSION = 1
+# magic, version, capacity
+_HEADER = struct.Struct("<4sHH8x")
+# sequence, mac, zone, flags, type, power, brightness, temperature,
+# red, green, blue, white, updated
+_SLOT = struct.Struct("<I6sBBBBBB4B4xd")
+_SEQUENCE = struct.Struct("<I")
+
+_TYPE = 1
+_POWER = 2
+_BRIGHTNESS = 4
+_TEMPERATURE = 8
+_RGBW = 16
+_USED = 128
+
+_READ_RETRIES = 10000
+_SEQUENCE_MASK = 0xFFFFFFFF
+
+
+class ZoneState(NamedTuple):
+    """A snapshot of a zone state. Unknown values are `None`."""
+
+    mac: MacAddress
+    zone: int
+    type: Optional[ZoneType]
+    power: Optional[bool]
+    brightness: Optional[int]
+    temperature: Optional[int]
+    rgbw: Optional[RGBW]
+    updated: float
+    """A [`time.time()`](https://docs.python.org/3/library/time.html#time.time) of the last update."""
+
+
+def _slot_index(mac: MacAddress, zone: int, capacity: int) -> int:
+    # Python hash() is randomized per process, crc32 is the same everywhere
+    return zlib.crc32(mac + bytes([zone])) % capacity
+
+
+class ZoneStateTable:
+    """
+    A fixed-layout table of zone states in shared memory.
+
+    A single writer process (the one owning the
+    [Sessions][skydance.network.session.Session]) keeps the table updated
+    and any number of other processes read it without locks, IPC or network
+    traffic. Each slot is guarded by a sequence counter (a "seqlock"): the
+    writer makes it odd while writing, readers retry when it is odd or when
+    it changed during their read.
+
+    Slots are allocated by open addressing on `(mac, zone)` and never freed,
+    so the capacity must cover all zones of the fleet.
+
+    Example:
+        >>> # writer process
+        >>> table = ZoneStateTable.create("skydance-zones", capacity=4096)
+        >>> await session.send(command)
+        >>> table.apply(mac, command)
+        >>> # any reader process
+        >>> table = ZoneStateTable.attach("skydance-zones")
+        >>> print(table.get(mac, 3))
+    """
+
+    def __init__(self, memory: shared_memory.SharedMemory, *, owner: bool):
+        """
+        Wrap a shared memory block. Use `create()` or `attach()` instead.
+
+        Raise:
+            ValueError: If the block does not contain a zone state table.
+        """
+        self._memory = memory
+        self._owner = owner
+        buffer: memoryview = memory.buf  # type: ignore  # None only when closed
+        magic, version, capacity = _HEADER.unpack_from(buffer)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError("Shared memory does not contain a zone state table.")
+        self._buffer = buffer
+        self.capacity = capacity
+
+    @staticmethod
+    def size(capacity: int) -> int:
+        """Return a size of a table with given capacity in bytes."""
+        return _HEADER.size + capacity * _SLOT.size
+
+    @classmethod
+    def create(
+        cls, name: Optional[str] = None, *, capacity: int = 1024
+    ) -> "ZoneStateTable":
+        """
+        Create a new table, owned by this (writer) process.
+
+        Args:
+            name: A name of the shared memory block. A random one by default.
+            capacity: A maximal number of zones.
+
+        Raise:
+            ValueError: If the capacity is invalid.
+            FileExistsError: If a block with such name already exists.
+        """
+        if not 0 < capacity <= 0xFFFF:
+            raise ValueError("Capacity must be between 1 and 65535.")
+        memory = shared_memory.SharedMemory(name, create=True, size=cls.size(capacity))
+        buffer: memoryview = memory.buf  # type: ignore  # None only when closed
+        buffer[: cls.size(capacity)] = bytes(cls.size(capacity))
+        _HEADER.pack_into(buffer, 0, _MAGIC, _VERSION, capacity)
+        return cls(memory, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> "ZoneStateTable":
+        """
+        Attach to an existing table for reading.
+
+        Raise:
+            FileNotFoundError: If there is no such table.
+        """
+        memory = shared_memory.SharedMemory(name)
+        # Readers must not remove the block when they exit,
+        # only the creating process does (see bpo-39959).
+        resource_tracker.unregister(memory._name, "shared_memory")  # type: ignore
+        return cls(memory, owner=False)
+
+    @property
+    def name(self) -> str:
+        """Return a name of the shared memory block to attach to."""
+        return self._memory.name
+
+    def _offset(self, index: int) -> int:
+        return _HEADER.size + index * _SLOT.size
+
+    def _find(self, mac: MacAddress, zone: int, *, allocate: bool) -> Optional[int]:
+        index = _slot_index(mac, zone, self.capacity)
+        for _ in range(self.capacity):
+            slot = self._read_slot(index)
+            if slot[1] == mac and slot[2] == zone:
+                return index
+            if not slot[3] & _USED:
+                if not allocate:
+                    return None
+                return index
+            index = (index + 1) % self.capacity
+        if allocate:
+            raise ValueError("The zone state table is full.")
+        return None
+
+    def _read_slot(self, index: int) -> tuple:
+        offset = self._offset(index)
+        buffer = self._buffer
+        for _ in range(_READ_RETRIES):
+            slot = _SLOT.unpack_from(buffer, offset)
+            if slot[0] % 2 == 0 and _SEQUENCE.unpack_from(buffer, offset)[0] == slot[0]:
+                return slot
+            time.sleep(0)
+        raise RuntimeError("The zone state is being written for too long.")
+
+    def update(
+        self,
+        mac: MacAddress,
+        zone: int,
+        *,
+        type: Optional[ZoneType] = None,
+        power: Optional[bool] = None,
+        brightness: Optional[int] = None,
+        temperature: Optional[int] = None,
+        rgbw: Optional[RGBW] = None,
+    ):
+        """
+        Update known values of a zone. Values which are `None` are kept.
+
+        Only the process which created the table may call this.
+
+        Raise:
+            ValueError: If the table is full or the values are invalid.
+        """
+        if len(mac) != 6:
+            raise ValueError("MAC address must have 6 bytes.")
+        index = self._find(mac, zone, allocate=True)
+        assert index is not None
+        (
+            sequence,
+            _,
+            _,
+            flags,
+            old_type,
+            old_power,
+            old_brightness,
+            old_temperature,
+            *old_rgbw,
+            _,
+        ) = self._read_slot(index)
+        if type is not None:
+            flags |= _TYPE
+            old_type = type.value
+        if power is not None:
+            flags |= _POWER
+            old_power = int(power)
+        if brightness is not None:
+            flags |= _BRIGHTNESS
+            old_brightness = brightness
+        if temperature is not None:
+            flags |= _TEMPERATURE
+            old_temperature = temperature
+        if rgbw is not None:
+            flags |= _RGBW
+            old_rgbw = list(rgbw)
+        flags |= _USED
+        # readers only compare sequences for equality, so they may wrap around
+        writing = (sequence + 1) & _SEQUENCE_MASK
+        written = (sequence + 2) & _SEQUENCE_MASK
+        try:
+            data = _SLOT.pack(
+                written,
+                mac,
+                zone,
+                flags,
+                old_type,
+                old_power,
+                old_brightness,
+                old_temperature,
+                *old_rgbw,
+                time.time(),
+            )
+        except struct.error as e:
+            raise ValueError(f"Invalid zone state: {e}") from None
+
+        offset = self._offset(index)
+        buffer = self._buffer
+        _SEQUENCE.pack_into(buffer, offset, writing)
+        buffer[offset + _SEQUENCE.size : offset + _SLOT.size] = data[_SEQUENCE.size :]
+        _SEQUENCE.pack_into(buffer, offset, written)
+
+    def apply(self, mac: MacAddress, command: Command):
+        """
+        Update a zone state by a sent command.
+
+        A [`MasterPowerCommand`][skydance.protocol.MasterPowerCommand]
+        updates all zones of the relay already present in the table.
+        Other than setting commands are ignored.
+        """
+        if isinstance(command, PowerCommand):
+            self.update(mac, command.zone, power=command.power)
+        elif isinstance(command, BrightnessCommand):
+            self.update(mac, command.zone, brightness=command.brightness)
+        elif isinstance(command, TemperatureCommand):
+            self.update(mac, command.zone, temperature=command.temperature)
+        elif isinstance(command, RGBWCommand):
+            rgbw = (command.red, command.green, command.blue, command.white)
+            self.update(mac, command.zone, rgbw=rgbw)
+        elif isinstance(command, MasterPowerCommand):
+            for state in self:
+                if state.mac == mac:
+                    self.update(mac, state.zone, power=command.power)
+
+    def get(self, mac: MacAddress, zone: int) -> Optional[ZoneState]:
+        """Return a state of a zone, or `None` if it is not in the table."""
+        index = self._find(mac, zone, allocate=False)
+        if index is None:
+            return None
+        return _zone_state(self._read_slot(index))
+
+    def __iter__(self) -> Iterator[ZoneState]:
+        """Iterate over states of all zones in the table."""
+        for index in range(self.capacity):
+            slot = self._read_slot(index)
+            if slot[3] & _USED:
+                yield _zone_state(slot)
+
+    def close(self):
+        """Detach from the table. The creating process also removes it."""
+        self._memory.close()
+        if self._owner:
+            self._memory.unlink()
+
+    def __enter__(self):
+        """Return auto-closing context manager."""
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def _zone_state(slot: tuple) -> ZoneState:
+    (_, mac, zone, flags, type, power, brightness, temperature, *rgbw, updated) = slot
+    return ZoneState(
+        mac=mac,
+        zone=zone,
+        type=ZoneType(type) if flags & _TYPE else None,
+        power=bool(power) if flags & _POWER else None,
+        brightness=brightness if flags & _BRIGHTNESS else None,
+        temperature=temperature if flags & _TEMPERATURE else None,
+        rgbw=tuple(rgbw) if flags & _RGBW else None,  # type: ignore
+        updated=updated,
+    )
@@ -1,6 +1,7 @@
 import asyncio
 import logging
 import os
+
 import pytest
 
 from skydance.network.buffer import Buffer